@@ -0,0 +1,77 @@
+"""
+daily_news.main 并发流水线基准测试。
+
+使用本地 RSS / Gemini 替身与打桩的行情、Telegram、邮件函数，
+对比串行 (workers=1) 与并发流水线的耗时。
+
+用法: python benchmarks/bench_daily_news.py
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tasks", "news"))
+
+from fakes import FakeServer
+
+LEGACY_SLEEP = 60
+MARKET_LATENCY = 1.5
+
+
+def reset_caches():
+    """每轮使用空缓存，保证对比的是冷启动耗时。"""
+    from mcp_tools.news import analysis, dedup, tools
+    from mcp_tools.news.feed_cache import FeedCache
+
+    tools.FEED_CACHE = FeedCache(directory=Path(tempfile.mkdtemp()), min_refresh=0)
+    analysis.ANALYSIS_CACHE = analysis.AnalysisCache(path=Path(tempfile.mkdtemp()) / "analyses.db")
+    dedup.STORY_INDEX = dedup.StoryIndex(path=Path(tempfile.mkdtemp()) / "stories.db")
+
+
+def run(server, workers: int) -> float:
+    import daily_news
+    from mcp_tools.news.tools import fetch_rss_news
+
+    reset_caches()
+
+    sent = []
+    daily_news.send_telegram_message = lambda text, *a, **kw: sent.append(text) or []
+    daily_news.send_email_core = lambda *a, **kw: True
+    daily_news.fetch_us_market_depth = lambda: time.sleep(MARKET_LATENCY) or {"indices": [], "sectors": [], "news": []}
+    daily_news.fetch_cn_market_depth = lambda: time.sleep(MARKET_LATENCY) or {"indices": [], "news": []}
+    daily_news.fetch_china_policy = lambda hours=24: fetch_rss_news(server.feed_url("policy"), hours=hours)
+
+    topics = {name: {"type": "rss", "url": server.feed_url(name)} for name in ["ai", "tech", "os", "domestic", "linux"]}
+    topics["Market Analysis"] = {"type": "market_depth"}
+    topics["China Policy"] = {"type": "china_policy"}
+
+    start = time.perf_counter()
+    # 每轮使用空的运行状态，避免上一轮的检查点让本轮变成空的增量推送
+    state = daily_news.RunState(path=Path(tempfile.mkdtemp()) / "state.db")
+    daily_news.main(topics_config=topics, workers=workers, state=state)
+    elapsed = time.perf_counter() - start
+    assert len(sent) > len(topics), "digest output incomplete"
+    return elapsed
+
+
+def main():
+    with FakeServer(feed_latency=0.5, llm_latency=2.0) as server:
+        os.environ.setdefault("GEMINI_API_KEY", "bench")
+        os.environ["GEMINI_BASE_URL"] = server.base_url
+        os.environ.setdefault("GEMINI_RPM", "60")
+
+        serial = run(server, workers=1)
+        pipelined = run(server, workers=8)
+        topics = 7
+        print(f"legacy (serial + {LEGACY_SLEEP}s sleeps, est.): {serial + LEGACY_SLEEP * topics:8.2f}s")
+        print(f"serial  (workers=1):                   {serial:8.2f}s")
+        print(f"pipelined (workers=8):                 {pipelined:8.2f}s")
+        print(f"speedup vs serial: {serial / pipelined:.1f}x, stub stats: {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+跨来源去重基准。
+
+合成一批中英文新闻：每个事件以不同形式出现多次 (Google News 跳转链接、跟踪参数、
+" - 来源" 后缀、标点差异)，统计去重后剩余条数、误合并的不同事件数与耗时。
+另有一组只差版本号 / 季度 / 数字的不同事件 (Mesa 24.0.1 与 24.0.2)，必须全部保留。
+
+用法: python benchmarks/bench_dedup.py
+"""
+import base64
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from mcp_tools import tracing
+from mcp_tools.news.dedup import StoryIndex
+
+STORIES = 400
+_vocab_rng = random.Random(1)
+VOCAB_EN = sorted({"".join(_vocab_rng.choices("abcdefghijklmnopqrstuvwxyz", k=_vocab_rng.randint(3, 9))) for _ in range(3000)})
+VOCAB_CN = [chr(0x4E00 + i * 37 % 20000) for i in range(800)]
+
+
+def google_link(url: str) -> str:
+    raw = b"\x08\x13\x22" + bytes([len(url)]) + url.encode() + b"\xd2\x01\x00"
+    return "https://news.google.com/rss/articles/" + base64.urlsafe_b64encode(raw).decode().rstrip("=") + "?oc=5"
+
+
+def corpus(rng: random.Random) -> list:
+    items = []
+    for story in range(STORIES):
+        if story % 2:
+            title = " ".join(rng.sample(VOCAB_EN, 9)).capitalize()
+        else:
+            title = "".join(rng.sample(VOCAB_CN, 16)) + "（最新）"
+        url = f"https://www.source{story % 7}.com/news/{story}.html"
+        variants = [
+            (title, url),
+            (f"{title} - Source {story % 5}", google_link(url)),
+            (title.replace("（", "《").replace("）", "》"), url + "?utm_source=rss&utm_medium=feed"),
+            # 转载：标题改动一个词，链接完全不同
+            (title.replace(title.split()[-1], rng.choice(VOCAB_EN)) if story % 2 else title[:-6] + rng.choice(VOCAB_CN) + "（最新）",
+             f"http://mirror{story % 3}.net/{story}"),
+        ]
+        for variant in rng.sample(variants, rng.randint(1, len(variants))):
+            items.append({"title": variant[0], "link": variant[1], "story": story})
+    rng.shuffle(items)
+    return items
+
+
+NEAR_MISSES = [
+    ("Mesa 24.0.1 Released With Fixes", "Mesa 24.0.2 Released With Fixes"),
+    ("Apple reports Q1 earnings", "Apple reports Q2 earnings"),
+    ("Linux 6.8-rc3 Released", "Linux 6.8-rc4 Released"),
+    ("央行下调存款准备金率0.25个百分点", "央行下调存款准备金率0.5个百分点"),
+]
+
+
+def main():
+    rng = random.Random(7)
+    items = corpus(rng)
+    index = StoryIndex(path=Path(tempfile.mkdtemp()) / "stories.db")
+
+    start = time.perf_counter()
+    # 去掉的条数记录在当前 span 上
+    with tracing.trace("dedup") as run:
+        unique = index.filter(items)
+    elapsed = time.perf_counter() - start
+
+    stories = {item["story"] for item in items}
+    kept = {item["story"] for item in unique}
+    duplicates_left = len(unique) - len(kept)
+    print(f"{len(items)} items from {len(stories)} stories -> {len(unique)} kept in {elapsed * 1000:.1f} ms")
+    print(f"duplicates left: {duplicates_left}, stories lost by false merges: {len(stories) - len(kept)}, "
+          f"dropped: {run.root.attrs.get('deduped_url', 0)} same URL, {run.root.attrs.get('deduped_similar', 0)} similar")
+
+    index.remember(unique)
+    start = time.perf_counter()
+    again = index.filter(items, history=True)
+    print(f"next run with history: {len(again)} items left ({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+    pairs = [{"title": title, "link": f"https://example.com/{i}/{j}"} for i, pair in enumerate(NEAR_MISSES) for j, title in enumerate(pair)]
+    kept_pairs = StoryIndex(path=Path(tempfile.mkdtemp()) / "stories.db").filter(pairs)
+    print(f"number-only near misses kept: {len(kept_pairs)}/{len(pairs)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+SMTP 连接池基准：每封邮件新建连接 vs 连接池复用。
+
+使用 aiosmtpd 在本地起一个需要 AUTH 的 SMTP 替身，握手 (EHLO) 人为加入延迟以模拟
+TLS + 登录的往返开销，对比逐收件人发送一批邮件的耗时与连接数。
+
+依赖: pip install aiosmtpd
+用法: python benchmarks/bench_email.py
+"""
+import asyncio
+import os
+import smtplib
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from mcp_tools.email.pool import SMTPPool
+
+RECIPIENTS = [f"user{i}@example.com" for i in range(50)]
+HANDSHAKE_LATENCY = 0.15
+USER, PASSWORD = "bench@example.com", "secret"
+
+
+class Handler:
+    def __init__(self):
+        self.connections = 0
+        self.messages = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        await asyncio.sleep(HANDSHAKE_LATENCY)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        return "250 OK"
+
+
+def authenticator(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=auth_data.login == USER.encode() and auth_data.password == PASSWORD.encode())
+
+
+def message(to_addr: str) -> str:
+    return f"From: {USER}\r\nTo: {to_addr}\r\nSubject: Digest\r\n\r\nHello {to_addr}\r\n"
+
+
+def fresh_connections(port):
+    """v3 行为：每封邮件 connect + login + sendmail + quit。"""
+    for to_addr in RECIPIENTS:
+        server = smtplib.SMTP("127.0.0.1", port)
+        server.login(USER, PASSWORD)
+        server.sendmail(USER, [to_addr], message(to_addr))
+        server.quit()
+
+
+def pooled(port):
+    pool = SMTPPool("127.0.0.1", port, USER, PASSWORD, size=3, starttls=False)
+    results = pool.send_bulk(USER, [([to_addr], message(to_addr)) for to_addr in RECIPIENTS])
+    pool.close()
+    assert all(results)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    handler = Handler()
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port, authenticator=authenticator, auth_require_tls=False)
+    controller.start()
+    try:
+        for label, run in [("connect per email", fresh_connections), ("pooled (3 conns)", pooled)]:
+            connections, messages = handler.connections, handler.messages
+            start = time.perf_counter()
+            run(port)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<18} {handler.messages - messages} emails, {handler.connections - connections:3d} connections, {elapsed:6.2f}s")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
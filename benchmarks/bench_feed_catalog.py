@@ -0,0 +1,95 @@
+"""
+feed 目录吞吐基准：来源数与解析进程数增长时每秒能刷新多少个 feed。
+
+- 本地 RSS 替身运行在独立进程中 (生成响应体不占用被测进程的 GIL)，每个请求延迟 FEED_LATENCY 秒。
+- 目录按每个主题 SOURCES_PER_TOPIC 个来源生成，所有主题同时抓取 (与 daily_news 相同)，
+  来源共用 feed_catalog.FETCH_POOL 并发下载。
+- 解析进程数为 0 时在下载线程中流式解析 (默认)，否则交给 feed_cache 的进程池；
+  进程池在计时前预热，spawn 启动开销不计入。每轮使用空的 feed 缓存 (全部冷启动)。
+
+用法: python benchmarks/bench_feed_catalog.py [来源数,...] [进程数,...]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tasks", "news"))
+
+from fakes import FakeServer
+
+SOURCES = [int(n) for n in sys.argv[1].split(",")] if len(sys.argv) > 1 else [50, 200, 400]
+PROCESSES = [int(n) for n in sys.argv[2].split(",")] if len(sys.argv) > 2 else [0, 1, 2, 4]
+SOURCES_PER_TOPIC = 10
+FEED_LATENCY = 0.05
+FEED_ITEMS = 100
+
+
+def serve(queue, stop):
+    with FakeServer(feed_latency=FEED_LATENCY, llm_latency=0, feed_items=FEED_ITEMS) as server:
+        queue.put(server.base_url)
+        stop.wait()
+
+
+def make_catalog(base_url: str, sources: int) -> dict:
+    import feed_catalog
+
+    topics = {}
+    for i in range(sources):
+        topic = topics.setdefault(f"topic-{i // SOURCES_PER_TOPIC:03d}", {"type": "rss", "max_count": 30, "sources": []})
+        topic["sources"].append({"url": f"{base_url}/feed/s{i:04d}.xml", "priority": i % 3})
+    return {name: feed_catalog.normalize_topic(name, config) for name, config in topics.items()}
+
+
+def run(catalog: dict, processes: int) -> dict:
+    import feed_catalog
+    from mcp_tools.news import tools
+    from mcp_tools.news.feed_cache import FeedCache, get_parse_pool
+
+    if processes:
+        pool = get_parse_pool(processes)
+        list(pool.map(abs, range(processes * 4)))  # 预热：启动全部子进程
+    tools.FEED_CACHE = FeedCache(directory=Path(tempfile.mkdtemp()), min_refresh=0, parse_processes=processes)
+
+    start = time.perf_counter()
+    cpu = time.process_time()
+    with ThreadPoolExecutor(max_workers=len(catalog)) as topics:
+        results = list(topics.map(feed_catalog.fetch_sources, catalog.values()))
+    elapsed = time.perf_counter() - start
+    sources = sum(len(config["sources"]) for config in catalog.values())
+    return {
+        "elapsed": elapsed,
+        "feeds_per_sec": sources / elapsed,
+        "main_cpu": time.process_time() - cpu,
+        "items": sum(len(items) for items in results),
+    }
+
+
+def main():
+    context = multiprocessing.get_context("spawn")
+    queue, stop = context.Queue(), context.Event()
+    server = context.Process(target=serve, args=(queue, stop), daemon=True)
+    server.start()
+    base_url = queue.get(timeout=30)
+    os.environ["MCP_CACHE_DIR"] = tempfile.mkdtemp()
+    try:
+        print(f"{os.cpu_count()} CPU(s), {SOURCES_PER_TOPIC} sources/topic, {FEED_LATENCY * 1000:.0f}ms per feed request")
+        print(f"{'sources':>8} {'processes':>9} {'elapsed':>9} {'feeds/s':>9} {'main CPU':>9} {'items':>6}")
+        for sources in SOURCES:
+            catalog = make_catalog(base_url, sources)
+            for processes in PROCESSES:
+                result = run(catalog, processes)
+                print(f"{sources:8d} {processes:9d} {result['elapsed']:8.2f}s {result['feeds_per_sec']:9.1f} "
+                      f"{result['main_cpu']:8.2f}s {result['items']:6d}")
+    finally:
+        stop.set()
+        server.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
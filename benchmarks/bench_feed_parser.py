@@ -0,0 +1,78 @@
+"""
+流式 feed 解析基准：feedparser.parse 全量解析 vs feed_reader 流式解析 + 提前停止。
+
+生成数 MB 的 RSS / Atom 文档 (按时间倒序，每小时一条)，对比：
+- feedparser: 解析全部条目后再按 24h 窗口过滤、取前 15 条 (旧流程)
+- stream (full): 流式解析全部条目，不提前停止
+- stream (24h, 15): 流式解析，凑够 15 条或超出 24h 窗口即停止
+
+用法: python benchmarks/bench_feed_parser.py
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import feedparser
+
+from mcp_tools.news.feed_reader import read_entries, simplify_entry
+
+ITEMS = 5000
+SUMMARY = "<p>" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 12 + "</p>"
+
+
+def make_rss(count: int) -> bytes:
+    now = datetime.now(timezone.utc)
+    items = "".join(
+        f"<item><title>Story {i} &amp; more</title><link>https://example.com/{i}</link>"
+        f"<description><![CDATA[{SUMMARY}]]></description>"
+        f"<pubDate>{format_datetime(now - timedelta(hours=i))}</pubDate></item>"
+        for i in range(count)
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>bench</title>{items}</channel></rss>'.encode()
+
+
+def make_atom(count: int) -> bytes:
+    now = datetime.now(timezone.utc)
+    entries = "".join(
+        f'<entry><title>Story {i}</title><link rel="alternate" href="https://example.com/{i}"/>'
+        f"<summary type=\"html\">{SUMMARY.replace('<', '&lt;')}</summary>"
+        f"<updated>{(now - timedelta(hours=i)).isoformat()}</updated></entry>"
+        for i in range(count)
+    )
+    return f'<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom"><title>bench</title>{entries}</feed>'.encode()
+
+
+def legacy(doc: bytes, cutoff: float) -> list:
+    entries = [simplify_entry(e) for e in feedparser.parse(doc).entries]
+    return [e for e in entries if e["published"] and e["published"] >= cutoff][:15]
+
+
+def measure(label: str, fn, doc: bytes):
+    start = time.perf_counter()
+    result = fn(doc)
+    elapsed = time.perf_counter() - start
+    # 内存单独测一遍，tracemalloc 会显著拖慢计时
+    tracemalloc.start()
+    fn(doc)
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    print(f"  {label:<18} {elapsed * 1000:9.1f} ms  peak {peak:7.1f} MB  {len(result):5d} entries")
+
+
+def main():
+    for name, doc in [("RSS", make_rss(ITEMS)), ("Atom", make_atom(ITEMS))]:
+        cutoff = time.time() - 24 * 3600
+        print(f"{name}: {len(doc) / 1e6:.1f} MB, {ITEMS} entries")
+        measure("feedparser", lambda d: legacy(d, cutoff), doc)
+        measure("stream (full)", lambda d: read_entries(io.BytesIO(d)), doc)
+        measure("stream (24h, 15)", lambda d: read_entries(io.BytesIO(d), cutoff=cutoff, max_count=15), doc)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+行情快照基准：逐个 Ticker.history 串行拉取 vs 一次 yf.download + 向量化计算。
+
+Yahoo 接口由录制的 fixtures/yahoo_closes_5d.csv 替代：
+- Ticker.history 每次调用一个往返 ROUND_TRIP。
+- yf.download (threads=True) 按 DOWNLOAD_THREADS 个代码一组并发请求，各组的连接与往返重叠，
+  耗时按一个固定往返加每组 CHUNK_COST 估算，而不是按代码数线性增长。
+更大的代码池由 fixture 列缩放生成；批量耗时按组数报告，逐个拉取只跑到 LEGACY_MAX 个代码。
+
+用法: python benchmarks/bench_market.py
+"""
+import math
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import yfinance as yf
+
+from mcp_tools.news import market
+from mcp_tools.news.market_cache import MarketCache
+
+ROUND_TRIP = 0.05
+DOWNLOAD_THREADS = 10
+CHUNK_COST = 0.005
+SIZES = (8, 100, 500, 2000)
+LEGACY_MAX = 500
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "yahoo_closes_5d.csv")
+RECORDED = pd.read_csv(FIXTURE, index_col="Date", parse_dates=True)
+
+
+def universe(size: int) -> pd.DataFrame:
+    """把录制数据扩展为 size 个代码。"""
+    columns = {}
+    base = list(RECORDED.columns)
+    for i in range(size):
+        src = base[i % len(base)]
+        name = src if i < len(base) else f"SYM{i}"
+        columns[name] = RECORDED[src] * (1 + (i % 17) / 100)
+    return pd.DataFrame(columns)
+
+
+class FakeTicker:
+    def __init__(self, ticker):
+        self.ticker = ticker
+
+    def history(self, period="5d"):
+        time.sleep(ROUND_TRIP)
+        return FIXTURE_FRAME[[self.ticker]].dropna().rename(columns={self.ticker: "Close"})
+
+
+DOWNLOADS = []
+
+
+def chunks(count: int) -> int:
+    return math.ceil(count / DOWNLOAD_THREADS)
+
+
+def fake_download(symbols, start=None, group_by="column", **kwargs):
+    DOWNLOADS.append(len(symbols))
+    time.sleep(ROUND_TRIP + CHUNK_COST * chunks(len(symbols)))
+    closes = FIXTURE_FRAME[list(symbols)]
+    if start is not None:
+        closes = closes[closes.index >= start]
+    if group_by == "ticker":
+        return pd.concat({s: closes[[s]].rename(columns={s: "Close"}) for s in symbols}, axis=1)
+    return pd.concat({"Close": closes}, axis=1)
+
+
+def legacy(symbols):
+    results = {}
+    for ticker in symbols:
+        hist = yf.Ticker(ticker).history(period="5d")
+        if not hist.empty and len(hist) >= 2:
+            close = hist['Close'].iloc[-1]
+            results[ticker] = ((close - hist['Close'].iloc[-2]) / hist['Close'].iloc[-2]) * 100
+    return results
+
+
+def main():
+    global FIXTURE_FRAME
+    yf.Ticker = FakeTicker
+    yf.download = fake_download
+    print(f"{ROUND_TRIP * 1000:.0f}ms round trip, {DOWNLOAD_THREADS} symbols/chunk, {CHUNK_COST * 1000:.0f}ms per chunk")
+    print(f"{'symbols':>7} {'chunks':>6} {'batched':>9} {'ms/symbol':>9} {'vs 8':>6} {'per-ticker':>10} {'speedup':>7}")
+    baseline = None
+    timings = {}
+    for size in SIZES:
+        FIXTURE_FRAME = universe(size)
+        symbols = list(FIXTURE_FRAME.columns)
+
+        start = time.perf_counter()
+        new = market.fetch_snapshot(symbols, use_cache=False)
+        t_new = time.perf_counter() - start
+        baseline = baseline or t_new
+        timings[size] = t_new
+
+        legacy_cols = ""
+        if size <= LEGACY_MAX:
+            start = time.perf_counter()
+            old = legacy(symbols)
+            t_old = time.perf_counter() - start
+            assert all(abs(new.at[t, "change_pct"] - c) < 1e-9 for t, c in old.items())
+            legacy_cols = f" {t_old:9.3f}s {t_old / t_new:6.1f}x"
+        print(f"{size:7d} {chunks(size):6d} {t_new:8.3f}s {t_new / size * 1000:9.2f} {t_new / baseline:5.1f}x{legacy_cols}")
+    # 实测每增加一组的耗时 (含下载与向量化计算)，与注入的 CHUNK_COST 对比
+    first, last = SIZES[0], SIZES[-1]
+    slope = (timings[last] - timings[first]) / (chunks(last) - chunks(first))
+    print(f"measured cost per extra chunk: {slope * 1000:.2f}ms (injected {CHUNK_COST * 1000:.0f}ms)")
+
+    # 同一天多次调用：只有第一次访问上游
+    FIXTURE_FRAME = universe(100)
+    cache = MarketCache(directory=Path(tempfile.mkdtemp()))
+    market.MARKET_CACHE = cache
+    DOWNLOADS.clear()
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        market.fetch_snapshot(FIXTURE_FRAME.columns, use_cache=True)
+        timings.append(time.perf_counter() - start)
+    print(f"cached, 5 calls x 100 symbols: {len(DOWNLOADS)} upstream download(s), first {timings[0]:.3f}s, then {max(timings[1:]) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+研报流式生成基准：整篇等待 vs streamGenerateContent 逐段回调。
+
+本地 Gemini 替身以 SSE 分块返回五段研报 (整体耗时 LLM_LATENCY 秒)，
+对比首段可推送的时间 (time-to-first-message) 与总耗时，并校验两种模式得到的 HTML 一致。
+
+用法: python benchmarks/bench_market_stream.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fakes import FakeServer
+
+LLM_LATENCY = 10.0
+US_DATA = {"indices": ["S&P 500: 5000 (+0.50%)"], "sectors": [], "news": []}
+CN_DATA = {"indices": ["上证指数: 3000 (+0.20%)"], "news": []}
+
+
+def main():
+    with FakeServer(llm_latency=LLM_LATENCY) as server:
+        os.environ.update(GEMINI_API_KEY="bench", GEMINI_BASE_URL=server.base_url, GEMINI_RPM="600")
+        from mcp_tools.news.tools import analyze_stock_market_multi
+
+        start = time.perf_counter()
+        blocking = analyze_stock_market_multi(US_DATA, CN_DATA)
+        blocking_total = time.perf_counter() - start
+
+        arrivals = []
+        start = time.perf_counter()
+        streamed = analyze_stock_market_multi(US_DATA, CN_DATA, on_section=lambda s: arrivals.append(time.perf_counter() - start))
+        streamed_total = time.perf_counter() - start
+
+        assert streamed == blocking, "streamed report differs from blocking report"
+        assert "```" not in streamed and len(arrivals) == 5
+        print(f"blocking:  first message {blocking_total:6.2f}s, total {blocking_total:6.2f}s")
+        print(f"streaming: first message {arrivals[0]:6.2f}s, total {streamed_total:6.2f}s, "
+              f"sections at {', '.join(f'{t:.1f}s' for t in arrivals)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+MCP Server 并发工具调用基准。
+
+通过 FastMCP 的进程内 Client 同时发起多路 fetch_news_tool 调用 (RSS 与 Gemini 均为本地替身)，
+记录不同并发度下的吞吐，以及负载期间 list_tools 的响应延迟 (事件循环是否被阻塞)。
+
+用法: python benchmarks/bench_mcp_concurrency.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fakes import FakeServer
+
+CONCURRENCY = [1, 4, 16]
+
+
+async def measure(client, concurrency: int):
+    start = time.perf_counter()
+    calls = asyncio.gather(*(client.call_tool("fetch_news_tool", {"query": f"c{concurrency}q{i}", "count": 3}) for i in range(concurrency)))
+    await asyncio.sleep(0.05)
+    ping_start = time.perf_counter()
+    await client.list_tools()
+    ping = time.perf_counter() - ping_start
+    await calls
+    elapsed = time.perf_counter() - start
+    print(f"{concurrency:3d} concurrent calls  {elapsed:5.2f}s  {concurrency / elapsed:5.2f} calls/s  list_tools during load {ping * 1000:5.1f} ms")
+
+
+def main():
+    with FakeServer(feed_latency=0.3, llm_latency=1.0) as server:
+        os.environ.update(GEMINI_API_KEY="bench", GEMINI_BASE_URL=server.base_url, GEMINI_RPM="6000", GEMINI_BURST="100", GEMINI_CONCURRENCY="64",
+                          MCP_CACHE_DIR=tempfile.mkdtemp())
+        import mcp_server
+        from fastmcp import Client
+        from mcp_tools.news import tools
+
+        tools.fetch_google_news = lambda query, count=20, hours=24: tools.fetch_rss_news(server.feed_url(query), hours=hours, max_count=count)
+
+        async def run():
+            async with Client(mcp_server.mcp) as client:
+                await client.call_tool("fetch_news_tool", {"query": "warmup", "count": 1})
+                for concurrency in CONCURRENCY:
+                    await measure(client, concurrency)
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
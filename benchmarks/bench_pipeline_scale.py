@@ -0,0 +1,68 @@
+"""
+离线整条日报流水线压测：数千条合成新闻 + 本地 LLM 替身 + 录制 / 回放缓存。
+
+- 本地 RSS 替身提供 TOPICS 个主题 (每个主题 15 条进入分析)。
+- LLM 使用 StubBackend (每次调用 STUB_LATENCY 秒)，外层包一层 ReplayBackend。
+- 第一轮冷启动并录制；第二轮清空分析缓存 / 去重历史 / 运行状态后重跑，LLM 响应全部来自回放。
+
+用法: python benchmarks/bench_pipeline_scale.py [主题数]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tasks", "news"))
+
+from fakes import FakeServer
+from bench_daily_news import reset_caches
+
+TOPICS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+STUB_LATENCY = 0.5
+
+
+def run(server, backend) -> dict:
+    import daily_news
+    from mcp_tools.news import llm
+
+    reset_caches()
+    llm.set_backend(backend)
+
+    sent = []
+    daily_news.send_telegram_message = lambda text, *a, **kw: sent.append(text) or []
+    daily_news.send_email_core = lambda *a, **kw: True
+    daily_news.fetch_us_market_depth = lambda: {"indices": [], "sectors": [], "news": []}
+    daily_news.fetch_cn_market_depth = lambda: {"indices": [], "news": []}
+
+    topics = {f"topic-{i:04d}": {"type": "rss", "url": server.feed_url(f"t{i:04d}")} for i in range(TOPICS)}
+    topics["Market Analysis"] = {"type": "market_depth"}
+    state = daily_news.RunState(path=Path(tempfile.mkdtemp()) / "state.db")
+
+    calls = backend.inner.calls
+    start = time.perf_counter()
+    daily_news.main(topics_config=topics, workers=32, state=state)
+    elapsed = time.perf_counter() - start
+    items = sum(text.count("💡") for text in sent)
+    return {"elapsed": elapsed, "items": items, "messages": len(sent), "llm_calls": backend.inner.calls - calls}
+
+
+def main():
+    with FakeServer(feed_latency=0.05, llm_latency=0, feed_items=20) as server:
+        os.environ["MCP_CACHE_DIR"] = tempfile.mkdtemp()
+        from mcp_tools.news import llm
+
+        backend = llm.ReplayBackend(llm.StubBackend(latency=STUB_LATENCY), path=Path(tempfile.mkdtemp()) / "replay.db")
+        cold = run(server, backend)
+        replayed = run(server, backend)
+
+        for label, result in (("cold + record", cold), ("replay", replayed)):
+            print(f"{label:14s} {result['elapsed']:7.2f}s  {result['items']:5d} items  "
+                  f"{result['messages']:4d} messages  {result['llm_calls']:3d} LLM calls")
+        assert replayed["llm_calls"] == 0 and replayed["items"] == cold["items"]
+
+
+if __name__ == "__main__":
+    main()
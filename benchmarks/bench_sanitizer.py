@@ -0,0 +1,122 @@
+"""
+clean_html_for_telegram 微基准。
+
+1. 校验 fixtures/telegram_html_corpus.json 黄金语料 (由 v3.0 多遍实现生成) 输出完全一致。
+2. 在 100 KB - 1 MB 的模拟模型输出上对比 v3.0 与单遍实现的耗时。
+
+用法: python benchmarks/bench_sanitizer.py
+"""
+import html
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from mcp_tools.telegram.sanitizer import clean_html_for_telegram
+
+CORPUS = os.path.join(os.path.dirname(__file__), "fixtures", "telegram_html_corpus.json")
+
+SECTION = (
+    "<h3>{n}. 宏观</h3><p>全球流动性<b>边际改善</b>，美元指数回落，<i>风险偏好</i>回升。"
+    "详见 <a href=\"https://example.com/r/{n}\">研报</a>。</p>"
+    "<ul><li>通胀 <strong>回落</strong></li><li>利率 <em>持平</em></li></ul><br>"
+    "<div><p>成交额放大至 <b>1.2万亿</b>，<span>北向资金</span>净流入。</p></div><hr>\n\n"
+)
+
+
+def legacy_clean_html_for_telegram(text: str) -> str:
+    """v3.0 多遍正则实现 (原样保留，用作基准对照)。"""
+    if not text:
+        return ""
+    if "<!doctype" in text.lower() or "<html" in text.lower():
+        body_match = re.search(r'<body[^>]*>(.*?)</body>', text, re.IGNORECASE | re.DOTALL)
+        if body_match:
+            text = body_match.group(1)
+        else:
+            return html.escape(text[:500])
+    text = re.sub(r'<(h1|h2|h3|h4|h5|h6)[^>]*>', '<b>', text, flags=re.IGNORECASE)
+    text = re.sub(r'</(h1|h2|h3|h4|h5|h6)>', '</b>\n', text, flags=re.IGNORECASE)
+    text = re.sub(r'<(p|div)[^>]*>', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'</(p|div)>', '\n', text, flags=re.IGNORECASE)
+    text = re.sub(r'<br\s*/?>', '\n', text, flags=re.IGNORECASE)
+    text = re.sub(r'<hr\s*/?>', '\n---\n', text, flags=re.IGNORECASE)
+    text = re.sub(r'<li[^>]*>', '• ', text, flags=re.IGNORECASE)
+    text = re.sub(r'</li>', '\n', text, flags=re.IGNORECASE)
+    supported_tags = ['b', 'strong', 'i', 'em', 'code', 's', 'strike', 'del', 'u', 'pre', 'a']
+
+    def process_tags(match):
+        full_tag = match.group(0)
+        is_closing = full_tag.startswith('</')
+        tag_name_match = re.match(r'</?([a-zA-Z0-9]+)', full_tag)
+        if not tag_name_match: return ""
+        tag_name = tag_name_match.group(1).lower()
+        if tag_name not in supported_tags: return ""
+        if is_closing:
+            return f"</{tag_name}>"
+        if tag_name == 'a':
+            href_match = re.search(r'href=["\']([^"\']+)["\']', full_tag, re.I)
+            if href_match: return f'<a href="{html.escape(href_match.group(1))}">'
+            return ""
+        return f"<{tag_name}>"
+
+    text = re.sub(r'</?[^>]+>', process_tags, text)
+    tags_stack = []
+    final_text = ""
+    last_pos = 0
+    tag_pattern = re.compile(r'(</?([a-z]+)[^>]*>)', re.IGNORECASE)
+    for match in tag_pattern.finditer(text):
+        final_text += text[last_pos:match.start()]
+        tag_str = match.group(1)
+        tag_name = match.group(2).lower()
+        if not tag_str.startswith('</'):
+            tags_stack.append(tag_name)
+            final_text += tag_str
+        elif tags_stack and tags_stack[-1] == tag_name:
+            tags_stack.pop()
+            final_text += tag_str
+        last_pos = match.end()
+    final_text += text[last_pos:]
+    while tags_stack:
+        final_text += f"</{tags_stack.pop()}>"
+    final_text = re.sub(r'\n\s*\n', '\n\n', final_text)
+    return final_text.strip()
+
+
+def best_of(fn, text, rounds=3):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = json.load(f)
+    mismatches = [case["input"] for case in corpus if clean_html_for_telegram(case["input"]) != case["expected"]]
+    print(f"golden corpus: {len(corpus) - len(mismatches)}/{len(corpus)} identical")
+    if mismatches:
+        sys.exit(f"mismatch on: {mismatches[:3]!r}")
+
+    for size_kb in (100, 250, 500, 1000):
+        text = ""
+        n = 0
+        parts = []
+        while len(text) < size_kb * 1024:
+            parts.append(SECTION.format(n=n))
+            n += 1
+            if n % 64 == 0:
+                text = "".join(parts)
+        text = "".join(parts)
+        t_old, old = best_of(legacy_clean_html_for_telegram, text)
+        t_new, new = best_of(clean_html_for_telegram, text)
+        assert old == new
+        print(f"{size_kb:5d} KB: v3.0 {t_old * 1000:8.1f} ms   single-pass {t_new * 1000:8.1f} ms   ({t_old / t_new:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
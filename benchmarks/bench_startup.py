@@ -0,0 +1,53 @@
+"""
+MCP Server 冷启动基准：启动时立即导入全部工具实现 (eager) vs 首次调用时才导入 (lazy)。
+
+每种模式在新的子进程中 import mcp_server (注册全部工具，但不运行服务)，记录
+启动耗时与峰值 RSS，再测首次调用 news 工具前导入实现所需的时间。
+
+用法: python benchmarks/bench_startup.py [次数]
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CHILD = r"""
+import json, resource, time
+start = time.perf_counter()
+import mcp_server
+startup = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+from mcp_tools.news import fetch_news_tool
+start = time.perf_counter()
+fetch_news_tool.resolve()
+first_call = time.perf_counter() - start
+print(json.dumps({"startup": startup, "rss_mb": rss, "first_call": first_call}))
+"""
+
+MODES = {
+    "eager": {"MCP_EAGER_TOOLS": "1", "MCP_TOOL_WARMUP": "0"},
+    "lazy": {"MCP_EAGER_TOOLS": "0", "MCP_TOOL_WARMUP": "0"},
+}
+
+
+def run(mode: str) -> dict:
+    env = dict(os.environ, **MODES[mode])
+    out = subprocess.run([sys.executable, "-c", CHILD], cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    for mode in MODES:
+        samples = [run(mode) for _ in range(runs)]
+
+        def best(key):
+            return min(s[key] for s in samples)
+
+        print(f"{mode:<6} startup {best('startup'):5.2f}s  rss {best('rss_mb'):6.1f} MB  news first-call import {best('first_call'):5.2f}s")
+
+
+if __name__ == "__main__":
+    main()
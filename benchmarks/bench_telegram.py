@@ -0,0 +1,64 @@
+"""
+Telegram 投递基准：固定 sleep 串行发送 vs 按 chat 排队 + 令牌桶限速。
+
+对本地替身 Bot API 发送一份日报 (若干条消息 x 多个 chat)，比较总耗时、
+429 次数，并检查每条消息都在 4096 字符以内。
+
+用法: python benchmarks/bench_telegram.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fakes import FakeServer
+
+MESSAGES = 10
+CHATS = ["1001", "1002"]
+
+
+def digest_messages() -> list:
+    blocks = [f"{i+1}. <a href=\"https://example.com/{i}\">Headline {i}</a>\n   💡 <code>{'分析内容 ' * 40}</code>\n\n" for i in range(60)]
+    return [f"🔹 <b>Topic {t}</b>\n" + "".join(blocks[t * 6:(t + 1) * 6]) for t in range(MESSAGES)]
+
+
+def legacy_send(server, messages):
+    """v3 行为：逐 chat、逐条发送，每条之后固定 sleep 1 秒。"""
+    from mcp_tools import transport
+    from mcp_tools.telegram.sanitizer import clean_html_for_telegram
+
+    url = f"{server.base_url}/botTEST/sendMessage"
+    for chat_id in CHATS:
+        for text in messages:
+            payload = {"chat_id": chat_id, "text": clean_html_for_telegram(text), "parse_mode": "HTML"}
+            transport.post(url, json=payload, timeout=15)
+            time.sleep(1)
+
+
+def queued_send(messages):
+    from mcp_tools.telegram.tools import flush_telegram, queue_telegram_message
+
+    for text in messages:
+        queue_telegram_message(text, token="TEST", chat_id=",".join(CHATS))
+    flush_telegram("TEST")
+
+
+def main():
+    messages = digest_messages()
+    with FakeServer(tg_latency=0.05, tg_chat_limit=20) as server:
+        os.environ["TG_API_BASE"] = server.base_url
+        for label, send in [("fixed sleep (v3)", lambda: legacy_send(server, messages)), ("per-chat queue", lambda: queued_send(messages))]:
+            before = dict(server.stats)
+            start = time.perf_counter()
+            send()
+            elapsed = time.perf_counter() - start
+            sent = server.stats["tg_messages"] - before["tg_messages"]
+            limited = server.stats["tg_rate_limited"] - before["tg_rate_limited"]
+            print(f"{label:<18} {sent:3d} messages to {len(CHATS)} chats in {elapsed:6.2f}s, {limited} rate limited")
+        longest = max(len(t) for texts in server.tg_sent.values() for t in texts)
+        print(f"longest message: {longest} chars")
+
+
+if __name__ == "__main__":
+    main()
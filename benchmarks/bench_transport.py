@@ -0,0 +1,45 @@
+"""
+共享传输层连接复用基准。
+
+对本地替身服务发送相同数量的请求，统计服务端看到的 TCP 连接数 (即握手次数)。
+
+用法: python benchmarks/bench_transport.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import requests
+
+from fakes import FakeServer
+from mcp_tools import transport
+
+REQUESTS = 40
+
+
+def measure(label, server, send):
+    before = server.stats["connections"]
+    start = time.perf_counter()
+    send()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {REQUESTS} requests, {server.stats['connections'] - before:3d} connections, {elapsed:6.2f}s")
+
+
+def main():
+    with FakeServer(feed_latency=0.0, llm_latency=0.0, feed_items=5) as server:
+        url = server.feed_url("bench")
+        measure("requests.get (fresh)", server, lambda: [requests.get(url, timeout=10) for _ in range(REQUESTS)])
+        measure("transport.get", server, lambda: [transport.get(url) for _ in range(REQUESTS)])
+
+        async def gather():
+            await asyncio.gather(*(transport.aget(url) for _ in range(REQUESTS)))
+            await transport.aclose()
+
+        measure("transport.aget", server, lambda: asyncio.run(gather()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+本地替身服务：用于离线基准测试，模拟 RSS 源、Gemini、Telegram Bot 接口与 SMTP 服务器。
+
+录制的 HTTP 响应保存在 fixtures/http/ (见 record_fixture / render_fixture)：
+发布时间在录制时改写为相对录制时刻的偏移，回放时按当前时间还原，保证任何时候回放都落在时间窗口内。
+"""
+import hashlib
+import json
+import os
+import re
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+HTTP_FIXTURE_DIR = os.path.join(FIXTURE_DIR, "http")
+
+_DATE_TAGS = re.compile(rb"(<(pubDate|published|updated|dc:date|lastBuildDate)>)([^<]+)(</\2>)")
+_DATE_MARK = re.compile(rb"@@(RFC|ISO)([+-]\d+)@@")
+
+
+def make_rss(name: str, count: int = 20, hours_step: float = 1.0) -> bytes:
+    """生成一个按时间倒序排列的 RSS 文档。"""
+    now = datetime.now(timezone.utc)
+    items = []
+    for i in range(count):
+        pub = format_datetime(now - timedelta(hours=i * hours_step))
+        items.append(
+            f"<item><title>{name} headline {i} {hashlib.md5(f'{name}{i}'.encode()).hexdigest()[:8]}</title>"
+            f"<link>https://example.com/{name}/{i}</link>"
+            f"<description>Summary of {name} story number {i}.</description>"
+            f"<pubDate>{pub}</pubDate></item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>{name}</title>{''.join(items)}</channel></rss>"
+    ).encode("utf-8")
+
+
+def fixture_name(url: str) -> str:
+    """URL 对应的录制文件名：主机 + 路径，查询串取哈希。"""
+    parts = urlsplit(url)
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", f"{parts.hostname}{parts.path}").strip("_")
+    if parts.query:
+        name += "_" + hashlib.sha1(parts.query.encode("utf-8")).hexdigest()[:10]
+    return name if name.endswith(".xml") else name + ".xml"
+
+
+def record_fixture(url: str, body: bytes, recorded_at: float = None) -> str:
+    """保存一份录制的响应，发布时间改写为相对录制时刻的偏移 (秒)。"""
+    from mcp_tools.news.feed_reader import parse_date
+
+    recorded_at = recorded_at or time.time()
+
+    def relative(match):
+        stamp = parse_date(match.group(3).decode("ascii", "ignore"))
+        if stamp is None:
+            return match.group(0)
+        kind = b"ISO" if b"T" in match.group(3) and b"," not in match.group(3) else b"RFC"
+        return match.group(1) + b"@@" + kind + b"%+d" % int(stamp - recorded_at) + b"@@" + match.group(4)
+
+    os.makedirs(HTTP_FIXTURE_DIR, exist_ok=True)
+    path = os.path.join(HTTP_FIXTURE_DIR, fixture_name(url))
+    with open(path, "wb") as f:
+        f.write(_DATE_TAGS.sub(relative, body))
+    return path
+
+
+def render_fixture(body: bytes, now: float = None) -> bytes:
+    """把相对时间标记还原为以 now 为基准的 RFC 822 / ISO 8601 时间。"""
+    now = datetime.fromtimestamp(now or time.time(), timezone.utc)
+
+    def absolute(match):
+        moment = now + timedelta(seconds=int(match.group(2)))
+        text = format_datetime(moment) if match.group(1) == b"RFC" else moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+        return text.encode("ascii")
+
+    return _DATE_MARK.sub(absolute, body)
+
+
+def load_fixture(url: str):
+    try:
+        with open(os.path.join(HTTP_FIXTURE_DIR, fixture_name(url)), "rb") as f:
+            return render_fixture(f.read())
+    except OSError:
+        return None
+
+
+class FakeServer:
+    """
+    在后台线程运行的 HTTP 替身。
+
+    - GET  /feed/<name>.xml         返回 RSS，延迟 feed_latency 秒
+    - GET  /replay/<编码后的 URL>    回放 fixtures/http 中录制的响应 (没有录制时返回合成 RSS)，延迟 feed_latency 秒
+    - POST /v1beta/models/...       返回 Gemini 格式的 JSON，延迟 llm_latency 秒
+    - POST ...:streamGenerateContent 以 SSE 分 llm_chunks 块返回同样的文本，整体耗时 llm_latency 秒
+    - POST /bot<token>/sendMessage  记录消息，延迟 tg_latency 秒；
+                                    同一 chat 1 秒内超过 tg_chat_limit 条时返回 429
+    """
+
+    def __init__(self, feed_latency: float = 0.3, llm_latency: float = 1.0, feed_items: int = 20,
+                 tg_latency: float = 0.05, tg_chat_limit: int = 20, llm_chunks: int = 20):
+        self.feed_latency = feed_latency
+        self.llm_latency = llm_latency
+        self.llm_chunks = llm_chunks
+        self.feed_items = feed_items
+        self.tg_latency = tg_latency
+        self.tg_chat_limit = tg_chat_limit
+        self.stats = {"feed_requests": 0, "not_modified": 0, "llm_requests": 0, "connections": 0,
+                      "tg_messages": 0, "tg_rate_limited": 0, "replay_hits": 0, "replay_misses": 0}
+        self.tg_sent = {}  # chat_id -> [text, ...]
+        self._tg_times = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        # 客户端提前断开 (例如流式解析读够条目后停止下载) 属于正常情况，不打印堆栈
+        self._server.handle_error = lambda request, client_address: None
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def feed_url(self, name: str) -> str:
+        return f"{self.base_url}/feed/{name}.xml"
+
+    def replay_url(self, url: str) -> str:
+        return f"{self.base_url}/replay/{quote(url, safe='')}"
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def tg_accept(self, chat_id: str, text: str) -> bool:
+        """按 chat 做 1 秒滑动窗口限流，返回是否接受该消息。"""
+        now = time.monotonic()
+        with self._lock:
+            times = [t for t in self._tg_times.get(chat_id, []) if now - t < 1.0]
+            if len(times) >= self.tg_chat_limit:
+                self._tg_times[chat_id] = times
+                self.stats["tg_rate_limited"] += 1
+                return False
+            times.append(now)
+            self._tg_times[chat_id] = times
+            self.tg_sent.setdefault(chat_id, []).append(text)
+            self.stats["tg_messages"] += 1
+            return True
+
+    def llm_reply(self, prompt: str) -> str:
+        """对每个带 ID (或编号) 的标题给出一条确定性的分析。"""
+        tagged = re.findall(r"^\[(\w+)\] \((.*?)\) (.+)$", prompt, flags=re.MULTILINE)
+        if tagged:
+            return json.dumps([{"id": i, "analysis": f"分析: {title}"} for i, _, title in tagged], ensure_ascii=False)
+        numbered = re.findall(r"^\s*(\d+)\. (.+)$", prompt, flags=re.MULTILINE)
+        if numbered:
+            return json.dumps([f"分析: {title}" for _, title in numbered], ensure_ascii=False)
+        # 研报：模型偶尔会包一层代码块标记，客户端需要清理
+        sections = ["<b>宏观</b> 平稳", "A股情绪 稳定", "热点板块 科技", "风险 可控", "策略 均衡"]
+        return "```html\n" + "\n".join(f"<p>{s}。{'详细论述。' * 40}</p>" for s in sections) + "\n```"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                server.count("connections")
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.startswith("/replay/"):
+                    return self._replay(unquote(self.path[len("/replay/"):]))
+                match = re.match(r"^/feed/([\w-]+)\.xml", self.path)
+                if not match:
+                    return self._send(404, b"", "text/plain")
+                server.count("feed_requests")
+                time.sleep(server.feed_latency)
+                etag = f'"{match.group(1)}"'
+                if self.headers.get("If-None-Match") == etag:
+                    server.count("not_modified")
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    return self.end_headers()
+                self.send_response(200)
+                body = make_rss(match.group(1), server.feed_items)
+                self.send_header("Content-Type", "application/rss+xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _replay(self, url: str):
+                server.count("feed_requests")
+                time.sleep(server.feed_latency)
+                body = load_fixture(url)
+                server.count("replay_hits" if body is not None else "replay_misses")
+                if body is None:
+                    body = make_rss(fixture_name(url)[:-len(".xml")], server.feed_items)
+                etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    server.count("not_modified")
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    return self.end_headers()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if re.match(r"^/bot[^/]+/sendMessage", self.path):
+                    return self._telegram(payload)
+                server.count("llm_requests")
+                prompt = payload["contents"][0]["parts"][0]["text"]
+                if ":streamGenerateContent" in self.path:
+                    return self._stream(server.llm_reply(prompt))
+                time.sleep(server.llm_latency)
+                reply = {"candidates": [{"content": {"parts": [{"text": server.llm_reply(prompt)}]}}]}
+                self._send(200, json.dumps(reply, ensure_ascii=False).encode("utf-8"), "application/json")
+
+            def _stream(self, text: str):
+                """按 llm_chunks 等分文本，每块之间间隔 llm_latency / llm_chunks 秒 (chunked 编码)。"""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                size = max(1, -(-len(text) // server.llm_chunks))
+                for start in range(0, len(text), size):
+                    time.sleep(server.llm_latency / server.llm_chunks)
+                    chunk = {"candidates": [{"content": {"parts": [{"text": text[start:start + size]}]}}]}
+                    event = f"data: {json.dumps(chunk, ensure_ascii=False)}\r\n\r\n".encode("utf-8")
+                    self.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _telegram(self, payload: dict):
+                time.sleep(server.tg_latency)
+                if len(payload.get("text", "")) > 4096:
+                    body = {"ok": False, "error_code": 400, "description": "Bad Request: message is too long"}
+                    return self._send(400, json.dumps(body).encode("utf-8"), "application/json")
+                if not server.tg_accept(str(payload.get("chat_id")), payload.get("text", "")):
+                    body = {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                            "parameters": {"retry_after": 1}}
+                    return self._send(429, json.dumps(body).encode("utf-8"), "application/json")
+                self._send(200, json.dumps({"ok": True, "result": {}}).encode("utf-8"), "application/json")
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeSMTP:
+    """
+    最小的 SMTP 替身 (不依赖 aiosmtpd)：支持 EHLO / AUTH PLAIN / MAIL / RCPT / DATA / NOOP / QUIT，
+    不支持 STARTTLS (客户端需设置 SMTP_STARTTLS=0)。每次握手 (EHLO) 延迟 handshake_latency 秒。
+    """
+
+    def __init__(self, handshake_latency: float = 0.1):
+        self.handshake_latency = handshake_latency
+        self.stats = {"connections": 0, "messages": 0, "recipients": 0}
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line: str):
+                self.wfile.write(line.encode("ascii") + b"\r\n")
+
+            def handle(self):
+                server.count("connections")
+                self.reply("220 fake.smtp ESMTP")
+                recipients = 0
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode("utf-8", "ignore").strip().upper()
+                    if command.startswith(("EHLO", "HELO")):
+                        time.sleep(server.handshake_latency)
+                        self.wfile.write(b"250-fake.smtp\r\n250-AUTH PLAIN\r\n250 8BITMIME\r\n")
+                    elif command.startswith("AUTH"):
+                        self.reply("235 2.7.0 Authentication successful")
+                    elif command.startswith("RCPT"):
+                        recipients += 1
+                        self.reply("250 OK")
+                    elif command.startswith("DATA"):
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                            pass
+                        server.count("messages")
+                        server.count("recipients", recipients)
+                        recipients = 0
+                        self.reply("250 OK queued")
+                    elif command.startswith("QUIT"):
+                        self.reply("221 Bye")
+                        return
+                    else:  # MAIL / NOOP / RSET
+                        self.reply("250 OK")
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,426 @@
+"""
+端到端离线基准套件：所有数据源由本地替身回放录制的响应，结果按提交保存，便于跨提交对比。
+
+- RSS / Google News：fixtures/http 中录制的 XML，经 FakeServer 的 /replay/ 回放 (出站请求在 transport 层改写)。
+- Yahoo / Akshare：fixtures 中录制的 CSV / JSON，替换 yfinance / akshare 的对应函数。
+- Gemini / Telegram：FakeServer；SMTP：FakeSMTP。各替身的延迟均可配置。
+
+微基准 (单个函数) 与宏基准 (整次 daily_news.main) 每轮都从空缓存开始，报告 p50 / p95 耗时、
+内存峰值 (tracemalloc，单独跑一轮以免影响计时) 与各上游的请求数，结果写入 benchmarks/results/<提交>.json。
+
+用法:
+  python benchmarks/run.py [--repeat 5] [--only rss_cold,digest] [--feed-latency 0.05] ...
+  python benchmarks/run.py --compare benchmarks/results/<旧提交>.json
+  python benchmarks/run.py --record      # 联网重新录制 fixtures (RSS、Yahoo、Akshare)
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tasks", "news"))
+
+import pandas as pd
+
+from fakes import FIXTURE_DIR, FakeServer, FakeSMTP, record_fixture
+
+RESULTS_DIR = os.path.join(HERE, "results")
+SEARCH_QUERIES = ["Embedded Linux Development", "site:caixin.com 政策", "A股收盘"]
+
+
+def git_commit() -> str:
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"], cwd=ROOT) != 0
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{sha}-dirty" if dirty else sha
+
+# --- Data Source Stand-ins ---
+
+class Upstreams:
+    """把 yfinance / akshare 与出站 HTTP 请求指向录制数据，并按上游计数。"""
+
+    def __init__(self, server: FakeServer, market_latency: float):
+        self.server = server
+        self.market_latency = market_latency
+        self.counts = {"yahoo_download": 0, "yahoo_news": 0, "akshare": 0}
+        self.closes = pd.read_csv(os.path.join(FIXTURE_DIR, "yahoo_closes_5d.csv"), index_col="Date", parse_dates=True)
+        with open(os.path.join(FIXTURE_DIR, "yahoo_news.json"), encoding="utf-8") as f:
+            self.news = json.load(f)
+        self.spot = pd.read_csv(os.path.join(FIXTURE_DIR, "akshare_index_spot.csv"), dtype={"代码": str})
+        self.north_flow = pd.read_csv(os.path.join(FIXTURE_DIR, "akshare_north_flow.csv"))
+        self.telegraph = pd.read_csv(os.path.join(FIXTURE_DIR, "akshare_telegraph.csv"))
+
+    def _hit(self, key: str):
+        self.counts[key] += 1
+        time.sleep(self.market_latency)
+
+    def download(self, symbols, start=None, group_by="column", **kwargs):
+        self._hit("yahoo_download")
+        symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+        closes = self.closes.reindex(columns=symbols)
+        if start is not None:
+            closes = closes[closes.index >= pd.Timestamp(start)]
+        if group_by == "ticker":
+            return pd.concat({s: closes[[s]].rename(columns={s: "Close"}) for s in symbols}, axis=1)
+        return pd.concat({"Close": closes}, axis=1)
+
+    def ticker(self, symbol):
+        upstreams = self
+
+        class Ticker:
+            @property
+            def news(self):
+                upstreams._hit("yahoo_news")
+                return upstreams.news
+
+        return Ticker()
+
+    def akshare(self, frame):
+        def call(*args, **kwargs):
+            self._hit("akshare")
+            return frame.copy()
+        return call
+
+    def install(self):
+        import akshare as ak
+        import yfinance as yf
+
+        from mcp_tools import transport
+
+        yf.download = self.download
+        yf.Ticker = self.ticker
+        # 只替换已安装的 akshare 中存在的接口：接口改名 / 下线时基准与线上一样走降级路径
+        for name, frame in (("stock_zh_index_spot_em", self.spot),
+                            ("stock_hsgt_north_net_flow_em", self.north_flow),
+                            ("stock_telegraph_cls", self.telegraph)):
+            if hasattr(ak, name):
+                setattr(ak, name, self.akshare(frame))
+            else:
+                print(f"akshare {ak.__version__} has no {name}, benchmarking the degraded path")
+
+        request = transport.request
+        local = self.server.base_url
+
+        def replaying(method, url, **kwargs):
+            if method == "GET" and not url.startswith(local):
+                url = self.server.replay_url(url)
+            return request(method, url, **kwargs)
+        transport.request = replaying
+
+    def snapshot(self, smtp: FakeSMTP) -> dict:
+        stats = self.server.stats
+        return {
+            "feed": stats["feed_requests"],
+            "feed_304": stats["not_modified"],
+            "replay_miss": stats["replay_misses"],
+            "llm": stats["llm_requests"],
+            "telegram": stats["tg_messages"] + stats["tg_rate_limited"],
+            "smtp_connections": smtp.stats["connections"],
+            "smtp_messages": smtp.stats["messages"],
+            **self.counts,
+        }
+
+
+def configure_env(server: FakeServer, smtp: FakeSMTP, scratch: str):
+    """在导入项目模块之前设置：模块级配置在导入时读取。"""
+    os.environ.update(
+        MCP_CACHE_DIR=os.path.join(scratch, "cache"),
+        DIGEST_PROFILE_DIR=scratch,
+        LLM_BACKEND="gemini", LLM_REPLAY="off",
+        GEMINI_API_KEY="bench", GEMINI_BASE_URL=server.base_url, GEMINI_RPM="6000", GEMINI_BURST="100",
+        TG_API_BASE=server.base_url, TG_TOKEN="bench", CHAT_ID="bench-chat",
+        EMAIL_SENDER="bench@example.com", EMAIL_PASSWORD="secret", EMAIL_RECIPIENTS="reader@example.com",
+        SMTP_SERVER="127.0.0.1", SMTP_PORT=str(smtp.port), SMTP_STARTTLS="0",
+    )
+
+
+def reset_state():
+    """每轮从空缓存 / 空连接池开始。"""
+    from mcp_tools.email import pool
+    from mcp_tools.news import analysis, dedup, market, news_index, tools
+    from mcp_tools.news.feed_cache import FeedCache
+    from mcp_tools.news.market_cache import MarketCache
+    from mcp_tools.telegram import delivery
+
+    def scratch():
+        return Path(tempfile.mkdtemp())
+
+    tools.FEED_CACHE = FeedCache(directory=scratch(), min_refresh=0)
+    market.MARKET_CACHE = tools.MARKET_CACHE = MarketCache(directory=scratch())
+    analysis.ANALYSIS_CACHE = analysis.AnalysisCache(path=scratch() / "analyses.db")
+    dedup.STORY_INDEX = dedup.StoryIndex(path=scratch() / "stories.db")
+    news_index.NEWS_INDEX = news_index.NewsIndex(path=scratch() / "index.db")
+    with delivery._deliveries_lock:
+        delivery._deliveries.clear()
+    pool.close_all()
+
+# --- Benchmarks ---
+
+def check_cn_tier(data: dict) -> dict:
+    """A 股行情必须由 akshare 层给出 (成交额只有该层提供)：单个子请求缺失只能丢失对应字段，不能让整层回退。"""
+    if data.get("total_volume") in (None, "未知"):
+        raise AssertionError(f"akshare tier did not win: {data.get('indices')}")
+    return data
+
+def slow_akshare_hedge(latency: float = 3.0, budget: float = 0.2) -> dict:
+    """akshare 指数快照变慢 (不是失败) 时，对冲启动的 Yahoo 层必须胜出，不能一路降级到搜索层。"""
+    import akshare as ak
+    from mcp_tools.news import tools
+
+    name = "stock_zh_index_spot_em"
+    fast = getattr(ak, name, None)
+
+    def slow(*args, **kwargs):
+        time.sleep(latency)
+        return fast(*args, **kwargs) if fast else None
+
+    saved_budget, tools.CN_MARKET_HEDGE_BUDGET = tools.CN_MARKET_HEDGE_BUDGET, budget
+    setattr(ak, name, slow)
+    start = time.perf_counter()
+    try:
+        data = tools.fetch_cn_market_depth(hedged=True)
+    finally:
+        tools.CN_MARKET_HEDGE_BUDGET = saved_budget
+        if fast is None:
+            delattr(ak, name)
+        else:
+            setattr(ak, name, fast)
+    elapsed = time.perf_counter() - start
+    if any("数据获取失败" in line for line in data.get("indices", [])) or data.get("total_volume") != "未知":
+        raise AssertionError(f"yahoo tier did not win over a slow akshare: {data.get('indices')}")
+    if elapsed >= latency:
+        raise AssertionError(f"hedge waited for the slow akshare call ({elapsed:.2f}s)")
+    return data
+
+def benchmarks() -> dict:
+    """{名称: (准备函数, 被测函数)}；准备函数的返回值作为被测函数的参数，不计入耗时。"""
+    import daily_news
+    from mcp_tools.email.tools import send_email_core
+    from mcp_tools.news import analysis, digest, tools
+    from mcp_tools.telegram.sanitizer import clean_html_for_telegram
+    from mcp_tools.telegram.tools import send_telegram_core
+
+    feed_url = daily_news.TOPICS_CONFIG["AI Focus"]["sources"][0]["url"]
+    with open(os.path.join(FIXTURE_DIR, "telegram_html_corpus.json"), encoding="utf-8") as f:
+        corpus = [case["input"] for case in json.load(f)]
+    report = "".join(f"<p><b>第 {i} 段</b> {'市场分析内容。' * 60}</p>" for i in range(12))
+
+    def warm_feed():
+        reset_state()
+        tools.fetch_rss_news(feed_url)
+
+    def news_groups():
+        reset_state()
+        return {name: daily_news.feed_catalog.fetch_sources(config) for name, config in daily_news.TOPICS_CONFIG.items()
+                if config["type"] == "rss"}
+
+    def analyzed_groups():
+        groups = news_groups()
+        for name, analyses in analysis.analyze_batch(groups).items():
+            for item, text in zip(groups[name], analyses):
+                item["analysis"] = text
+        return groups
+
+    def render_digest(groups):
+        # 10 份主题副本，模拟几十个主题的日报
+        document = digest.Digest("Bench Digest", "2024-01-01 08:00")
+        for copy in range(10):
+            for name, items in groups.items():
+                document.add_items(f"{name} {copy}", items)
+        messages = [message for section in document.sections for message in digest.telegram_messages(section)]
+        return digest.render_email(document), messages
+
+    def indexed_digest():
+        reset_state()
+        with contextlib.redirect_stdout(io.StringIO()):
+            daily_news.main(state=daily_news.RunState(path=Path(tempfile.mkdtemp()) / "state.db"))
+
+    def digest_state():
+        reset_state()
+        return daily_news.RunState(path=Path(tempfile.mkdtemp()) / "state.db")
+
+    return {
+        "rss_cold": (reset_state, lambda _: tools.fetch_rss_news(feed_url)),
+        "rss_revalidate": (warm_feed, lambda _: tools.fetch_rss_news(feed_url)),
+        "google_news": (reset_state, lambda _: tools.fetch_google_news(SEARCH_QUERIES[0], count=10)),
+        "us_market": (reset_state, lambda _: tools.fetch_us_market_depth()),
+        "cn_market": (reset_state, lambda _: check_cn_tier(tools.fetch_cn_market_depth())),
+        "cn_market_hedge": (reset_state, lambda _: slow_akshare_hedge()),
+        "sanitize_corpus": (lambda: None, lambda _: [clean_html_for_telegram(text) for text in corpus * 20]),
+        "digest_render": (analyzed_groups, render_digest),
+        "analyze_batch": (news_groups, lambda groups: analysis.analyze_batch(groups)),
+        "telegram_send": (reset_state, lambda _: send_telegram_core(report)),
+        "email_send": (reset_state, lambda _: send_email_core("Bench Digest", report)),
+        "news_sequential": (reset_state, lambda _: [tools.fetch_news_tool(query) for query in SEARCH_QUERIES]),
+        "news_batch": (reset_state, lambda _: tools.fetch_news_batch_tool(SEARCH_QUERIES)),
+        "search_index": (indexed_digest, lambda _: tools.search_news_tool("Linux", hours=24)),
+        "digest": (digest_state, lambda state: daily_news.main(state=state)),
+    }
+
+
+def percentile(samples: list, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def measure(setup, call, repeat: int, upstreams: Upstreams, smtp: FakeSMTP, quiet: bool) -> dict:
+    output = contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+    timings = []
+    requests = {}
+    with output:
+        for _ in range(repeat):
+            arg = setup()
+            before = upstreams.snapshot(smtp)
+            start = time.perf_counter()
+            call(arg)
+            timings.append(time.perf_counter() - start)
+            after = upstreams.snapshot(smtp)
+            for key, value in after.items():
+                requests[key] = requests.get(key, 0) + value - before[key]
+
+        # 内存峰值单独测一轮，tracemalloc 会拖慢计时
+        arg = setup()
+        tracemalloc.start()
+        try:
+            call(arg)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {
+        "p50": round(statistics.median(timings), 4),
+        "p95": round(percentile(timings, 0.95), 4),
+        "min": round(min(timings), 4),
+        "peak_mib": round(peak / 2 ** 20, 2),
+        # 每轮平均请求数
+        "requests": {key: round(value / repeat, 2) for key, value in requests.items() if value},
+    }
+
+
+def compare(results: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline['commit']} ({baseline_path}):")
+    for name, result in results.items():
+        old = baseline["results"].get(name)
+        if not old:
+            continue
+        delta = (result["p50"] - old["p50"]) / old["p50"] * 100 if old["p50"] else 0.0
+        print(f"  {name:16s} p50 {old['p50'] * 1000:9.1f}ms -> {result['p50'] * 1000:9.1f}ms  ({delta:+6.1f}%)  "
+              f"peak {old['peak_mib']:7.2f} -> {result['peak_mib']:7.2f} MiB")
+
+# --- Recording ---
+
+def record():
+    """联网抓取真实响应，覆盖 fixtures (发布时间改写为相对录制时刻的偏移)。"""
+    from urllib.parse import quote
+
+    import akshare as ak
+    import yfinance as yf
+
+    import daily_news
+    from mcp_tools import transport
+
+    urls = [s["url"] for c in daily_news.TOPICS_CONFIG.values() if c["type"] == "rss" for s in c["sources"]]
+    urls += ["http://www.gov.cn/rss/zhengce.xml", "http://www.news.cn/rss/politics.xml"]
+    urls += [f"https://news.google.com/rss/search?q={quote(q)}+when:1d&hl=en-US&gl=US&ceid=US:en" for q in SEARCH_QUERIES]
+    for url in urls:
+        try:
+            response = transport.get(url, timeout=30)
+            response.raise_for_status()
+            print(f"recorded {record_fixture(url, response.content)}")
+        except Exception as e:
+            print(f"Error recording {url}: {e}")
+
+    from mcp_tools.news import market
+
+    symbols = list(market.US_INDICES.values()) + list(market.US_SECTORS.values()) + list(market.CN_INDICES_YF.values())
+    frame = yf.download(symbols, period="5d", auto_adjust=True, progress=False, group_by="column")["Close"]
+    frame.index.name = "Date"
+    frame.round(2).to_csv(os.path.join(FIXTURE_DIR, "yahoo_closes_5d.csv"))
+    with open(os.path.join(FIXTURE_DIR, "yahoo_news.json"), "w", encoding="utf-8") as f:
+        json.dump(yf.Ticker("^GSPC").news[:10], f, ensure_ascii=False, indent=1, default=str)
+    for name, trim, fixture in (("stock_zh_index_spot_em", lambda fn: fn(symbol="沪深重要指数"), "akshare_index_spot.csv"),
+                                ("stock_hsgt_north_net_flow_em", lambda fn: fn(symbol="北上").tail(5), "akshare_north_flow.csv"),
+                                ("stock_telegraph_cls", lambda fn: fn().head(15), "akshare_telegraph.csv")):
+        if not hasattr(ak, name):
+            print(f"akshare {ak.__version__} has no {name}, keeping {fixture}")
+            continue
+        trim(getattr(ak, name)).to_csv(os.path.join(FIXTURE_DIR, fixture), index=False)
+    print(f"recorded market fixtures in {FIXTURE_DIR}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", help="逗号分隔的基准名称")
+    parser.add_argument("--feed-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--tg-latency", type=float, default=0.02)
+    parser.add_argument("--smtp-latency", type=float, default=0.1, help="SMTP 握手 (EHLO) 延迟")
+    parser.add_argument("--market-latency", type=float, default=0.2, help="Yahoo / Akshare 每次调用的延迟")
+    parser.add_argument("--compare", help="对比的基线结果 JSON")
+    parser.add_argument("--output", help="结果文件 (默认 benchmarks/results/<提交>.json)")
+    parser.add_argument("--record", action="store_true", help="联网重新录制 fixtures 后退出")
+    parser.add_argument("--verbose", action="store_true", help="显示被测函数的输出")
+    args = parser.parse_args()
+
+    if args.record:
+        return record()
+
+    scratch = tempfile.mkdtemp()
+    with FakeServer(feed_latency=args.feed_latency, llm_latency=args.llm_latency, tg_latency=args.tg_latency,
+                    tg_chat_limit=1000) as server, FakeSMTP(handshake_latency=args.smtp_latency) as smtp:
+        configure_env(server, smtp, scratch)
+        upstreams = Upstreams(server, args.market_latency)
+        upstreams.install()
+
+        suite = benchmarks()
+        names = args.only.split(",") if args.only else list(suite)
+        unknown = [name for name in names if name not in suite]
+        if unknown:
+            parser.error(f"unknown benchmark(s): {', '.join(unknown)}; available: {', '.join(suite)}")
+
+        results = {}
+        print(f"{'benchmark':16s} {'p50':>9s} {'p95':>9s} {'peak':>9s}  requests/run")
+        for name in names:
+            setup, call = suite[name]
+            result = results[name] = measure(setup, call, args.repeat, upstreams, smtp, quiet=not args.verbose)
+            counts = " ".join(f"{k}={v:g}" for k, v in result["requests"].items())
+            print(f"{name:16s} {result['p50'] * 1000:7.1f}ms {result['p95'] * 1000:7.1f}ms "
+                  f"{result['peak_mib']:6.2f}MiB  {counts}")
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("compare", "output", "record", "verbose")},
+        "results": results,
+    }
+    path = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    print(f"results written to {path}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,14 @@
 from fastmcp import FastMCP
 
 # Import your tool modules here
-from mcp_tools import news, telegram, email
+# 工具包只声明签名，重型实现在首次调用时才导入 (见 mcp_tools/registry.py)
+from mcp_tools import news, telegram, email, scheduler, registry
 
 # Initialize FastMCP server
 mcp = FastMCP("Unified MCP Tools Server")
 
 # 自动注册所有模块的工具
-modules_to_load = [news, telegram, email]
+modules_to_load = [news, telegram, email, scheduler]
 
 for module in modules_to_load:
     if hasattr(module, "MCP_TOOLS"):
@@ -16,5 +17,15 @@ for module in modules_to_load:
             mcp.tool()(tool_func)
             print(f"Registered tool: {tool_func.__name__} from {module.__name__}")
 
+if registry.EAGER_TOOLS:
+    registry.load_all()
+elif registry.TOOL_WARMUP:
+    registry.warmup()
+
+# 定时任务与 MCP 工具共享同一进程：模块、连接池与缓存在两者之间都保持温热
+if scheduler.SCHEDULER_ENABLED:
+    from mcp_tools.scheduler import service
+    service.start(quiet_stdout=True)
+
 if __name__ == "__main__":
-    mcp.run()
\ No newline at end of file
+    mcp.run()
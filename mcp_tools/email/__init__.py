@@ -1,3 +1,25 @@
-from .tools import send_email_tool
+from mcp_tools.registry import lazy_tool
 
-MCP_TOOLS = [send_email_tool]
+@lazy_tool("mcp_tools.email.tools", limit=4, timeout=120)
+def send_email_tool(subject: str, content: str, recipient: str = None) -> str:
+    """
+    发送邮件给指定收件人（或默认列表）。
+    
+    Args:
+        subject: 邮件标题。
+        content: 邮件正文内容（支持简单 HTML）。
+        recipient: (可选) 单个收件人邮箱地址。如果不填，则发送给系统配置的默认收件人列表。
+    """
+
+@lazy_tool("mcp_tools.email.tools", limit=2, timeout=600)
+def send_bulk_email_tool(subject: str, content: str, recipients: list) -> str:
+    """
+    给多个收件人分别发送同一封邮件（每人单独一封，互相看不到其他收件人）。
+    
+    Args:
+        subject: 邮件标题。
+        content: 邮件正文内容（支持简单 HTML）。可使用 $email 代表当前收件人地址。
+        recipients: 收件人邮箱地址列表。
+    """
+
+MCP_TOOLS = [send_email_tool, send_bulk_email_tool]
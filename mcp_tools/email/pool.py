@@ -0,0 +1,183 @@
+"""
+SMTP 连接池。
+
+- 已认证的连接 (STARTTLS + login 之后) 放回池中复用，握手只付一次。
+- 空闲超过 SMTP_IDLE_TIMEOUT 的连接在取出时先用 NOOP 探测，失效则重连；
+  发送途中服务器断开时自动重连并重试一次。
+- send_bulk 把大量独立邮件 (逐个收件人 / 模板渲染) 分摊到少量连接上并发发送。
+"""
+import atexit
+import os
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from mcp_tools import tracing
+
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 3))
+# 多数服务器在 1~5 分钟无操作后断开，超过该时间的连接在复用前先探测
+SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", 60))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", 30))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") != "0"
+
+
+class SMTPPool:
+    def __init__(self, host: str, port: int, user: str, password: str, size: int = SMTP_POOL_SIZE,
+                 idle_timeout: float = SMTP_IDLE_TIMEOUT, starttls: bool = SMTP_STARTTLS):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = max(1, size)
+        self.idle_timeout = idle_timeout
+        self.starttls = starttls
+        self._idle = []  # [(连接, 归还时间)]
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self.stats = {"connects": 0, "reused": 0, "reconnects": 0, "sent": 0, "failed": 0}
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    @tracing.traced("smtp.connect")
+    def _connect(self) -> smtplib.SMTP:
+        if self.port == 465:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=SMTP_TIMEOUT)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+            if self.starttls:
+                server.starttls()
+        if self.password:
+            server.login(self.user, self.password)
+        self._count("connects")
+        return server
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _alive(self, server) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _checkout(self) -> smtplib.SMTP:
+        with self._lock:
+            server, released = self._idle.pop() if self._idle else (None, 0)
+        if server is None:
+            return self._connect()
+        if time.monotonic() - released > self.idle_timeout and not self._alive(server):
+            self._close(server)
+            self._count("reconnects")
+            return self._connect()
+        self._count("reused")
+        return server
+
+    @contextmanager
+    def connection(self):
+        """取出一个已认证的连接，用完后放回池中 (出错的连接直接丢弃)。"""
+        self._slots.acquire()
+        server = None
+        try:
+            server = self._checkout()
+            yield server
+        except Exception:
+            if server is not None:
+                self._close(server)
+                server = None
+            raise
+        finally:
+            if server is not None:
+                with self._lock:
+                    self._idle.append((server, time.monotonic()))
+            self._slots.release()
+
+    def send(self, from_addr: str, to_addrs: list, message: str) -> bool:
+        """
+        发送一封已序列化的邮件。连接被服务器断开时重连并重试一次。
+        """
+        with tracing.span("smtp.send", recipients=len(to_addrs), bytes=len(message)) as span:
+            for attempt in range(2):
+                try:
+                    with self.connection() as server:
+                        server.sendmail(from_addr, to_addrs, message)
+                    self._count("sent")
+                    return True
+                except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                    if attempt == 0:
+                        self._count("reconnects")
+                        span.add("reconnects")
+                        continue
+                    print(f"Error sending email: {e}")
+                    tracing.record_error(e)
+                except Exception as e:
+                    print(f"Error sending email: {e}")
+                    tracing.record_error(e)
+                    break
+            self._count("failed")
+            return False
+
+    def send_bulk(self, from_addr: str, messages: list) -> list:
+        """
+        批量发送。
+
+        Args:
+            from_addr: 发件人
+            messages: [(收件人列表, 已序列化邮件), ...]
+
+        Returns:
+            与 messages 一一对应的 bool 列表。
+        """
+        if not messages:
+            return []
+        workers = min(self.size, len(messages))
+        # 每个线程占用一个连接，顺序发送分到的邮件
+        shards = [list(range(i, len(messages), workers)) for i in range(workers)]
+        results = [False] * len(messages)
+
+        def run(indexes):
+            for index in indexes:
+                to_addrs, message = messages[index]
+                results[index] = self.send(from_addr, to_addrs, message)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="smtp") as executor:
+            list(executor.map(tracing.wrap(run), shards))
+        return results
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self._close(server)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(host: str, port: int, user: str, password: str) -> SMTPPool:
+    key = (host, port, user)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.password != password:
+            pool = _pools[key] = SMTPPool(host, port, user, password)
+        return pool
+
+
+@atexit.register
+def close_all():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
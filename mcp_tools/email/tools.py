@@ -1,16 +1,50 @@
 import os
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from string import Template
 from dotenv import load_dotenv
+from mcp_tools.email.pool import get_pool
 
 load_dotenv()
 
 # --- Core Logic (For Scripts) ---
 
+def _load_config() -> dict:
+    """读取 SMTP 配置，缺失或仍为默认值时返回 None。"""
+    sender = os.getenv("EMAIL_SENDER")
+    password = os.getenv("EMAIL_PASSWORD")
+    if not sender or not password:
+        print("Error: Email configuration (SENDER, PASSWORD, RECIPIENTS) missing.")
+        return None
+    if sender == "YOUR_EMAIL@gmail.com":
+        print("Error: Default email configuration detected. Please configure .env.")
+        return None
+    return {
+        "sender": sender,
+        "password": password,
+        "smtp_server": os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+        "smtp_port": int(os.getenv("SMTP_PORT", 587)),
+    }
+
+def _default_recipients() -> list:
+    recipients_str = os.getenv("EMAIL_RECIPIENTS", "")
+    return [r.strip() for r in recipients_str.split(",") if r.strip()]
+
+def _build_message(sender: str, to_addrs: list, subject: str, body: str, is_html: bool) -> str:
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = ", ".join(to_addrs)
+    msg['Subject'] = subject
+
+    msg.attach(MIMEText(body, 'html' if is_html else 'plain'))
+    return msg.as_string()
+
+def _pool(config: dict):
+    return get_pool(config["smtp_server"], config["smtp_port"], config["sender"], config["password"])
+
 def send_email_core(subject: str, body: str, to_addrs: list = None, is_html: bool = True) -> bool:
     """
-    发送邮件的核心逻辑。
+    发送邮件的核心逻辑。连接来自进程内的 SMTP 连接池，多次调用只握手/登录一次。
     
     Args:
         subject: 邮件标题
@@ -18,49 +52,61 @@ def send_email_core(subject: str, body: str, to_addrs: list = None, is_html: boo
         to_addrs: 收件人列表 (如果不传，则读取环境变量 EMAIL_RECIPIENTS)
         is_html: 是否为 HTML 格式
     """
-    # Load config
-    sender = os.getenv("EMAIL_SENDER")
-    password = os.getenv("EMAIL_PASSWORD")
-    smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", 587))
-    
+    config = _load_config()
     # Default recipients
     if to_addrs is None:
-        recipients_str = os.getenv("EMAIL_RECIPIENTS", "")
-        if recipients_str:
-            to_addrs = [r.strip() for r in recipients_str.split(",")]
-        else:
-            to_addrs = []
+        to_addrs = _default_recipients()
 
-    if not sender or not password or not to_addrs:
-        print("Error: Email configuration (SENDER, PASSWORD, RECIPIENTS) missing.")
+    if not config:
         return False
-        
-    if sender == "YOUR_EMAIL@gmail.com":
-        print("Error: Default email configuration detected. Please configure .env.")
+    if not to_addrs:
+        print("Error: Email configuration (SENDER, PASSWORD, RECIPIENTS) missing.")
         return False
 
-    msg = MIMEMultipart()
-    msg['From'] = sender
-    msg['To'] = ", ".join(to_addrs)
-    msg['Subject'] = subject
+    message = _build_message(config["sender"], to_addrs, subject, body, is_html)
+    return _pool(config).send(config["sender"], to_addrs, message)
 
-    msg.attach(MIMEText(body, 'html' if is_html else 'plain'))
+def send_bulk_email_core(subject: str, body: str, recipients: list = None, is_html: bool = True) -> dict:
+    """
+    逐个收件人发送 (每人一封独立邮件)，复用连接池中的少量连接并发投递。
 
-    try:
-        if smtp_port == 465:
-            server = smtplib.SMTP_SSL(smtp_server, smtp_port)
-        else:
-            server = smtplib.SMTP(smtp_server, smtp_port)
-            server.starttls()
-            
-        server.login(sender, password)
-        server.sendmail(sender, to_addrs, msg.as_string())
-        server.quit()
-        return True
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
+    Args:
+        subject: 邮件标题模板
+        body: 邮件内容模板
+        recipients: 收件人列表，元素为邮箱地址，或 {"email": 地址, 其他模板变量...}
+                    (如果不传，则读取环境变量 EMAIL_RECIPIENTS)
+        is_html: 是否为 HTML 格式
+
+    subject / body 中的 $name 形式变量按收件人替换 (string.Template，缺失的变量保持原样)，
+    $email 始终可用。
+
+    Returns:
+        {邮箱地址: 是否成功}
+    """
+    config = _load_config()
+    if recipients is None:
+        recipients = _default_recipients()
+
+    if not config:
+        return {}
+    if not recipients:
+        print("Error: Email configuration (SENDER, PASSWORD, RECIPIENTS) missing.")
+        return {}
+
+    subject_tpl, body_tpl = Template(subject), Template(body)
+    addresses, messages = [], []
+    for recipient in recipients:
+        fields = dict(recipient) if isinstance(recipient, dict) else {"email": recipient}
+        address = fields["email"]
+        message = _build_message(
+            config["sender"], [address],
+            subject_tpl.safe_substitute(fields), body_tpl.safe_substitute(fields), is_html,
+        )
+        addresses.append(address)
+        messages.append(([address], message))
+
+    results = _pool(config).send_bulk(config["sender"], messages)
+    return dict(zip(addresses, results))
 
 # --- MCP Interface (For LLM Agent) ---
 
@@ -82,3 +128,21 @@ def send_email_tool(subject: str, content: str, recipient: str = None) -> str:
         return f"邮件 '{subject}' 已成功发送给 {target}。"
     else:
         return "邮件发送失败，请检查服务器日志或配置。"
+
+def send_bulk_email_tool(subject: str, content: str, recipients: list) -> str:
+    """
+    给多个收件人分别发送同一封邮件（每人单独一封，互相看不到其他收件人）。
+    
+    Args:
+        subject: 邮件标题。
+        content: 邮件正文内容（支持简单 HTML）。可使用 $email 代表当前收件人地址。
+        recipients: 收件人邮箱地址列表。
+    """
+    results = send_bulk_email_core(subject, content, recipients=recipients, is_html=True)
+    if not results:
+        return "邮件发送失败，请检查服务器日志或配置。"
+
+    failed = [addr for addr, ok in results.items() if not ok]
+    if not failed:
+        return f"邮件 '{subject}' 已成功发送给 {len(results)} 位收件人。"
+    return f"邮件 '{subject}' 发送给 {len(results) - len(failed)}/{len(results)} 位收件人，失败: {', '.join(failed)}"
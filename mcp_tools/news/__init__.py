@@ -1,3 +1,34 @@
-from .tools import fetch_news_tool
+from mcp_tools.registry import lazy_tool
 
-MCP_TOOLS = [fetch_news_tool]
+# 实现依赖 akshare / yfinance / pandas，首次调用时才导入；阻塞实现在线程池中运行 (见 mcp_tools/registry.py)
+
+@lazy_tool("mcp_tools.news.tools", limit=4, timeout=300)
+def fetch_news_tool(query: str, count: int = 5) -> str:
+    ...
+
+@lazy_tool("mcp_tools.news.tools", limit=4, timeout=300)
+def fetch_news_batch_tool(queries: list, count: int = 5, hours: int = 24) -> str:
+    """
+    一次获取多个关键词的新闻简报：并发抓取、跨关键词去重，并合并为一次 AI 分析。
+    每个关键词的结果就绪后会先作为进度通知推送，最终返回按关键词分组的全部结果。
+
+    Args:
+        queries: 关键词列表，元素可以是字符串，或 {"query": "关键词", "count": 条数}。
+        count: 未单独指定条数的关键词返回的新闻条数，默认 5。
+        hours: 只返回最近多少小时内的新闻，默认 24。
+    """
+
+@lazy_tool("mcp_tools.news.tools", limit=8, timeout=300)
+def search_news_tool(query: str, hours: int = 24, count: int = 10, topic: str = None) -> str:
+    """
+    检索最近的新闻：优先查本地全文索引 (每日简报与新闻工具已抓取并分析过的条目)，毫秒级返回；
+    索引在时间范围内没有命中时才联网搜索 Google News。
+
+    Args:
+        query: 关键词，空格分隔表示同时包含 (支持中文子串)。
+        hours: 只返回最近多少小时内的新闻，默认 24。
+        count: 最多返回条数，默认 10。
+        topic: (可选) 只查每日简报中的某个主题，例如 "AI Focus"；指定后不会联网。
+    """
+
+MCP_TOOLS = [fetch_news_tool, fetch_news_batch_tool, search_news_tool]
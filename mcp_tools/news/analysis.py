@@ -0,0 +1,216 @@
+"""
+批量新闻分析引擎。
+
+- 把多个主题的标题按条数 / 字符数打包成少量 LLM 请求 (后端见 llm.py)。
+- 每条标题带稳定 ID，响应按 ID 回填，而不是按列表位置。
+- 单条分析结果按 (规范化标题, 分类, prompt 版本) 做内容寻址缓存，支持 TTL 与 LRU 淘汰。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+from mcp_tools import tracing
+from mcp_tools.news import llm
+from mcp_tools.storage import cache_dir
+
+PROMPT_VERSION = "v2"
+BATCH_MAX_ITEMS = int(os.getenv("ANALYSIS_BATCH_ITEMS", 40))
+BATCH_MAX_CHARS = int(os.getenv("ANALYSIS_BATCH_CHARS", 6000))
+BATCH_WORKERS = int(os.getenv("ANALYSIS_BATCH_WORKERS", 4))
+CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", 7 * 24 * 3600))
+CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX", 20000))
+
+UNAVAILABLE = "AI 分析暂时不可用"
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", title or "").lower().split())
+
+
+def analysis_key(title: str, category: str) -> str:
+    raw = f"{PROMPT_VERSION}\x1f{category}\x1f{normalize_title(title)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """SQLite 持久化的分析结果缓存，按最近访问时间做 LRU 淘汰。"""
+
+    def __init__(self, path=None, ttl: int = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            path = self.path or cache_dir("analysis") / "analyses.db"
+            self._conn = sqlite3.connect(str(path), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                "key TEXT PRIMARY KEY, analysis TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_accessed ON analyses(accessed)")
+        return self._conn
+
+    def get_many(self, keys) -> dict:
+        keys = list(set(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        with self._lock:
+            db = self._db()
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = db.execute(
+                    f"SELECT key, analysis FROM analyses WHERE key IN ({marks}) AND created >= ?",
+                    (*chunk, now - self.ttl),
+                ).fetchall()
+                found.update(rows)
+            if found:
+                db.executemany("UPDATE analyses SET accessed = ? WHERE key = ?", [(now, k) for k in found])
+                db.commit()
+        return found
+
+    def put_many(self, results: dict):
+        if not results:
+            return
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.executemany(
+                "INSERT OR REPLACE INTO analyses (key, analysis, created, accessed) VALUES (?, ?, ?, ?)",
+                [(k, v, now, now) for k, v in results.items()],
+            )
+            db.execute("DELETE FROM analyses WHERE created < ?", (now - self.ttl,))
+            db.execute(
+                "DELETE FROM analyses WHERE key IN ("
+                "SELECT key FROM analyses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            db.commit()
+
+
+ANALYSIS_CACHE = AnalysisCache()
+
+
+def pack_batches(pending: list, max_items: int = BATCH_MAX_ITEMS, max_chars: int = BATCH_MAX_CHARS) -> list:
+    """把 (id, category, title) 列表切分为受条数和字符数约束的批次。"""
+    batches, current, size = [], [], 0
+    for entry in pending:
+        length = len(entry[1]) + len(entry[2]) + 16
+        if current and (len(current) >= max_items or size + length > max_chars):
+            batches.append(current)
+            current, size = [], 0
+        current.append(entry)
+        size += length
+    if current:
+        batches.append(current)
+    return batches
+
+
+def build_prompt(batch: list) -> str:
+    lines = "\n".join(f"[{item_id}] ({category}) {title}" for item_id, category, title in batch)
+    return (
+        "Analyze each of these news headlines from the last 24h in Chinese (Simplified), "
+        "taking its category (in parentheses) into account. 3-5 sentences each. "
+        'Return a JSON array of objects {"id": "<id in brackets>", "analysis": "<text>"}, '
+        "exactly one object per headline.\n\n" + lines
+    )
+
+
+def parse_response(content: str) -> dict:
+    """解析模型返回的 JSON，得到 {id: analysis}。"""
+    data = json.loads(content.replace("```json", "").replace("```", "").strip())
+    if isinstance(data, dict):
+        data = data.get("items") or data.get("results") or [{"id": k, "analysis": v} for k, v in data.items()]
+    results = {}
+    for entry in data:
+        if isinstance(entry, dict) and entry.get("id") and entry.get("analysis"):
+            results[str(entry["id"]).strip("[] ")] = str(entry["analysis"])
+    return results
+
+
+def request_batch(batch: list) -> dict:
+    backend = llm.get_backend()
+    with tracing.span("llm.batch", items=len(batch)) as span:
+        try:
+            results = parse_response(backend.generate(build_prompt(batch), json_mode=True, timeout=60))
+            span.set(parsed=len(results))
+            return results
+        except Exception as e:
+            print(f"LLM batch error ({backend.name}): {e}")
+            tracing.record_error(e)
+        return {}
+
+
+def run_batches(pending: list, max_items: int = BATCH_MAX_ITEMS) -> dict:
+    batches = pack_batches(pending, max_items=max_items)
+    results = {}
+    if not batches:
+        return results
+    with ThreadPoolExecutor(max_workers=min(BATCH_WORKERS, len(batches))) as pool:
+        for partial in pool.map(tracing.wrap(request_batch), batches):
+            results.update(partial)
+    return results
+
+
+def analyze_batch(groups: dict, cache: AnalysisCache = None) -> dict:
+    """
+    批量分析多个主题。
+
+    Args:
+        groups: {分类名: [news_item, ...]}，news_item 至少包含 title
+        cache: 结果缓存 (默认使用全局 ANALYSIS_CACHE)
+
+    Returns:
+        {分类名: [analysis, ...]}，与输入条目一一对应。
+    """
+    if not llm.get_backend().available:
+        return {category: ["AI Key 未配置"] * len(items) for category, items in groups.items()}
+    cache = cache or ANALYSIS_CACHE
+
+    with tracing.span("llm.analyze", groups=len(groups), items=sum(len(items) for items in groups.values())) as span:
+        return _analyze_batch(groups, cache, span)
+
+
+def _analyze_batch(groups: dict, cache: AnalysisCache, span) -> dict:
+    keys = {category: [analysis_key(item.get('title', ''), category) for item in items] for category, items in groups.items()}
+    try:
+        known = cache.get_many(k for ks in keys.values() for k in ks)
+    except sqlite3.Error as e:
+        print(f"Analysis cache unavailable: {e}")
+        known = {}
+
+    # 未命中缓存的标题，相同 key 只请求一次；ID 取 key 前缀，保证在批次内稳定唯一
+    pending = {}
+    for category, items in groups.items():
+        for item, key in zip(items, keys[category]):
+            if key not in known and key not in pending:
+                pending[key] = (key[:12], category, item.get('title', ''))
+    span.set(cache_hits=len(known), cache_misses=len(pending))
+
+    fresh = {}
+    if pending:
+        by_id = {entry[0]: key for key, entry in pending.items()}
+        results = run_batches(list(pending.values()))
+        # 模型漏掉的条目用更小的批次补一次
+        missing = [pending[key] for item_id, key in by_id.items() if item_id not in results]
+        if missing:
+            span.set(retried=len(missing))
+            results.update(run_batches(missing, max_items=max(1, BATCH_MAX_ITEMS // 4)))
+        fresh = {by_id[item_id]: analysis for item_id, analysis in results.items() if item_id in by_id}
+        try:
+            cache.put_many(fresh)
+        except sqlite3.Error as e:
+            print(f"Analysis cache unavailable: {e}")
+
+    known.update(fresh)
+    return {category: [known.get(key, UNAVAILABLE) for key in ks] for category, ks in keys.items()}
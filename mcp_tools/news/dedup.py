@@ -0,0 +1,299 @@
+"""
+跨来源新闻去重。
+
+1. URL 规范化：解开 Google News 跳转链接、去掉 utm_* 等跟踪参数、统一协议与主机名。
+2. 近似重复：标题 (及摘要) 取中文二字组与英文单词作为 shingle，
+   用 MinHash 签名 + LSH 分桶找出候选，再按估计的 Jaccard 相似度判定同一事件。
+   两条都有摘要时再比较 "标题 + 摘要" 的签名 (改写了标题、摘要相同的转载)，取两者中较高的相似度。
+   标题中的数字 / 版本号 (24.0.1、Q2、5%) 必须相容 (一方是另一方的子集)，
+   "Mesa 24.0.1 发布" 与 "Mesa 24.0.2 发布" 不会被当成同一事件；
+   shingle 少于 DEDUP_MIN_SHINGLES 个的短标题只按 URL 去重。
+3. 跨运行记忆：已推送过的事件 (URL + 签名) 存入 SQLite，保留 DEDUP_HISTORY_DAYS 天，
+   次日同一事件换了来源或链接也会被压制。
+
+被去掉的条目连同它匹配到的条目一起打印，便于排查误合并。
+"""
+import base64
+import hashlib
+import html
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+
+from mcp_tools import tracing
+from mcp_tools.storage import cache_dir
+
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", 0.6))
+DEDUP_HISTORY_DAYS = float(os.getenv("DEDUP_HISTORY_DAYS", 2))
+DEDUP_MIN_SHINGLES = int(os.getenv("DEDUP_MIN_SHINGLES", 3))
+# 参与比较的摘要长度 (字符)
+SUMMARY_CHARS = 300
+
+NUM_PERM = 64
+BANDS = 16  # 16 段 x 4 行：相似度 0.6 以上的标题约 90% 落入同一桶
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 32) - 5  # 小于 2^32 的最大素数
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, _PRIME, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, _PRIME, size=NUM_PERM, dtype=np.uint64)
+
+# --- URL Canonicalization ---
+
+TRACKING_PARAMS = frozenset([
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "spm", "scm", "ref", "ref_src", "from", "share_from", "oc", "cmpid", "ncid", "ocid", "smid",
+])
+_GOOGLE_NEWS_PATH = re.compile(r"^/(?:rss/)?articles/([A-Za-z0-9_-]+)")
+
+
+def _unwrap_google_news(article_id: str) -> str:
+    """
+    旧版 Google News 文章 ID 是 base64 编码的 protobuf，字段 4 (tag 0x22) 即原始 URL。
+    新版 ID 需要请求 Google 才能解析，无法离线解开时返回空串。
+    """
+    try:
+        data = base64.urlsafe_b64decode(article_id + "=" * (-len(article_id) % 4))
+    except ValueError:
+        return ""
+    pos = data.find(b"\x22")
+    if pos < 0:
+        return ""
+    pos += 1
+    length, shift = 0, 0
+    while pos < len(data):
+        byte = data[pos]
+        pos += 1
+        length |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            break
+    url = data[pos:pos + length].decode("utf-8", "ignore")
+    return url if url.startswith(("http://", "https://")) else ""
+
+
+def canonical_url(url: str) -> str:
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+
+    if host == "news.google.com":
+        match = _GOOGLE_NEWS_PATH.match(parts.path)
+        target = _unwrap_google_news(match.group(1)) if match else ""
+        if target:
+            return canonical_url(target)
+        # 无法解开时以文章 ID 作为身份，丢弃 oc= 等参数
+        return f"news.google.com{parts.path}"
+    if host.endswith("google.com") and parts.path == "/url":
+        params = dict(parse_qsl(parts.query))
+        target = params.get("url") or params.get("q")
+        if target:
+            return canonical_url(target)
+
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    # 协议不参与身份：同一篇文章常同时出现 http 与 https 链接
+    return urlunsplit(("", host, path, urlencode(query), "")).lstrip("/")
+
+# --- Shingling / MinHash ---
+
+_PUBLISHER_SUFFIX = re.compile(r"\s+[-–—|]\s+[^-–—|]{1,40}$")
+_CJK_RUN = re.compile(r"[㐀-鿿豈-﫿]+")
+_WORD = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset("a an the of on in to for and or is are was at by with from as its it s".split())
+_NUMBER = re.compile(r"[a-z]*\d+(?:[.,:/-]\d+)*[a-z%]*")
+_HTML_TAG = re.compile(r"<[^>]+>")
+
+
+def _stem(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def _normalize(title: str) -> str:
+    # Google News 标题末尾带 " - 来源"，不同来源的同一事件因此不一致
+    return unicodedata.normalize("NFKC", _PUBLISHER_SUFFIX.sub("", title or "")).lower()
+
+
+def numbers(title: str) -> frozenset:
+    """标题中含数字的词 (版本号、季度、百分比、金额等)。"""
+    return frozenset(_NUMBER.findall(_normalize(title)))
+
+
+def compatible(a: frozenset, b: frozenset) -> bool:
+    """数字相容：一方是另一方的子集 (补充了细节)；改动了某个数字视为不同事件。"""
+    return a <= b or b <= a
+
+
+def summary_text(summary: str) -> str:
+    return html.unescape(_HTML_TAG.sub(" ", summary or ""))[:SUMMARY_CHARS]
+
+
+def shingles(title: str) -> set:
+    """
+    标题特征集合：中文取相邻二字组，英文等取去停用词、去复数后的单词。
+    """
+    text = _normalize(title)
+    features = set()
+    for run in _CJK_RUN.findall(text):
+        if len(run) > 1:
+            features.update(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            features.add(run)
+    features.update(_stem(w) for w in _WORD.findall(_CJK_RUN.sub(" ", text)) if w not in STOPWORDS)
+    return features
+
+
+def minhash(features: set) -> np.ndarray:
+    if not features:
+        return np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    hashed = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=4).digest(), "little") for f in features),
+        dtype=np.uint64, count=len(features),
+    )
+    # (a * h + b) mod p：a, b, h 均小于 2^32，乘积不会溢出 uint64；p 必须小于 h 的取值范围才能打乱顺序
+    return ((np.outer(_PERM_A, hashed) + _PERM_B[:, None]) % _PRIME).min(axis=1)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """两个签名估计的 Jaccard 相似度。"""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def item_signatures(item: dict, features: set = None) -> tuple:
+    """(标题签名, 标题 + 摘要签名)；没有摘要时后者为 None。"""
+    features = shingles(item.get("title", "")) if features is None else features
+    summary = shingles(summary_text(item.get("summary")))
+    return minhash(features), minhash(features | summary) if summary else None
+
+
+def band_keys(signature: np.ndarray) -> list:
+    return [f"{band}:{signature[band * ROWS:(band + 1) * ROWS].tobytes().hex()}" for band in range(BANDS)]
+
+# --- Index ---
+
+class StoryIndex:
+    """
+    近似重复索引。内存中保存本次运行见过的事件，可选地从 SQLite 载入已推送的历史事件。
+    """
+
+    def __init__(self, path=None, threshold: float = DEDUP_THRESHOLD, history_days: float = DEDUP_HISTORY_DAYS):
+        self.path = path
+        self.threshold = threshold
+        self.history_days = history_days
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            path = self.path or cache_dir("dedup") / "stories.db"
+            self._conn = sqlite3.connect(str(path), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS stories ("
+                "url TEXT PRIMARY KEY, title TEXT NOT NULL, signature BLOB NOT NULL, reported REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_stories_reported ON stories(reported)")
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(stories)")}
+            if "full_signature" not in columns:
+                # 标题 + 摘要签名 (条目没有摘要时为空)
+                self._conn.execute("ALTER TABLE stories ADD COLUMN full_signature BLOB")
+        return self._conn
+
+    def _load_history(self) -> list:
+        cutoff = time.time() - self.history_days * 86400
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM stories WHERE reported < ?", (cutoff,))
+            db.commit()
+            rows = db.execute("SELECT url, title, signature, full_signature FROM stories").fetchall()
+        return [(url, title, np.frombuffer(blob, dtype=np.uint64), np.frombuffer(full, dtype=np.uint64) if full else None)
+                for url, title, blob, full in rows]
+
+    def filter(self, items: list, history: bool = False) -> list:
+        """
+        去掉 items 中的重复条目 (保留先出现的一条)。去掉的条数计入当前 span
+        (deduped_url / deduped_similar)，不打印：MCP stdio 传输占用 stdout。
+
+        Args:
+            items: [{"title", "link", "summary"?, ...}]
+            history: 是否同时压制已推送过的历史事件
+        """
+        seen_urls = set()  # 规范化 URL
+        buckets = {}
+        entries = []  # [(标题, 标题签名, 标题 + 摘要签名或 None, 数字)]
+
+        def add(url, title, signature, full):
+            seen_urls.add(url)
+            index = len(entries)
+            entries.append((title, signature, full, numbers(title)))
+            for key in band_keys(signature) + (band_keys(full) if full is not None else []):
+                buckets.setdefault(key, []).append(index)
+
+        if history:
+            for url, title, signature, full in self._load_history():
+                add(url, title, signature, full)
+
+        def match(signature, full, digits):
+            candidates = {i for key in band_keys(signature) + (band_keys(full) if full is not None else [])
+                          for i in buckets.get(key, ())}
+            for i in sorted(candidates):
+                title, other, other_full, other_digits = entries[i]
+                score = similarity(signature, other)
+                if full is not None and other_full is not None:
+                    score = max(score, similarity(full, other_full))
+                if score >= self.threshold and compatible(digits, other_digits):
+                    return True
+            return False
+
+        unique = []
+        for item in items:
+            title = item.get("title", "")
+            url = canonical_url(item.get("link", ""))
+            if url and url in seen_urls:
+                tracing.current_span().add("deduped_url")
+                continue
+            features = shingles(title)
+            if len(features) >= DEDUP_MIN_SHINGLES:
+                signature, full = item_signatures(item, features)
+                if match(signature, full, numbers(title)):
+                    tracing.current_span().add("deduped_similar")
+                    continue
+                add(url, title, signature, full)
+            elif url:
+                seen_urls.add(url)
+            unique.append(item)
+        return unique
+
+    def remember(self, items: list):
+        """记录已推送的条目，供之后的运行压制同一事件。"""
+        rows = []
+        now = time.time()
+        for item in items:
+            url = canonical_url(item.get("link", "")) or f"title:{item.get('title', '')}"
+            signature, full = item_signatures(item)
+            rows.append((url, item.get("title", ""), signature.tobytes(), full.tobytes() if full is not None else None, now))
+        if not rows:
+            return
+        with self._lock:
+            db = self._db()
+            db.executemany("INSERT OR REPLACE INTO stories (url, title, signature, full_signature, reported) "
+                           "VALUES (?, ?, ?, ?, ?)", rows)
+            db.commit()
+
+
+STORY_INDEX = StoryIndex()
+
+
+def deduplicate(items: list) -> list:
+    """单次运行内去重：规范化 URL + 近似标题，不读写历史。"""
+    return STORY_INDEX.filter(items)
@@ -0,0 +1,130 @@
+"""
+新闻简报的文档模型：结构 (主题 -> 条目 / 行情研报) 只构建一次，再分别渲染为邮件 HTML、Telegram 消息与 MCP 文本。
+
+- 标题、链接、分析文本在构建条目时转义一次，各渲染器直接拼接已转义的字段，不再重复 html.escape。
+- 模板在模块加载时绑定为 str.format，渲染结果先收集到列表再 join，不做逐段字符串累加。
+- Telegram 渲染结果只包含白名单标签 (b / a / code / i)，标签已配平、文本已转义，
+  发送时可标记为可信 (trusted=True) 跳过 clean_html_for_telegram；
+  只有模型生成的 HTML (行情研报) 仍需清洗。
+"""
+import html
+from datetime import datetime
+
+from mcp_tools.telegram.delivery import pack_blocks
+
+REPORT_TITLE = "全球市场深度复盘与展望"
+
+_EMAIL_HEADER = "<h1>📅 {title}</h1><p><i>{subtitle}</i></p><hr>".format
+_EMAIL_SECTION = "<h2>🔹 {name}</h2>".format
+_EMAIL_ITEM = ("<p><b>{n}. <a href=\"{link}\">{title}</a></b><br>"
+               "💡 <span style='background-color: #f0f0f0; padding: 2px;'>{analysis}</span></p>").format
+_EMAIL_NOTE = "<p>- {note}</p>".format
+_EMAIL_REPORT = "<h2>📊 " + REPORT_TITLE + "</h2>{report}<hr>"
+
+_TG_HEADER = "📅 <b>{title}</b>\n<i>{subtitle}</i>".format
+_TG_SECTION = "🔹 <b>{name}</b>\n".format
+_TG_NOTE = "🔹 <b>{name}</b>\n- {note}".format
+_TG_REPORT = "📊 <b>" + REPORT_TITLE + "</b>\n\n"
+
+_ITEM = "{n}. <a href=\"{link}\">{title}</a>{stamp}\n".format
+_ANALYSIS = "   💡 <code>{analysis}</code>\n".format
+
+
+class Item:
+    """一条新闻，字段均已转义 (没有分析时 analysis 为 None)。"""
+
+    __slots__ = ("title", "link", "analysis", "published")
+
+    def __init__(self, item: dict):
+        self.title = html.escape(item["title"])
+        self.link = html.escape(item["link"])
+        analysis = item.get("analysis")
+        self.analysis = html.escape(str(analysis)) if analysis else None
+        self.published = item.get("published")
+
+    def block(self, n: int, stamp: bool = False) -> str:
+        """Telegram / MCP 共用的条目块：序号、链接标题 (可选发布时间) 与分析。"""
+        when = f" [{datetime.fromtimestamp(self.published):%m-%d %H:%M}]" if stamp and self.published else ""
+        text = _ITEM(n=n, link=self.link, title=self.title, stamp=when)
+        if self.analysis is not None:
+            text += _ANALYSIS(analysis=self.analysis)
+        return text + "\n"
+
+
+class Section:
+    """
+    一个主题。条目主题的 items 为 Item 列表 (为空时显示 note)；
+    行情主题的 report 为模型生成的 HTML，渲染到 Telegram 前必须清洗。
+    """
+
+    def __init__(self, name: str, items: list = None, note: str = None, report: str = None):
+        self.name = html.escape(name)
+        self.items = [Item(item) for item in items or []]
+        self.note = note
+        self.report = report
+
+
+class Digest:
+    def __init__(self, title: str, subtitle: str = ""):
+        self.title = html.escape(title)
+        self.subtitle = html.escape(subtitle)
+        self.sections = []
+
+    def add_items(self, name: str, items: list, note: str = None) -> Section:
+        section = Section(name, items=items, note=note)
+        self.sections.append(section)
+        return section
+
+    def add_report(self, name: str, report: str) -> Section:
+        section = Section(name, report=report)
+        self.sections.append(section)
+        return section
+
+# --- Email ---
+
+def render_email(digest: Digest) -> str:
+    parts = [_EMAIL_HEADER(title=digest.title, subtitle=digest.subtitle)]
+    for section in digest.sections:
+        if section.report is not None:
+            parts.append(_EMAIL_REPORT.format(report=section.report))
+            continue
+        parts.append(_EMAIL_SECTION(name=section.name))
+        if section.items:
+            parts.extend(_EMAIL_ITEM(n=n, link=item.link, title=item.title, analysis=item.analysis or "")
+                         for n, item in enumerate(section.items, 1))
+        elif section.note:
+            parts.append(_EMAIL_NOTE(note=html.escape(section.note)))
+        parts.append("<hr>")
+    return "".join(parts)
+
+# --- Telegram ---
+
+def telegram_header(digest: Digest) -> str:
+    return _TG_HEADER(title=digest.title, subtitle=digest.subtitle)
+
+
+def telegram_messages(section: Section) -> list:
+    """条目主题按 Telegram 长度上限装箱后的消息 (可信，无需再清洗)；没有条目时为一条 note 消息。"""
+    if not section.items:
+        return [_TG_NOTE(name=section.name, note=html.escape(section.note))] if section.note else []
+    blocks = [item.block(n) for n, item in enumerate(section.items, 1)]
+    return [message.rstrip() for message in pack_blocks(_TG_SECTION(name=section.name), blocks)]
+
+
+def telegram_report(report: str, heading: bool = True) -> str:
+    """行情研报 (或其中一段) 的 Telegram 文本。研报为模型生成的 HTML，发送时必须清洗。"""
+    return _TG_REPORT + report if heading else report
+
+# --- MCP ---
+
+def render_mcp(section: Section, heading: str, stamp: bool = False) -> str:
+    """
+    MCP 工具返回的文本 (与 Telegram 相同的 HTML 子集)。
+
+    Args:
+        heading: 标题行 (已转义)，例如 "🔹 <b>AI 新闻简报</b>"
+        stamp: 条目后附发布时间
+    """
+    parts = [heading, "\n\n"]
+    parts.extend(item.block(n, stamp=stamp) for n, item in enumerate(section.items, 1))
+    return "".join(parts)
@@ -0,0 +1,164 @@
+"""
+基于 ETag / Last-Modified 的 feed 条件请求缓存。
+
+每个 URL 在磁盘上保存一份已解析的条目，内存中再保留一份热副本：
+- 距上次检查不足 min_refresh 秒：直接返回内存副本，不发请求。
+- 否则带 If-None-Match / If-Modified-Since 发起条件请求，304 时复用磁盘副本。
+
+响应体边下载边解析 (见 feed_reader)，只保留最近 FEED_RETENTION_HOURS 小时内的
+前 FEED_MAX_ENTRIES 条，大型 / 全量归档 feed 读到足够的条目即停止下载。
+
+FEED_PARSE_PROCESSES > 0 时改为先下载完整响应体，再把解析与时间过滤 (纯 Python、受 GIL 限制)
+交给共享的进程池；下载线程只做网络 I/O，几百个 feed 同时刷新时解析可以用满多核。
+进程池不可用 (启动失败 / 子进程崩溃) 时在当前线程解析同一份响应体。
+"""
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from mcp_tools import tracing, transport
+from mcp_tools.news.feed_reader import parse_document, read_entries
+from mcp_tools.storage import cache_dir
+
+FEED_MIN_REFRESH = int(os.getenv("FEED_MIN_REFRESH", 300))
+# 调用方使用的最大时间窗口 (fetch_rss_news 的 72h 回退) 与条目上限
+FEED_RETENTION_HOURS = int(os.getenv("FEED_RETENTION_HOURS", 72))
+FEED_MAX_ENTRIES = int(os.getenv("FEED_MAX_ENTRIES", 100))
+# 解析进程数：0 = 在下载线程中边下载边解析 (默认)，-1 = CPU 核数
+FEED_PARSE_PROCESSES = int(os.getenv("FEED_PARSE_PROCESSES", 0))
+
+_parse_pools = {}
+_parse_pools_lock = threading.Lock()
+
+
+def get_parse_pool(processes: int) -> ProcessPoolExecutor:
+    """按进程数共享的解析进程池 (spawn 启动：下载线程运行中 fork 可能继承被占用的锁)。"""
+    with _parse_pools_lock:
+        pool = _parse_pools.get(processes)
+        if pool is None:
+            pool = _parse_pools[processes] = ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return pool
+
+
+class FeedCache:
+    def __init__(self, directory=None, min_refresh: int = FEED_MIN_REFRESH, parse_processes: int = FEED_PARSE_PROCESSES):
+        self.directory = directory
+        self.min_refresh = min_refresh
+        self.parse_processes = (os.cpu_count() or 1) if parse_processes < 0 else parse_processes
+        self._memory = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _path(self, url: str):
+        directory = self.directory or cache_dir("feeds")
+        return directory / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _url_lock(self, url: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(url, threading.Lock())
+
+    def _load(self, url: str):
+        if url in self._memory:
+            return self._memory[url]
+        try:
+            with open(self._path(url), encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._memory[url] = record
+        return record
+
+    def _save(self, url: str, record: dict):
+        self._memory[url] = record
+        path = self._path(url)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def get_entries(self, url: str, timeout: int = 20, min_refresh: int = None) -> list:
+        """
+        返回 URL 对应 feed 的全部条目 (按源顺序)。网络失败且有旧副本时返回旧副本。
+
+        Args:
+            min_refresh: 覆盖该 URL 的最短刷新间隔 (秒)，默认使用 self.min_refresh
+        """
+        with tracing.span("feed.fetch", url=url) as span:
+            entries = self._get_entries(url, timeout, self.min_refresh if min_refresh is None else min_refresh, span)
+            span.set(items=len(entries))
+            return entries
+
+    def _parse(self, response, cutoff: float) -> list:
+        headers = dict(response.headers)
+        if not self.parse_processes:
+            return read_entries(response.raw, cutoff=cutoff, max_count=FEED_MAX_ENTRIES, response_headers=headers)
+        document = response.raw.read()
+        with tracing.span("feed.parse", parser="process", bytes=len(document)) as span:
+            try:
+                future = get_parse_pool(self.parse_processes).submit(
+                    parse_document, document, cutoff, FEED_MAX_ENTRIES, headers,
+                )
+                entries = future.result()
+            except (BrokenProcessPool, OSError) as e:
+                print(f"Feed parse pool unavailable ({e}), parsing in thread")
+                tracing.record_error(e)
+                with _parse_pools_lock:
+                    _parse_pools.pop(self.parse_processes, None)
+                entries = read_entries(io.BytesIO(document), cutoff=cutoff, max_count=FEED_MAX_ENTRIES, response_headers=headers)
+            span.set(items=len(entries))
+            return entries
+
+    def _get_entries(self, url: str, timeout: int, min_refresh: int, span) -> list:
+        with self._url_lock(url):
+            record = self._load(url)
+            now = time.time()
+            if record and now - record.get("checked", 0) < min_refresh:
+                span.set(cache="fresh")
+                return record["entries"]
+
+            headers = {}
+            if record and record.get("etag"):
+                headers["If-None-Match"] = record["etag"]
+            if record and record.get("last_modified"):
+                headers["If-Modified-Since"] = record["last_modified"]
+
+            try:
+                response = transport.get(url, headers=headers, timeout=timeout, stream=True)
+                try:
+                    if response.status_code == 304 and record:
+                        response.raw.read()  # 空响应体读完，连接才会放回连接池
+                        record["checked"] = now
+                        self._save(url, record)
+                        span.set(cache="not_modified")
+                        return record["entries"]
+                    response.raise_for_status()
+                    response.raw.decode_content = True
+                    entries = self._parse(response, cutoff=now - FEED_RETENTION_HOURS * 3600)
+                finally:
+                    # 已读完的连接此时已回到连接池；提前停止的连接直接断开，剩余响应体不再下载
+                    response.close()
+            except Exception as e:
+                if record:
+                    tracing.record_error(e)
+                    span.set(cache="stale")
+                    return record["entries"]
+                raise
+
+            record = {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "checked": now,
+                "entries": entries,
+            }
+            self._save(url, record)
+            span.set(cache="miss")
+            return record["entries"]
@@ -0,0 +1,188 @@
+"""
+流式 feed 解析。
+
+用 ElementTree.iterparse 边读边解析 RSS 2.0 / RSS 1.0 (RDF) / Atom，每解析完一条就产出一条，
+已处理的元素立即清空。满足以下任一条件即停止读取 (剩余字节不再下载、不再解析)：
+- 已收集 max_count 条时间窗口内的条目；
+- feed 按时间倒序排列，且连续 STOP_AFTER_OLD 条早于截止时间。
+
+XML 不规范 (例如包含 &nbsp; 等未定义实体) 或使用 GBK 等 expat 不支持的编码时，
+回退到 feedparser 解析完整文档。
+"""
+import calendar
+import io
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import mktime_tz, parsedate_tz
+
+import feedparser
+
+from mcp_tools import tracing
+
+STOP_AFTER_OLD = 3
+
+_PUBLISHED = ("pubDate", "published", "date", "issued", "created")
+_UPDATED = ("updated", "modified", "lastBuildDate")
+
+
+def simplify_entry(entry) -> dict:
+    """把 feedparser 条目转换为可 JSON 序列化的精简结构，published 为 UTC 时间戳。"""
+    pub_parsed = getattr(entry, 'published_parsed', None) or getattr(entry, 'updated_parsed', None)
+    return {
+        "title": entry.get('title', ''),
+        "link": entry.get('link', ''),
+        "summary": entry.get('summary', ''),
+        "published": calendar.timegm(pub_parsed) if pub_parsed else None,
+    }
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def parse_date(text: str):
+    """RFC 822 (RSS) 或 ISO 8601 (Atom / dc:date) 日期转 UTC 时间戳，无法解析时返回 None。"""
+    if not text:
+        return None
+    text = text.strip()
+    parsed = parsedate_tz(text)
+    if parsed:
+        try:
+            return mktime_tz(parsed)
+        except (OverflowError, ValueError):
+            return None
+    try:
+        value = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _entry(element) -> dict:
+    fields = {}
+    link = ""
+    for child in element:
+        name = _local(child.tag)
+        if name == "link":
+            href = child.get("href")
+            if href is None:
+                link = link or (child.text or "").strip()
+            elif child.get("rel", "alternate") == "alternate" and not link:
+                link = href
+        elif name not in fields:
+            fields[name] = "".join(child.itertext()).strip()
+    if not link and fields.get("guid", "").startswith("http"):
+        link = fields["guid"]
+
+    published = next((parse_date(fields[k]) for k in _PUBLISHED if fields.get(k)), None)
+    if published is None:
+        published = next((parse_date(fields[k]) for k in _UPDATED if fields.get(k)), None)
+    return {
+        "title": fields.get("title", ""),
+        "link": link,
+        "summary": fields.get("description") or fields.get("summary") or fields.get("encoded") or fields.get("content", ""),
+        "published": published,
+    }
+
+
+def iter_entries(stream):
+    """
+    逐条产出条目 (与 simplify_entry 结构一致，但 title 为纯文本)。
+    XML 不规范时抛出 ET.ParseError，编码不受支持时抛出 ValueError。
+    """
+    depth = 0
+    item_depth = None
+    for event, element in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if item_depth is None and _local(element.tag) in ("item", "entry"):
+                item_depth = depth
+            continue
+        if depth == item_depth:
+            yield _entry(element)
+            element.clear()
+            item_depth = None
+        depth -= 1
+
+
+def collect(entries, cutoff: float = None, max_count: int = None) -> list:
+    """
+    从条目迭代器中收集条目，满足停止条件后不再继续消费。
+    早于 cutoff 的条目同样保留在结果中 (调用方可据此回退到更宽的窗口)。
+    """
+    result = []
+    in_window = 0
+    old_streak = 0
+    ordered = True
+    last = None
+    for entry in entries:
+        result.append(entry)
+        published = entry["published"]
+        if published is None:
+            continue
+        if last is not None and published > last:
+            ordered = False
+        last = published
+        if cutoff is None or published >= cutoff:
+            in_window += 1
+            old_streak = 0
+            if max_count and in_window >= max_count:
+                break
+        else:
+            old_streak += 1
+            if ordered and old_streak >= STOP_AFTER_OLD:
+                break
+    return result
+
+
+class _Recorder:
+    """记录已读取的字节，流式解析失败时拼回完整文档交给 feedparser。"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.chunks = []
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        if data:
+            self.chunks.append(data)
+            self.size += len(data)
+        return data
+
+    def rest(self) -> bytes:
+        return b"".join(self.chunks) + self.stream.read()
+
+
+def read_entries(stream, cutoff: float = None, max_count: int = None, response_headers: dict = None) -> list:
+    """
+    流式读取 stream (文件对象) 中的 feed 条目，满足停止条件即返回。
+
+    Args:
+        stream: 只需支持 read(size) 的二进制流 (例如 requests 的 response.raw)
+        cutoff: 时间窗口起点 (UTC 时间戳)
+        max_count: 窗口内条目数上限
+        response_headers: 回退到 feedparser 时用于判断编码
+    """
+    recorder = _Recorder(stream)
+    with tracing.span("feed.parse", parser="stream") as span:
+        try:
+            entries = collect(iter_entries(recorder), cutoff=cutoff, max_count=max_count)
+        except (ET.ParseError, ValueError):
+            # ValueError: expat 不支持 GBK 等多字节编码
+            document = recorder.rest()
+            feed = feedparser.parse(document, response_headers=response_headers or {})
+            entries = collect((simplify_entry(e) for e in feed.entries), cutoff=cutoff, max_count=max_count)
+            span.set(parser="feedparser")
+            recorder.size = len(document)
+        span.set(bytes=recorder.size, items=len(entries))
+        return entries
+
+
+def parse_document(document: bytes, cutoff: float = None, max_count: int = None, response_headers: dict = None) -> list:
+    """
+    解析已下载完的完整文档 (规则同 read_entries)。顶层函数、参数与结果均可 pickle，供进程池调用。
+    """
+    return read_entries(io.BytesIO(document), cutoff=cutoff, max_count=max_count, response_headers=response_headers)
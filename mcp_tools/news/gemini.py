@@ -0,0 +1,77 @@
+"""
+Gemini REST 适配器 (LLMBackend 实现，见 llm.py)。
+"""
+import json
+import os
+
+import requests
+from dotenv import load_dotenv
+
+from mcp_tools import transport
+from mcp_tools.news.llm import BackendPolicy, LLMBackend, LLMError, RetryableError
+
+load_dotenv()
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-3-flash-preview")
+
+# Gemini 配额 (每分钟请求数)。所有线程共享同一个令牌桶，替代固定的 sleep。
+# 并发 / 超时 / 重试同样可通过 GEMINI_CONCURRENCY / GEMINI_TIMEOUT / GEMINI_RETRIES 配置。
+GEMINI_POLICY = BackendPolicy.from_env("GEMINI", concurrency=8, timeout=60, retries=2, rpm=10, burst=4)
+
+
+def response_text(response) -> str:
+    """取出 generateContent 响应中的第一段文本。"""
+    return response.json()["candidates"][0]["content"]["parts"][0]["text"]
+
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+
+    def __init__(self, api_key: str = GEMINI_API_KEY, model: str = GEMINI_MODEL,
+                 base_url: str = GEMINI_BASE_URL, policy: BackendPolicy = None):
+        super().__init__(policy or GEMINI_POLICY)
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    def _post(self, method: str, payload: dict, timeout: float, stream: bool = False):
+        url = f"{self.base_url}/v1beta/models/{self.model}:{method}"
+        params = {"key": self.api_key, **({"alt": "sse"} if stream else {})}
+        try:
+            response = transport.post(url, params=params, json=payload, timeout=timeout, stream=stream)
+        except requests.ConnectionError as e:
+            raise RetryableError(f"connection failed: {e}")
+        if response.status_code == 200:
+            return response
+        response.close()
+        if response.status_code == 429 or response.status_code >= 500:
+            retry_after = float(response.headers.get("Retry-After", 0) or 0) or None
+            raise RetryableError(f"HTTP {response.status_code}", retry_after)
+        raise LLMError(f"HTTP {response.status_code}")
+
+    def _generate(self, prompt: str, json_mode: bool, timeout: float) -> str:
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        if json_mode:
+            payload["generationConfig"] = {"responseMimeType": "application/json"}
+        return response_text(self._post("generateContent", payload, timeout))
+
+    def _open_stream(self, prompt: str, timeout: float):
+        response = self._post("streamGenerateContent", {"contents": [{"parts": [{"text": prompt}]}]}, timeout, stream=True)
+
+        def chunks():
+            with response:
+                for line in response.iter_lines():
+                    if not line.startswith(b"data:"):
+                        continue
+                    chunk = json.loads(line[5:])
+                    for candidate in chunk.get("candidates", [])[:1]:
+                        for part in candidate.get("content", {}).get("parts", []):
+                            if part.get("text"):
+                                yield part["text"]
+        return chunks()
@@ -0,0 +1,142 @@
+"""
+分层对冲请求 (hedged requests)。
+
+按顺序启动各数据源：上一层在延迟预算内没有返回结果 (或已失败) 就立即启动下一层，
+多层同时在跑时取第一个成功结果，其余尚未开始的任务取消、已在运行的结果丢弃。
+每层的耗时与胜出次数会被记录，便于调整预算。
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from mcp_tools import tracing
+
+_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+
+
+class HedgeStats:
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self._tiers = {}
+        self.window = window
+
+    def _tier(self, name: str) -> dict:
+        return self._tiers.setdefault(name, {"started": 0, "ok": 0, "failed": 0, "wins": 0, "latency": deque(maxlen=self.window)})
+
+    def record_start(self, name: str):
+        with self._lock:
+            self._tier(name)["started"] += 1
+
+    def record_done(self, name: str, elapsed: float, ok: bool):
+        with self._lock:
+            tier = self._tier(name)
+            tier["ok" if ok else "failed"] += 1
+            tier["latency"].append(elapsed)
+
+    def record_win(self, name: str):
+        with self._lock:
+            self._tier(name)["wins"] += 1
+
+    def snapshot(self) -> dict:
+        """返回 {层名: {started, ok, failed, wins, win_rate, p50, p95}}，耗时单位为秒。"""
+        result = {}
+        with self._lock:
+            for name, tier in self._tiers.items():
+                samples = sorted(tier["latency"])
+
+                def pick(q):
+                    return round(samples[min(len(samples) - 1, int(q * len(samples)))], 3) if samples else None
+
+                result[name] = {
+                    "started": tier["started"],
+                    "ok": tier["ok"],
+                    "failed": tier["failed"],
+                    "wins": tier["wins"],
+                    "win_rate": round(tier["wins"] / tier["started"], 3) if tier["started"] else 0.0,
+                    "p50": pick(0.5),
+                    "p95": pick(0.95),
+                }
+        return result
+
+
+def _launch(name, fn, stats):
+    stats.record_start(name)
+    start = time.monotonic()
+
+    def run():
+        with tracing.span("hedge.tier", tier=name) as span:
+            result = fn()
+            span.set(ok=result is not None)
+            return result
+
+    future = tracing.submit(_POOL, run)
+
+    def done(f):
+        ok = not f.cancelled() and f.exception() is None and f.result() is not None
+        if not f.cancelled():
+            stats.record_done(name, time.monotonic() - start, ok)
+
+    future.add_done_callback(done)
+    return future
+
+
+def hedged_first(tiers: list, stats: HedgeStats, budget: float, deadline: float):
+    """
+    Args:
+        tiers: [(层名, 无参函数), ...]，函数失败时抛异常或返回 None
+        stats: 统计对象
+        budget: 每层的延迟预算 (秒)，超时即启动下一层
+        deadline: 总超时 (秒)
+
+    Returns:
+        (层名, 结果)；全部失败或超时返回 (None, None)。
+    """
+    end = time.monotonic() + deadline
+    queue = list(tiers)
+    running = {}
+
+    def launch_next():
+        name, fn = queue.pop(0)
+        running[_launch(name, fn, stats)] = name
+
+    launch_next()
+    while running:
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            break
+        timeout = min(budget, remaining) if queue else remaining
+        done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            if future.exception() is None and future.result() is not None:
+                stats.record_win(name)
+                for other in running:
+                    other.cancel()
+                return name, future.result()
+            print(f"Tier {name} failed: {future.exception() or 'empty result'}")
+        # 超过预算或有层失败：启动下一层
+        if queue:
+            launch_next()
+    for future in running:
+        future.cancel()
+    return None, None
+
+
+def run_sequential(tiers: list, stats: HedgeStats, timeout: float = None):
+    """
+    非对冲模式：逐层尝试，与原有的串行回退一致。
+    每层最多等待 timeout 秒，超时视为该层失败 (运行中的线程无法取消，结果丢弃)。
+    """
+    for name, fn in tiers:
+        future = _launch(name, fn, stats)
+        try:
+            result = future.result(timeout=timeout)
+        except Exception as e:
+            print(f"Tier {name} failed: {e!r}")
+            future.cancel()
+            continue
+        if result is not None:
+            stats.record_win(name)
+            return name, result
+    return None, None
@@ -0,0 +1,301 @@
+"""
+LLM 后端抽象。
+
+- LLMBackend：统一的 generate / stream 接口。并发上限、超时、重试与限流 (BackendPolicy) 在这一层实现，
+  调用方只关心 prompt 与返回文本。
+- GeminiBackend (gemini.py)：Gemini REST 适配器。
+- StubBackend：本地确定性替身，不联网，用于离线压测与基准。
+- ReplayBackend：按 prompt 哈希录制 / 回放响应 (SQLite)，开发调试与重跑时不再重复花费。
+
+LLM_BACKEND 选择后端 (gemini / stub)，LLM_REPLAY 控制回放缓存：
+off 不使用；auto 命中即回放，未命中调用后端并录制；record 总是调用并覆盖录制；replay 只回放，未命中报错。
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from mcp_tools import tracing
+from mcp_tools.ratelimit import TokenBucket
+from mcp_tools.storage import cache_dir
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_REPLAY = os.getenv("LLM_REPLAY", "off")
+LLM_STUB_LATENCY = float(os.getenv("LLM_STUB_LATENCY", 0))
+
+REPLAY_MODES = ("off", "auto", "record", "replay")
+
+
+class LLMError(RuntimeError):
+    """后端返回错误或无法给出结果。"""
+
+
+class RetryableError(LLMError):
+    """可重试的错误 (429 / 5xx / 连接失败)；retry_after 为服务端建议的等待秒数。"""
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class BackendPolicy:
+    """
+    单个后端的调用策略。
+
+    Args:
+        concurrency: 同时进行的请求数上限 (流式请求在读完之前一直占用)
+        timeout: 默认超时 (秒)，调用时可覆盖
+        retries: RetryableError 的重试次数
+        rpm / burst: 令牌桶限流 (每分钟请求数 / 最大突发)，rpm 为空时不限流
+        backoff: 服务端未给出 retry_after 时的首次退避秒数，之后指数增长
+    """
+
+    def __init__(self, concurrency: int = 4, timeout: float = 60, retries: int = 2,
+                 rpm: float = None, burst: int = 1, backoff: float = 4):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.rpm = rpm
+        self.burst = burst
+        self.backoff = backoff
+
+    @classmethod
+    def from_env(cls, prefix: str, **defaults) -> "BackendPolicy":
+        """读取 <prefix>_CONCURRENCY / _TIMEOUT / _RETRIES / _RPM / _BURST，未设置时使用 defaults。"""
+        kwargs = dict(defaults)
+        for field, cast in (("concurrency", int), ("timeout", float), ("retries", int), ("rpm", float), ("burst", int)):
+            value = os.getenv(f"{prefix}_{field.upper()}")
+            if value:
+                kwargs[field] = cast(value)
+        return cls(**kwargs)
+
+
+class LLMBackend:
+    """后端基类：子类实现 _generate (以及可选的 _open_stream)。"""
+
+    name = "base"
+    model = ""
+
+    def __init__(self, policy: BackendPolicy = None):
+        self.policy = policy or BackendPolicy()
+        self._slots = threading.BoundedSemaphore(self.policy.concurrency)
+        self.limiter = TokenBucket(rate=self.policy.rpm / 60, capacity=self.policy.burst) if self.policy.rpm else None
+
+    @property
+    def available(self) -> bool:
+        """是否已配置 (例如 API Key)。"""
+        return True
+
+    def _retry(self, call):
+        for attempt in range(self.policy.retries + 1):
+            if self.limiter:
+                self.limiter.acquire()
+            try:
+                return call()
+            except RetryableError as e:
+                tracing.current_span().add("retries")
+                if attempt == self.policy.retries:
+                    raise
+                wait = e.retry_after or self.policy.backoff * 2 ** attempt
+                print(f"{self.name} {e}, backing off {wait:.0f}s...")
+                if self.limiter:
+                    self.limiter.penalize(wait)
+                else:
+                    time.sleep(wait)
+
+    def generate(self, prompt: str, json_mode: bool = False, timeout: float = None) -> str:
+        """返回完整的生成文本。json_mode 要求后端输出 JSON。"""
+        timeout = timeout or self.policy.timeout
+        with tracing.span("llm.generate", backend=self.name, model=self.model, prompt_chars=len(prompt)) as span:
+            with self._slots:
+                span.set(queued=round(span.duration, 4))
+                text = self._retry(lambda: self._generate(prompt, json_mode, timeout))
+            span.set(response_chars=len(text))
+            return text
+
+    def stream(self, prompt: str, timeout: float = None):
+        """
+        逐块产出生成的文本。只在收到第一块之前重试；timeout 为相邻两块之间的最长等待时间。
+        """
+        timeout = timeout or self.policy.timeout
+        with tracing.span("llm.stream", backend=self.name, model=self.model, prompt_chars=len(prompt)) as span:
+            with self._slots:
+                chars = 0
+                for chunk in self._retry(lambda: self._open_stream(prompt, timeout)):
+                    if not chars:
+                        span.set(first_chunk=round(span.duration, 4))
+                    chars += len(chunk)
+                    yield chunk
+            span.set(response_chars=chars)
+
+    def _generate(self, prompt: str, json_mode: bool, timeout: float) -> str:
+        raise NotImplementedError
+
+    def _open_stream(self, prompt: str, timeout: float):
+        """建立流式请求并返回文本块迭代器；默认退化为一次性生成。"""
+        return iter([self._generate(prompt, False, timeout)])
+
+# --- Local Stub ---
+
+_TAGGED = re.compile(r"^\[(\w+)\] \((.*?)\) (.+)$", flags=re.MULTILINE)
+STUB_SECTIONS = ["宏观", "A股情绪", "热点板块", "风险", "策略"]
+
+
+def stub_reply(prompt: str) -> str:
+    """确定性回复：批量分析 prompt 按 ID 返回 JSON，其他 prompt 返回五段研报 HTML。"""
+    tagged = _TAGGED.findall(prompt)
+    if tagged:
+        return json.dumps([{"id": i, "analysis": f"({category}) 分析: {title}"} for i, category, title in tagged],
+                          ensure_ascii=False)
+    digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+    return "\n".join(f"<p><b>{section}</b> 离线替身分析 {digest}。</p>" for section in STUB_SECTIONS)
+
+
+class StubBackend(LLMBackend):
+    """本地确定性替身：每次调用等待 latency 秒，流式时分 chunks 块产出。"""
+
+    name = "stub"
+    model = "stub"
+
+    def __init__(self, latency: float = LLM_STUB_LATENCY, chunks: int = 20, policy: BackendPolicy = None):
+        super().__init__(policy or BackendPolicy.from_env("LLM_STUB", concurrency=64, retries=0))
+        self.latency = latency
+        self.chunks = chunks
+        self.calls = 0
+        self._count_lock = threading.Lock()
+
+    def _count(self):
+        with self._count_lock:
+            self.calls += 1
+
+    def _generate(self, prompt: str, json_mode: bool, timeout: float) -> str:
+        self._count()
+        time.sleep(self.latency)
+        return stub_reply(prompt)
+
+    def _open_stream(self, prompt: str, timeout: float):
+        self._count()
+        text = stub_reply(prompt)
+        size = max(1, -(-len(text) // self.chunks))
+
+        def chunks():
+            for start in range(0, len(text), size):
+                time.sleep(self.latency / self.chunks)
+                yield text[start:start + size]
+        return chunks()
+
+# --- Record / Replay ---
+
+class ReplayBackend(LLMBackend):
+    """在任意后端外层按 prompt 哈希录制 / 回放响应。"""
+
+    def __init__(self, inner: LLMBackend, path=None, mode: str = "auto"):
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"Unknown replay mode: {mode}")
+        self.inner = inner
+        self.policy = inner.policy
+        self.name = f"replay:{inner.name}"
+        self.model = inner.model
+        self.path = path
+        self.mode = mode
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self.mode == "replay" or self.inner.available
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            path = self.path or cache_dir("llm") / "replay.db"
+            self._conn = sqlite3.connect(str(path), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, backend TEXT NOT NULL, prompt TEXT NOT NULL, response TEXT NOT NULL, created REAL NOT NULL)"
+            )
+        return self._conn
+
+    def key(self, prompt: str, json_mode: bool) -> str:
+        raw = f"{self.inner.name}\x1f{self.inner.model}\x1f{int(json_mode)}\x1f{prompt}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def lookup(self, key: str):
+        if self.mode not in ("auto", "replay"):
+            return None
+        with self._lock:
+            row = self._db().execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None and self.mode == "replay":
+            raise LLMError(f"No recorded response for prompt {key[:12]}")
+        return row[0] if row else None
+
+    def record(self, key: str, prompt: str, response: str):
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, backend, prompt, response, created) VALUES (?, ?, ?, ?, ?)",
+                (key, self.inner.name, prompt, response, time.time()),
+            )
+            db.commit()
+
+    def generate(self, prompt: str, json_mode: bool = False, timeout: float = None) -> str:
+        key = self.key(prompt, json_mode)
+        with tracing.span("llm.replay", mode=self.mode) as span:
+            cached = self.lookup(key)
+            span.set(cache="miss" if cached is None else "hit")
+            if cached is not None:
+                return cached
+            response = self.inner.generate(prompt, json_mode=json_mode, timeout=timeout)
+            self.record(key, prompt, response)
+            return response
+
+    def stream(self, prompt: str, timeout: float = None):
+        key = self.key(prompt, False)
+        with tracing.span("llm.replay", mode=self.mode) as span:
+            cached = self.lookup(key)
+            span.set(cache="miss" if cached is None else "hit")
+            if cached is not None:
+                yield cached
+                return
+            chunks = []
+            for chunk in self.inner.stream(prompt, timeout=timeout):
+                chunks.append(chunk)
+                yield chunk
+            self.record(key, prompt, "".join(chunks))
+
+# --- Factory ---
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: str = None, replay: str = None) -> LLMBackend:
+    name = name or LLM_BACKEND
+    replay = replay or LLM_REPLAY
+    if name == "stub":
+        backend = StubBackend()
+    elif name == "gemini":
+        from mcp_tools.news.gemini import GeminiBackend
+        backend = GeminiBackend()
+    else:
+        raise ValueError(f"Unknown LLM backend: {name}")
+    return backend if replay == "off" else ReplayBackend(backend, mode=replay)
+
+
+def get_backend() -> LLMBackend:
+    """进程内共享的后端 (首次调用时按环境变量创建)。"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+
+def set_backend(backend: LLMBackend):
+    """替换共享后端 (基准测试 / 离线压测)。"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
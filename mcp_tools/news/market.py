@@ -0,0 +1,112 @@
+"""
+批量行情快照。
+
+所有指数 / 板块 / 自选代码通过一次 yf.download 拉取到同一个 DataFrame，
+收盘价与涨跌幅用向量化运算一次算完，代码数量增长时不会线性增加串行请求。
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from mcp_tools.news.market_cache import MARKET_CACHE
+
+US_INDICES = {"S&P 500": "^GSPC", "Nasdaq": "^IXIC", "VIX": "^VIX"}
+US_SECTORS = {"Tech (XLK)": "XLK", "Finance (XLF)": "XLF", "Energy (XLE)": "XLE"}
+CN_INDICES_YF = {"上证指数": "000001.SS", "深证成指": "399001.SZ"}
+
+# 自选代码池：JSON 文件 {"显示名": "代码", ...}，或逗号分隔的代码列表
+MARKET_WATCHLIST_FILE = os.getenv("MARKET_WATCHLIST_FILE")
+MARKET_WATCHLIST = os.getenv("MARKET_WATCHLIST", "")
+# 是否使用本地行情缓存 (增量 K 线)
+MARKET_CACHE_ENABLED = os.getenv("MARKET_CACHE", "1") != "0"
+
+
+def load_watchlist() -> dict:
+    """读取自选代码池，返回 {显示名: 代码}。"""
+    if MARKET_WATCHLIST_FILE:
+        try:
+            with open(MARKET_WATCHLIST_FILE, encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {s: s for s in data}
+        except (OSError, ValueError) as e:
+            print(f"Error loading watchlist {MARKET_WATCHLIST_FILE}: {e}")
+    return {s.strip(): s.strip() for s in MARKET_WATCHLIST.split(",") if s.strip()}
+
+
+def download_closes(symbols, period: str = "5d") -> pd.DataFrame:
+    """一次性下载多个代码的收盘价，返回 index=日期、columns=代码 的 DataFrame。"""
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return pd.DataFrame()
+    frame = yf.download(symbols, period=period, auto_adjust=True, progress=False, threads=True, group_by="column")
+    if frame is None or frame.empty:
+        return pd.DataFrame(columns=symbols)
+    closes = frame["Close"]
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(symbols[0])
+    return closes.reindex(columns=symbols)
+
+
+def compute_changes(closes: pd.DataFrame) -> pd.DataFrame:
+    """
+    对每列取最后两个有效收盘价并计算涨跌幅 (不同市场交易日不一致时会出现 NaN 空洞)。
+
+    Returns:
+        index=代码，columns=[close, prev, change_pct]；有效数据不足两天的代码不在结果中。
+    """
+    if closes.empty:
+        return pd.DataFrame(columns=["close", "prev", "change_pct"])
+    values = closes.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    # rank[i, j] = 第 i 行及之后第 j 列的有效值个数：最后一个有效值 rank == 1，倒数第二个 rank == 2
+    rank = valid[::-1].cumsum(axis=0)[::-1]
+    filled = np.where(valid, values, 0.0)
+    close = (filled * (valid & (rank == 1))).sum(axis=0)
+    prev = (filled * (valid & (rank == 2))).sum(axis=0)
+    enough = valid.sum(axis=0) >= 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (close - prev) / prev * 100
+    result = pd.DataFrame({"close": close, "prev": prev, "change_pct": change}, index=closes.columns)
+    return result[enough]
+
+
+def fetch_snapshot(symbols, period: str = "5d", use_cache: bool = None) -> pd.DataFrame:
+    use_cache = MARKET_CACHE_ENABLED if use_cache is None else use_cache
+    if use_cache:
+        return compute_changes(MARKET_CACHE.get_closes(symbols, period_days=int(period.rstrip("d"))))
+    return compute_changes(download_closes(symbols, period=period))
+
+
+def format_indices(snapshot: pd.DataFrame, names: dict) -> list:
+    return [
+        f"{name}: {snapshot.at[ticker, 'close']:.2f} ({snapshot.at[ticker, 'change_pct']:+.2f}%)"
+        for name, ticker in names.items() if ticker in snapshot.index
+    ]
+
+
+def format_changes(snapshot: pd.DataFrame, names: dict) -> list:
+    return [f"{name}: {snapshot.at[ticker, 'change_pct']:+.2f}%" for name, ticker in names.items() if ticker in snapshot.index]
+
+
+def top_movers(snapshot: pd.DataFrame, names: dict, n: int = 5) -> list:
+    """自选池中涨跌幅绝对值最大的 n 个代码。"""
+    tickers = [t for t in names.values() if t in snapshot.index]
+    if not tickers:
+        return []
+    labels = {ticker: name for name, ticker in names.items()}
+    movers = snapshot.loc[tickers, "change_pct"]
+    movers = movers.reindex(movers.abs().sort_values(ascending=False).index[:n])
+    return [f"{labels[t]}: {c:+.2f}%" for t, c in movers.items()]
+
+
+def ticker_news(ticker: str, limit: int) -> list:
+    news = []
+    items = yf.Ticker(ticker).news or []
+    for item in items[:limit]:
+        title = item.get('title') or item.get('content', {}).get('title', 'No Title')
+        link = item.get('link') or item.get('content', {}).get('canonicalUrl', {}).get('url') or item.get('content', {}).get('clickThroughUrl', {}).get('url')
+        if title: news.append({"title": title, "link": link})
+    return news
@@ -0,0 +1,241 @@
+"""
+本地行情缓存。
+
+- 历史 K 线：每个代码一个列式文件 (安装 pyarrow 时为 Parquet，否则为 pickle)，
+  再次请求时只下载上次缓存日期之后的新 K 线并追加。
+- 实时快照：整张表按名称建索引后缓存，多次调用在 TTL 内只请求一次上游。
+- 新鲜度：交易时段内按 MARKET_CACHE_TTL 过期；休市时只要缓存晚于最近一次收盘即视为最新。
+"""
+import contextlib
+import importlib.util
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+import yfinance as yf
+
+from mcp_tools import tracing
+from mcp_tools.storage import cache_dir
+
+MARKET_CACHE_TTL = int(os.getenv("MARKET_CACHE_TTL", 300))
+HISTORY_KEEP_ROWS = int(os.getenv("MARKET_HISTORY_ROWS", 60))
+USE_PARQUET = importlib.util.find_spec("pyarrow") is not None
+
+# 交易时段 (本地时区, 开盘, 收盘)
+SESSIONS = {
+    "US": (ZoneInfo("America/New_York"), (9, 30), (16, 0)),
+    "CN": (ZoneInfo("Asia/Shanghai"), (9, 30), (15, 0)),
+}
+
+
+def market_of(symbol: str) -> str:
+    return "CN" if symbol.endswith((".SS", ".SZ")) else "US"
+
+
+def last_close(market: str, now: float = None) -> float:
+    """最近一次收盘的时间戳 (只考虑周末，不含节假日)。"""
+    tz, _, (close_h, close_m) = SESSIONS[market]
+    local = datetime.fromtimestamp(now or time.time(), tz)
+    close = local.replace(hour=close_h, minute=close_m, second=0, microsecond=0)
+    if local < close:
+        close -= timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= timedelta(days=1)
+    return close.timestamp()
+
+
+def is_open(market: str, now: float = None) -> bool:
+    tz, (open_h, open_m), (close_h, close_m) = SESSIONS[market]
+    local = datetime.fromtimestamp(now or time.time(), tz)
+    if local.weekday() >= 5:
+        return False
+    return (open_h, open_m) <= (local.hour, local.minute) < (close_h, close_m)
+
+
+def is_fresh(market: str, fetched_at: float, ttl: int = MARKET_CACHE_TTL) -> bool:
+    now = time.time()
+    if is_open(market, now):
+        return now - fetched_at < ttl
+    return fetched_at >= last_close(market, now)
+
+
+class MarketCache:
+    def __init__(self, directory=None, ttl: int = MARKET_CACHE_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self._meta = None
+        self._spots = {}
+        self._history = {}
+        # _lock 只保护内存索引、meta.json 与磁盘文件，网络请求不持有它；
+        # 同一张快照表 / 同一代码的并发刷新由 _flights 中的单飞锁合并为一次
+        self._lock = threading.RLock()
+        self._flights = {}
+
+    # --- Storage ---
+
+    def _dir(self):
+        return self.directory or cache_dir("market")
+
+    def _file(self, kind: str, name: str):
+        safe = re.sub(r"[^\w.-]", "_", name)
+        return self._dir() / f"{kind}_{safe}.{'parquet' if USE_PARQUET else 'pkl'}"
+
+    def _read(self, path) -> pd.DataFrame:
+        return pd.read_parquet(path) if USE_PARQUET else pd.read_pickle(path)
+
+    def _write(self, frame: pd.DataFrame, path):
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        if USE_PARQUET:
+            frame.to_parquet(tmp)
+        else:
+            frame.to_pickle(tmp)
+        os.replace(tmp, path)
+
+    def _meta_data(self) -> dict:
+        if self._meta is None:
+            try:
+                with open(self._dir() / "meta.json", encoding="utf-8") as f:
+                    self._meta = json.load(f)
+            except (OSError, ValueError):
+                self._meta = {}
+        return self._meta
+
+    def _touch(self, keys, fetched_at: float):
+        """记录检查时间并写回 meta.json (一次刷新只写一次，不按代码逐个重写)。"""
+        meta = self._meta_data()
+        for key in [keys] if isinstance(keys, str) else keys:
+            meta[key] = fetched_at
+        path = self._dir() / "meta.json"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def _flight(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._flights.setdefault(key, threading.Lock())
+
+    def _stale_history(self, symbols: list) -> list:
+        with self._lock:
+            meta = self._meta_data()
+            # 以检查时间判断新鲜度：没有新 K 线 (节假日、无效代码) 的代码同样记录了检查时间，不会每次重复下载
+            return [s for s in symbols if not is_fresh(market_of(s), meta.get(f"history:{s}", 0), self.ttl)]
+
+    def _load_history(self, symbol: str):
+        if symbol not in self._history:
+            try:
+                self._history[symbol] = self._read(self._file("history", symbol))
+            except (OSError, ValueError):
+                return None
+        return self._history[symbol]
+
+    # --- History ---
+
+    def get_closes(self, symbols, period_days: int = 5) -> pd.DataFrame:
+        """
+        返回 index=日期、columns=代码 的收盘价，只为过期代码请求增量 K 线。
+        """
+        symbols = list(dict.fromkeys(symbols))
+        stale = self._stale_history(symbols)
+        if stale:
+            # 按固定顺序获取各代码的单飞锁 (避免交叉死锁)，拿到后重新判断：等待期间可能已被其他调用刷新
+            with contextlib.ExitStack() as flights:
+                for symbol in sorted(stale):
+                    flights.enter_context(self._flight(f"history:{symbol}"))
+                stale = self._stale_history(stale)
+                if stale:
+                    self._refresh_history(stale, period_days)
+        frames = {}
+        with self._lock:
+            for symbol in symbols:
+                hist = self._load_history(symbol)
+                if hist is not None and not hist.empty:
+                    frames[symbol] = hist["Close"].tail(period_days)
+        if not frames:
+            return pd.DataFrame(columns=symbols)
+        return pd.DataFrame(frames).reindex(columns=symbols)
+
+    def _refresh_history(self, symbols: list, period_days: int):
+        """下载增量 K 线 (调用方持有这些代码的单飞锁)；下载期间不持有 _lock。"""
+        # 已有缓存的代码从最后一根 K 线开始取 (当日 K 线盘中会变化)；无缓存的取 period_days 天
+        starts = {}
+        with self._lock:
+            for symbol in symbols:
+                hist = self._load_history(symbol)
+                if hist is not None and not hist.empty:
+                    start = pd.Timestamp(hist.index[-1]).strftime("%Y-%m-%d")
+                else:
+                    start = (datetime.now() - timedelta(days=period_days * 2 + 3)).strftime("%Y-%m-%d")
+                starts.setdefault(start, []).append(symbol)
+
+        now = time.time()
+        checked = []
+        try:
+            for start, group in starts.items():
+                frame = yf.download(group, start=start, auto_adjust=True, progress=False, threads=True, group_by="ticker")
+                # 请求成功即视为已检查，空结果也记录
+                checked.extend(f"history:{symbol}" for symbol in group)
+                if frame is None or frame.empty:
+                    continue
+                with self._lock:
+                    for symbol in group:
+                        if symbol not in frame.columns.get_level_values(0):
+                            continue
+                        new = frame[symbol].dropna(how="all")
+                        if not new.empty:
+                            old = self._load_history(symbol)
+                            merged = new if old is None else pd.concat([old, new])
+                            merged = merged[~merged.index.duplicated(keep="last")].sort_index().tail(HISTORY_KEEP_ROWS)
+                            self._history[symbol] = merged
+                            self._write(merged, self._file("history", symbol))
+        finally:
+            if checked:
+                with self._lock:
+                    self._touch(checked, now)
+
+    # --- Spot Snapshots ---
+
+    def get_spot(self, name: str, loader, index_col: str, market: str = "CN") -> pd.DataFrame:
+        """
+        返回按 index_col 建索引的实时快照表；loader 为无参函数，只在缓存过期时调用。
+        """
+        key = f"spot:{name}"
+        with tracing.span("market.spot", table=name) as span:
+            frame = self._cached_spot(name, key, market)
+            if frame is not None:
+                span.set(cache="hit", rows=len(frame))
+                return frame
+            # 同一张表只有一个调用去请求上游，其余等待后直接读缓存；其他表与 K 线不受影响
+            with self._flight(key):
+                frame = self._cached_spot(name, key, market)
+                if frame is not None:
+                    span.set(cache="hit", rows=len(frame))
+                    return frame
+                frame = loader()
+                frame = frame.drop_duplicates(subset=index_col).set_index(index_col)
+                with self._lock:
+                    self._spots[name] = frame
+                    self._write(frame, self._file("spot", name))
+                    self._touch(key, time.time())
+            span.set(cache="miss", rows=len(frame))
+            return frame
+
+    def _cached_spot(self, name: str, key: str, market: str):
+        """未过期的快照表，没有或已过期时为 None。"""
+        with self._lock:
+            fetched_at = self._meta_data().get(key, 0)
+            frame = self._spots.get(name)
+            if frame is None and fetched_at:
+                try:
+                    frame = self._spots[name] = self._read(self._file("spot", name))
+                except (OSError, ValueError):
+                    frame = None
+            return frame if frame is not None and is_fresh(market, fetched_at, self.ttl) else None
+
+
+MARKET_CACHE = MarketCache()
@@ -0,0 +1,176 @@
+"""
+本地新闻全文索引。
+
+daily_news 与新闻工具抓取并分析过的条目 (标题、链接、摘要、AI 分析、主题、发布时间) 写入 SQLite，
+search_news_tool 先查本地索引，只有索引里没有足够新的结果时才联网。
+
+- 全文检索使用 FTS5 的 trigram 分词器 (SQLite >= 3.34)：按 3 字符切分，中文无需分词即可做子串匹配。
+  少于 3 个字符的词 (如 "A股"、"芯片") trigram 无法匹配，改用 LIKE 在同一结果集上过滤。
+- SQLite 不支持 FTS5 / trigram 时整体退化为 LIKE 查询，结果一致，只是更慢。
+- 同一链接只保存一条，重复写入时更新标题 / 摘要，已有的分析结果不会被空值覆盖。
+- 超过 NEWS_INDEX_RETENTION_DAYS 天的条目在写入时清理。
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from mcp_tools.news.analysis import UNAVAILABLE
+from mcp_tools.storage import cache_dir
+
+NEWS_INDEX_ENABLED = os.getenv("NEWS_INDEX", "1") != "0"
+NEWS_INDEX_RETENTION_DAYS = float(os.getenv("NEWS_INDEX_RETENTION_DAYS", 30))
+
+# 这些占位文本不是真正的分析结果，不写入索引
+_PLACEHOLDERS = frozenset([UNAVAILABLE, "AI Key 未配置", "暂无分析"])
+
+_COLUMNS = ("link", "title", "summary", "analysis", "topic", "published", "fetched")
+
+
+class NewsIndex:
+    def __init__(self, path=None, retention_days: float = NEWS_INDEX_RETENTION_DAYS):
+        self.path = path
+        self.retention_days = retention_days
+        self.fts = False
+        self._conn = None
+        self._lock = threading.Lock()
+        self._last_prune = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            path = self.path or cache_dir("news") / "index.db"
+            conn = sqlite3.connect(str(path), check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "id INTEGER PRIMARY KEY, link TEXT UNIQUE NOT NULL, title TEXT NOT NULL, summary TEXT, analysis TEXT, "
+                "topic TEXT, published REAL, fetched REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_items_fetched ON items(fetched)")
+            try:
+                conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5("
+                    "title, summary, analysis, topic, content='items', content_rowid='id', tokenize='trigram')"
+                )
+                # 外部内容表：由触发器同步
+                conn.executescript("""
+                    CREATE TRIGGER IF NOT EXISTS items_ai AFTER INSERT ON items BEGIN
+                        INSERT INTO items_fts(rowid, title, summary, analysis, topic)
+                        VALUES (new.id, new.title, new.summary, new.analysis, new.topic);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS items_ad AFTER DELETE ON items BEGIN
+                        INSERT INTO items_fts(items_fts, rowid, title, summary, analysis, topic)
+                        VALUES ('delete', old.id, old.title, old.summary, old.analysis, old.topic);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS items_au AFTER UPDATE ON items BEGIN
+                        INSERT INTO items_fts(items_fts, rowid, title, summary, analysis, topic)
+                        VALUES ('delete', old.id, old.title, old.summary, old.analysis, old.topic);
+                        INSERT INTO items_fts(rowid, title, summary, analysis, topic)
+                        VALUES (new.id, new.title, new.summary, new.analysis, new.topic);
+                    END;
+                """)
+                self.fts = True
+            except sqlite3.OperationalError as e:
+                print(f"News index: FTS5 trigram unavailable ({e}), falling back to LIKE search")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def add(self, items: list, topic: str = None) -> int:
+        """
+        写入 (或更新) 条目。
+
+        Args:
+            items: [{"title", "link", "summary"?, "analysis"?, "published"?}]
+            topic: 主题名 (daily_news 的主题或搜索关键词)
+        """
+        now = time.time()
+        rows = []
+        for item in items:
+            if not item.get("link") or not item.get("title"):
+                continue
+            analysis = item.get("analysis")
+            if analysis in _PLACEHOLDERS:
+                analysis = None
+            rows.append((item["link"], item["title"], item.get("summary") or None,
+                         str(analysis) if analysis else None, topic, item.get("published"), now))
+        if not rows:
+            return 0
+        with self._lock:
+            db = self._db()
+            db.executemany(
+                "INSERT INTO items (link, title, summary, analysis, topic, published, fetched) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(link) DO UPDATE SET title = excluded.title, "
+                "summary = COALESCE(excluded.summary, items.summary), "
+                "analysis = COALESCE(excluded.analysis, items.analysis), "
+                "topic = COALESCE(excluded.topic, items.topic), "
+                "published = COALESCE(excluded.published, items.published), fetched = excluded.fetched",
+                rows,
+            )
+            if now - self._last_prune > 3600:
+                db.execute("DELETE FROM items WHERE fetched < ?", (now - self.retention_days * 86400,))
+                self._last_prune = now
+            db.commit()
+        return len(rows)
+
+    def search(self, query: str = "", hours: float = None, topic: str = None, limit: int = 20) -> list:
+        """
+        关键词 (空格分隔，全部命中) + 时间范围查询，按发布时间倒序。
+
+        Args:
+            query: 关键词，为空时只按时间 / 主题过滤
+            hours: 只返回最近 hours 小时内发布 (无发布时间时按抓取时间) 的条目
+            topic: 只返回该主题的条目
+        """
+        terms = [t.replace('"', "") for t in (query or "").split()]
+        terms = [t for t in terms if t]
+        with self._lock:
+            db = self._db()
+            fts_terms = [t for t in terms if len(t) >= 3] if self.fts else []
+            like_terms = [t for t in terms if t not in fts_terms]
+
+            clauses, params = [], []
+            if fts_terms:
+                clauses.append("items.id IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)")
+                params.append(" AND ".join(f'"{t}"' for t in fts_terms))
+            for term in like_terms:
+                pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                clauses.append("(title LIKE ? ESCAPE '\\' OR summary LIKE ? ESCAPE '\\' "
+                               "OR analysis LIKE ? ESCAPE '\\' OR topic LIKE ? ESCAPE '\\')")
+                params.extend([pattern] * 4)
+            if hours is not None:
+                clauses.append("COALESCE(published, fetched) >= ?")
+                params.append(time.time() - hours * 3600)
+            if topic:
+                clauses.append("topic = ?")
+                params.append(topic)
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            rows = db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM items {where} "
+                "ORDER BY COALESCE(published, fetched) DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+
+NEWS_INDEX = NewsIndex()
+
+
+def record(topic: str, items: list):
+    """写入全局索引；索引不可用时只打印错误，不影响调用方。"""
+    if not NEWS_INDEX_ENABLED or not items:
+        return
+    try:
+        NEWS_INDEX.add(items, topic)
+    except sqlite3.Error as e:
+        print(f"News index unavailable: {e}")
+
+
+def lookup(query: str, hours: float = None, topic: str = None, limit: int = 20) -> list:
+    """查询全局索引；索引关闭或不可用时返回空列表 (调用方回退到联网)。"""
+    if not NEWS_INDEX_ENABLED:
+        return []
+    try:
+        return NEWS_INDEX.search(query, hours=hours, topic=topic, limit=limit)
+    except sqlite3.Error as e:
+        print(f"News index unavailable: {e}")
+        return []
@@ -1,78 +1,85 @@
 import os
-import requests
-import xml.etree.ElementTree as ET
-import json
-import html
-import feedparser
-import yfinance as yf
 import akshare as ak
-import pandas as pd
 import time
 import re
-from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from mcp_tools.news import dedup, digest, hedge, llm, market, news_index
+from mcp_tools.news.feed_cache import FeedCache
+from mcp_tools.news.market_cache import MARKET_CACHE
+from mcp_tools.news.analysis import analyze_batch
+from mcp_tools.registry import check_cancelled, report_progress
+from mcp_tools import tracing
 
 load_dotenv()
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-3-flash-preview:generateContent?key={GEMINI_API_KEY}"
+# 所有 feed 请求共享的条件请求缓存 (磁盘 + 内存)
+FEED_CACHE = FeedCache()
 
-# --- Helper Functions ---
+# A 股行情分层对冲：预算 (秒) 内上一层未返回即启动下一层
+CN_MARKET_HEDGE = os.getenv("CN_MARKET_HEDGE", "1") != "0"
+CN_MARKET_HEDGE_BUDGET = float(os.getenv("CN_MARKET_HEDGE_BUDGET", 4))
+CN_MARKET_DEADLINE = float(os.getenv("CN_MARKET_DEADLINE", 30))
+# 单个行情子请求的等待上限 (秒)：超时视为该字段 / 该层失败，线程无法取消，只是不再等待
+CN_SUBFETCH_TIMEOUT = float(os.getenv("CN_SUBFETCH_TIMEOUT", 15))
+CN_MARKET_STATS = hedge.HedgeStats()
+SUBFETCH_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="subfetch")
+# akshare 子请求单独一个池：超时后仍在运行的调用只占用这里的线程，不会拖住新闻抓取
+AKSHARE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="akshare")
+# 批量新闻中单个关键词的等待上限 (秒)，超时按无结果处理
+NEWS_FETCH_TIMEOUT = float(os.getenv("NEWS_FETCH_TIMEOUT", 30))
+# 研报流式生成：每个 <p> 段落生成完毕即回调，不必等待整篇 (最长 120 秒)
+MARKET_STREAM = os.getenv("MARKET_STREAM", "1") != "0"
 
-def is_within_hours(struct_time, hours=24):
-    if not struct_time: return False
-    try:
-        dt = datetime.fromtimestamp(time.mktime(struct_time), tz=timezone.utc)
-        return datetime.now(timezone.utc) - dt <= timedelta(hours=hours)
-    except: return False
+# --- Helper Functions ---
 
 def deduplicate_items(items):
-    seen_links = set()
-    unique_items = []
-    for item in items:
-        link = item.get('link')
-        if link not in seen_links:
-            seen_links.add(link)
-            unique_items.append(item)
-    return unique_items
+    """按规范化 URL 与近似标题去重 (跨来源的同一事件只保留第一条)。"""
+    return dedup.deduplicate(items)
+
+def filter_entries(entries, hours: int = 24):
+    """按发布时间过滤缓存条目，截止时间只计算一次。"""
+    cutoff = time.time() - hours * 3600
+    return [e for e in entries if e.get('published') and e['published'] >= cutoff]
 
 # --- Core Logic ---
 
-def fetch_rss_news(url: str, hours: int = 24, max_count: int = 15):
+@tracing.traced("news.rss")
+def fetch_rss_news(url: str, hours: int = 24, max_count: int = 15, refresh: int = None):
     try:
-        feed = feedparser.parse(url)
+        entries = FEED_CACHE.get_entries(url, min_refresh=refresh)
+        window = filter_entries(entries, hours=hours)
+        # 同一次解析结果复用于 72h 回退窗口，不再重复下载
+        if len(window) < 2 and hours == 24:
+            window = filter_entries(entries, hours=72)
         news_items = []
-        for entry in feed.entries:
-            pub_parsed = getattr(entry, 'published_parsed', None) or getattr(entry, 'updated_parsed', None)
-            if is_within_hours(pub_parsed, hours=hours):
-                summary = entry.get('summary', '')
-                if len(summary) > 300: summary = summary[:300] + "..."
-                news_items.append({"title": entry.title, "link": entry.link, "summary": summary})
-        
-        if len(news_items) < 2 and hours == 24:
-            return fetch_rss_news(url, hours=72, max_count=max_count)
-        return news_items[:max_count]
+        for entry in window[:max_count]:
+            summary = entry.get('summary', '')
+            if len(summary) > 300: summary = summary[:300] + "..."
+            news_items.append({"title": entry['title'], "link": entry['link'], "summary": summary, "published": entry.get('published')})
+        tracing.current_span().set(items=len(news_items))
+        return news_items
     except Exception as e:
         print(f"Error fetching RSS from {url}: {e}")
+        tracing.record_error(e)
         return []
 
+@tracing.traced("news.search")
 def fetch_google_news(query: str, count: int = 20, hours: int = 24):
     safe_query = quote(query)
     url = f"https://news.google.com/rss/search?q={safe_query}+when:{3 if hours > 24 else 1}d&hl=en-US&gl=US&ceid=US:en"
     try:
-        feed = feedparser.parse(url)
-        news_items = []
-        for entry in feed.entries:
-            pub_parsed = getattr(entry, 'published_parsed', None)
-            if is_within_hours(pub_parsed, hours=hours):
-                news_items.append({"title": entry.title, "link": entry.link})
-        if not news_items and feed.entries:
-            for entry in feed.entries[:3]:
-                news_items.append({"title": entry.title, "link": entry.link})
+        entries = FEED_CACHE.get_entries(url)
+        news_items = [{"title": e['title'], "link": e['link'], "published": e.get('published')} for e in filter_entries(entries, hours=hours)]
+        if not news_items and entries:
+            for entry in entries[:3]:
+                news_items.append({"title": entry['title'], "link": entry['link'], "published": entry.get('published')})
+        tracing.current_span().set(items=len(news_items[:count]))
         return news_items[:count]
     except Exception as e:
         print(f"Error fetching Google news for {query}: {e}")
+        tracing.record_error(e)
         return []
 
 def fetch_china_policy(hours: int = 24):
@@ -86,138 +93,165 @@ def fetch_china_policy(hours: int = 24):
     if caixin_search: all_items.extend(caixin_search)
     return deduplicate_items(all_items)
 
+@tracing.traced("market.us")
 def fetch_us_market_depth():
     try:
         data = {}
-        indices = {"S&P 500": "^GSPC", "Nasdaq": "^IXIC", "VIX": "^VIX"}
-        index_summary = []
-        for name, ticker in indices.items():
-            t = yf.Ticker(ticker)
-            hist = t.history(period="5d")
-            if not hist.empty and len(hist) >= 2:
-                close = hist['Close'].iloc[-1]
-                change = ((close - hist['Close'].iloc[-2]) / hist['Close'].iloc[-2]) * 100
-                index_summary.append(f"{name}: {close:.2f} ({change:+.2f}%)")
-        data['indices'] = index_summary
-
-        sectors = {"Tech (XLK)": "XLK", "Finance (XLF)": "XLF", "Energy (XLE)": "XLE"}
-        sector_summary = []
-        for name, ticker in sectors.items():
-            t = yf.Ticker(ticker)
-            hist = t.history(period="5d")
-            if not hist.empty and len(hist) >= 2:
-                change = ((hist['Close'].iloc[-1] - hist['Close'].iloc[-2]) / hist['Close'].iloc[-2]) * 100
-                sector_summary.append(f"{name}: {change:+.2f}%")
-        data['sectors'] = sector_summary
-
-        sp500 = yf.Ticker("^GSPC")
-        news = []
-        if sp500.news:
-            for item in sp500.news[:8]:
-                title = item.get('title') or item.get('content', {}).get('title', 'No Title')
-                link = item.get('link') or item.get('content', {}).get('canonicalUrl', {}).get('url') or item.get('content', {}).get('clickThroughUrl', {}).get('url')
-                if title: news.append({"title": title, "link": link})
-        data['news'] = news
+        watchlist = market.load_watchlist()
+        symbols = list(market.US_INDICES.values()) + list(market.US_SECTORS.values()) + list(watchlist.values())
+        snapshot = market.fetch_snapshot(symbols)
+        data['indices'] = market.format_indices(snapshot, market.US_INDICES)
+        data['sectors'] = market.format_changes(snapshot, market.US_SECTORS)
+        if watchlist:
+            data['movers'] = market.top_movers(snapshot, watchlist)
+        data['news'] = market.ticker_news("^GSPC", 8)
         return data
     except Exception as e:
         print(f"Error fetching US market depth: {e}")
+        tracing.record_error(e)
         return {"error": str(e)}
 
-def fetch_cn_market_depth():
-    """
-    Tiered Fallback Strategy: Akshare -> Yahoo Finance -> Google News
-    """
-    data = {"indices": [], "total_volume": "未知", "north_money": "未知", "news": []}
-    
-    # Tier 1: Akshare
-    try:
-        indices_df = ak.stock_zh_index_spot_em()
-        target_indices = ["上证指数", "深证成指", "创业板指"]
-        total_vol = 0
-        for idx_name in target_indices:
-            row = indices_df[indices_df['名称'] == idx_name]
-            if not row.empty:
-                current = row['最新价'].values[0]
-                change = row['涨跌幅'].values[0]
-                total_vol += float(row['成交额'].values[0])
-                data['indices'].append(f"{idx_name}: {current} ({change:+.2f}%)")
-        data['total_volume'] = f"{total_vol / 1e8:.2f} 亿"
+def _cn_empty():
+    return {"indices": [], "total_volume": "未知", "north_money": "未知", "news": []}
 
-        try:
-            hsgt_df = ak.stock_hsgt_north_net_flow_em(symbol="北上")
-            if not hsgt_df.empty:
-                data['north_money'] = f"{hsgt_df.iloc[-1]['value']:.2f} 万"
-        except: pass
+def _akshare_call(name: str, *args, **kwargs):
+    """按名称调用 akshare 接口。接口在已安装的版本中不存在 (改名 / 下线) 时抛出 AttributeError，只影响对应字段。"""
+    fn = getattr(ak, name, None)
+    if fn is None:
+        raise AttributeError(f"akshare {getattr(ak, '__version__', '')} has no {name}")
+    with tracing.span(f"akshare.{name}"):
+        return fn(*args, **kwargs)
 
-        try:
-            news_df = ak.stock_telegraph_cls() 
-            for _, row in news_df.head(15).iterrows():
-                data['news'].append({"title": row['title'], "content": row['content']})
-        except: pass
-        
-        return data
-        
+def _cn_tier_akshare():
+    """Tier 1: Akshare。指数快照、北向资金、财联社电报三个子请求并发执行。"""
+    data = _cn_empty()
+    # 只拉取"沪深重要指数"小表，并按名称建索引缓存
+    spot_future = tracing.submit(AKSHARE_POOL, MARKET_CACHE.get_spot, "zh_index_main", lambda: _akshare_call("stock_zh_index_spot_em", symbol="沪深重要指数"), "名称")
+    hsgt_future = tracing.submit(AKSHARE_POOL, _akshare_call, "stock_hsgt_north_net_flow_em", symbol="北上")
+    news_future = tracing.submit(AKSHARE_POOL, _akshare_call, "stock_telegraph_cls")
+
+    try:
+        indices_df = spot_future.result(timeout=CN_SUBFETCH_TIMEOUT)
+    except Exception:
+        # 指数拿不到即整层失败，尚未开始的子请求不再执行
+        hsgt_future.cancel()
+        news_future.cancel()
+        raise
+    target_indices = ["上证指数", "深证成指", "创业板指"]
+    total_vol = 0
+    for idx_name in target_indices:
+        if idx_name in indices_df.index:
+            row = indices_df.loc[idx_name]
+            current = row['最新价']
+            change = row['涨跌幅']
+            total_vol += float(row['成交额'])
+            data['indices'].append(f"{idx_name}: {current} ({change:+.2f}%)")
+    data['total_volume'] = f"{total_vol / 1e8:.2f} 亿"
+
+    try:
+        hsgt_df = hsgt_future.result(timeout=CN_SUBFETCH_TIMEOUT)
+        if not hsgt_df.empty:
+            data['north_money'] = f"{hsgt_df.iloc[-1]['value']:.2f} 万"
     except Exception as e:
-        print(f"Akshare failed ({e}), switching to fallback...")
+        print(f"Akshare north flow failed: {e!r}")
 
-    # Tier 2: Yahoo Finance
     try:
-        yf_map = {"上证指数": "000001.SS", "深证成指": "399001.SZ"}
-        for name, ticker in yf_map.items():
-            t = yf.Ticker(ticker)
-            hist = t.history(period="5d")
-            if not hist.empty and len(hist) >= 2:
-                close = hist['Close'].iloc[-1]
-                change = ((close - hist['Close'].iloc[-2]) / hist['Close'].iloc[-2]) * 100
-                data['indices'].append(f"{name}: {close:.2f} ({change:+.2f}%)")
-        
-        # Yahoo News for A-Shares
-        try:
-            sz = yf.Ticker("000001.SS")
-            if sz.news:
-                 for item in sz.news[:5]:
-                    title = item.get('title') or item.get('content', {}).get('title', 'No Title')
-                    link = item.get('link') or item.get('content', {}).get('canonicalUrl', {}).get('url') or item.get('content', {}).get('clickThroughUrl', {}).get('url')
-                    if title: data['news'].append({"title": title, "link": link})
-        except: pass
-        
-        return data
-        
+        news_df = news_future.result(timeout=CN_SUBFETCH_TIMEOUT)
+        for _, row in news_df.head(15).iterrows():
+            data['news'].append({"title": row['title'], "content": row['content']})
     except Exception as e:
-        print(f"Yahoo fallback failed ({e}), switching to emergency search...")
+        print(f"Akshare telegraph failed: {e!r}")
+    return data if data['indices'] else None
 
-    # Tier 3: Google News Search
+def _cn_tier_yahoo():
+    """Tier 2: Yahoo Finance。指数快照与新闻并发执行。"""
+    data = _cn_empty()
+    news_future = tracing.submit(SUBFETCH_POOL, market.ticker_news, "000001.SS", 5)
+    snapshot = market.fetch_snapshot(market.CN_INDICES_YF.values())
+    data['indices'].extend(market.format_indices(snapshot, market.CN_INDICES_YF))
+    # Yahoo News for A-Shares
     try:
-        emergency_news = fetch_google_news("A股收盘", count=5, hours=24)
-        data['news'] = emergency_news
-        data['indices'] = ["数据获取失败，仅提供新闻参考"]
-        return data
-    except:
+        data['news'].extend(news_future.result(timeout=CN_SUBFETCH_TIMEOUT))
+    except Exception as e:
+        print(f"Yahoo A-share news failed: {e!r}")
+    return data if data['indices'] else None
+
+def _cn_tier_search():
+    """Tier 3: Google News Search。"""
+    data = _cn_empty()
+    data['news'] = fetch_google_news("A股收盘", count=5, hours=24)
+    data['indices'] = ["数据获取失败，仅提供新闻参考"]
+    return data
+
+def get_hedge_stats() -> dict:
+    """A 股行情各数据层的耗时 (p50/p95) 与胜出率，用于调整 CN_MARKET_HEDGE_BUDGET。"""
+    return CN_MARKET_STATS.snapshot()
+
+@tracing.traced("market.cn")
+def fetch_cn_market_depth(hedged: bool = None):
+    """
+    Tiered Fallback Strategy: Akshare -> Yahoo Finance -> Google News
+
+    每层拿不到指数数据即视为失败。对冲模式下，上一层超过 CN_MARKET_HEDGE_BUDGET 秒未返回就并行启动下一层，取最先成功的结果；
+    整体耗时受 CN_MARKET_DEADLINE 约束。
+    """
+    hedged = CN_MARKET_HEDGE if hedged is None else hedged
+    tiers = [("akshare", _cn_tier_akshare), ("yahoo", _cn_tier_yahoo), ("search", _cn_tier_search)]
+    if hedged:
+        tier, data = hedge.hedged_first(tiers, CN_MARKET_STATS, budget=CN_MARKET_HEDGE_BUDGET, deadline=CN_MARKET_DEADLINE)
+    else:
+        tier, data = hedge.run_sequential(tiers, CN_MARKET_STATS, timeout=CN_MARKET_DEADLINE)
+    tracing.current_span().set(tier=tier or "none")
+    if data is None:
         return {"indices": ["完全获取失败"], "news": []}
+    return data
 
 def analyze_news_with_ai(news_items, category: str):
+    """
+    单主题分析，内部走批量分析引擎 (按标题缓存，按 ID 回填)。
+    """
     if not news_items: return []
-    if not GEMINI_API_KEY: return ["AI Key 未配置"] * len(news_items)
-    titles = [item.get('title', '') for item in news_items]
-    titles_text = "\n".join([f"{i+1}. {t}" for i, t in enumerate(titles)])
-    prompt = f"Analyze these '{category}' headlines from the last 24h in Chinese (Simplified). 3-5 sentences each. Return JSON array."
-    payload = {"contents": [{"parts": [{"text": f"{prompt}\n\n{titles_text}"}]}], "generationConfig": {"responseMimeType": "application/json"}}
-    try:
-        response = requests.post(GEMINI_URL, json=payload, timeout=60)
-        if response.status_code == 200:
-            content = response.json()["candidates"][0]["content"]["parts"][0]["text"]
-            return json.loads(content.replace("```json", "").replace("```", "").strip())
-    except: pass
-    return ["AI 分析暂时不可用"] * len(news_items)
-
-def analyze_stock_market_multi(us_data, cn_data):
+    return analyze_batch({category: news_items})[category]
+
+_STRUCTURE_TAGS = re.compile(r'<!DOCTYPE[^>]*>|<html>|<head>.*?</head>|<body>|</body>|</html>', flags=re.IGNORECASE | re.DOTALL)
+_SECTION_END = re.compile(r'</p\s*>', flags=re.IGNORECASE)
+
+def clean_report_html(content: str) -> str:
+    """即使 prompt 约束，也做一次清理：去掉代码块标记与非预期的 HTML 结构。"""
+    content = content.replace("```html", "").replace("```", "")
+    return _STRUCTURE_TAGS.sub('', content).strip()
+
+def iter_report_sections(chunks):
+    """
+    把流式文本块切分为已清理的 <p> 段落：遇到 </p> 即产出一段，末尾不完整的部分最后产出。
+    代码块标记等可能跨块出现，因此只在段落完整后再清理。
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            match = _SECTION_END.search(buffer)
+            if not match:
+                break
+            section, buffer = clean_report_html(buffer[:match.end()]), buffer[match.end():]
+            if section:
+                yield section
+    section = clean_report_html(buffer)
+    if section:
+        yield section
+
+def analyze_stock_market_multi(us_data, cn_data, on_section=None):
     """
     综合研报生成。
+
+    Args:
+        on_section: 可选回调。流式模式 (MARKET_STREAM) 下每生成完一个 <p> 段落就以该段 HTML 调用一次，
+            返回值仍是完整研报。
     """
     prompt = f"""
     你是全球顶级策略分析师。请结合以下【美股数据】和【A股数据】，写一份全球视角的深度市场分析。
     
-    【美股数据】：指数: {us_data.get('indices')}, 板块: {us_data.get('sectors')}, 新闻: {[n['title'] for n in us_data.get('news', [])]}
+    【美股数据】：指数: {us_data.get('indices')}, 板块: {us_data.get('sectors')}, 自选异动: {us_data.get('movers', [])}, 新闻: {[n['title'] for n in us_data.get('news', [])]}
     【A股数据】：指数: {cn_data.get('indices')}, 成交额: {cn_data.get('total_volume')}, 北向: {cn_data.get('north_money')}, 电报: {[n.get('title') for n in cn_data.get('news', [])[:5]]}
     
     输出格式要求：
@@ -226,17 +260,20 @@ def analyze_stock_market_multi(us_data, cn_data):
     - 仅可使用 `<b>...</b>` 对关键词进行加粗。
     - 严格分 5 个维度（宏观、A股情绪、热点板块、风险、策略），每个维度 200 字左右。
     """
-    payload = {"contents": [{"parts": [{"text": prompt}]}]}
+    backend = llm.get_backend()
+    if on_section is not None and MARKET_STREAM:
+        sections = []
+        try:
+            for section in iter_report_sections(backend.stream(prompt, timeout=60)):
+                sections.append(section)
+                on_section(section)
+        except Exception as e:
+            print(f"Global Stock Analysis Stream Error: {e}")
+            if not sections:
+                return "AI 深度分析生成失败。"
+        return "\n".join(sections)
     try:
-        response = requests.post(GEMINI_URL, json=payload, timeout=120)
-        if response.status_code == 200:
-            result = response.json()
-            content = result["candidates"][0]["content"]["parts"][0]["text"]
-            # 即使 prompt 约束，也做一次清理，以防万一
-            content = content.replace("```html", "").replace("```", "").strip()
-            # 移除非预期的 HTML 结构
-            content = re.sub(r'<!DOCTYPE[^>]*>|<html>|<head>.*?</head>|<body>|</body>|</html>', '', content, flags=re.IGNORECASE | re.DOTALL)
-            return content.strip()
+        return clean_report_html(backend.generate(prompt, timeout=120))
     except Exception as e:
         print(f"Global Stock Analysis Error: {e}")
         return "AI 深度分析生成失败。"
@@ -244,17 +281,91 @@ def analyze_stock_market_multi(us_data, cn_data):
 def get_news_data(query: str, display_name: str = None, count: int = 5, hours: int = 24) -> dict:
     display_name = display_name or query
     items = fetch_google_news(query, count, hours=hours)
+    # 作为 MCP 工具调用时，客户端已取消就不再发起耗时的 AI 分析
+    check_cancelled()
     analyses = analyze_news_with_ai(items, display_name)
     results = []
     for i, item in enumerate(items):
         analysis = analyses[i] if i < len(analyses) else "暂无分析"
-        results.append({"title": item['title'], "link": item['link'], "analysis": analysis})
+        results.append({"title": item['title'], "link": item['link'], "analysis": analysis, "published": item.get('published')})
+    news_index.record(display_name, results)
     return {"topic": display_name, "items": results}
 
+def get_news_batch(queries: list, count: int = 5, hours: int = 24, on_group=None) -> list:
+    """
+    多个关键词一次完成：并发抓取 -> 跨关键词去重 -> 一次批量分析 (analyze_batch 合并为少量 LLM 请求)。
+
+    Args:
+        queries: ["关键词", ...] 或 [{"query": "关键词", "count": 3}, ...]，重复的关键词只保留第一个
+        count: 未指定 count 的关键词默认条数
+        on_group: 每组结果就绪时回调 on_group(序号, 组数, {"topic", "items"})
+
+    Returns:
+        [{"topic", "items"}]，与 queries 顺序一致。
+    """
+    specs = {}
+    for q in queries:
+        query, n = (q.get('query', ''), q.get('count', count)) if isinstance(q, dict) else (q, count)
+        query = str(query).strip()
+        if query and query not in specs:
+            specs[query] = int(n)
+
+    # 1. 并发抓取
+    futures = {query: tracing.submit(SUBFETCH_POOL, fetch_google_news, query, n, hours) for query, n in specs.items()}
+    fetched = {}
+    for query, future in futures.items():
+        try:
+            fetched[query] = future.result(timeout=NEWS_FETCH_TIMEOUT)
+        except Exception as e:
+            print(f"News fetch for '{query}' failed: {e!r}")
+            fetched[query] = []
+    check_cancelled()
+
+    # 2. 同一事件只保留在第一个关键词下
+    keep = {id(item) for item in deduplicate_items([item for items in fetched.values() for item in items])}
+    groups = {query: [item for item in items if id(item) in keep] for query, items in fetched.items()}
+
+    # 3. 所有关键词的条目合并分析
+    analyses = analyze_batch({query: items for query, items in groups.items() if items})
+    results = []
+    for query, items in groups.items():
+        group_analyses = analyses.get(query, [])
+        group = {"topic": query, "items": [
+            {"title": item['title'], "link": item['link'], "published": item.get('published'),
+             "analysis": group_analyses[i] if i < len(group_analyses) else "暂无分析"}
+            for i, item in enumerate(items)
+        ]}
+        news_index.record(query, group['items'])
+        if on_group:
+            on_group(len(results), len(groups), group)
+        results.append(group)
+    return results
+
+def format_news_group(report_data: dict) -> str:
+    if not report_data['items']: return f"未找到关于 '{report_data['topic']}' 的新闻。"
+    section = digest.Section(report_data['topic'], items=report_data['items'])
+    return digest.render_mcp(section, f"🔹 <b>{section.name} 新闻简报</b>")
+
 def fetch_news_tool(query: str, count: int = 5) -> str:
-    report_data = get_news_data(query, count=count)
-    if not report_data['items']: return f"未找到关于 '{query}' 的新闻。"
-    output = f"🔹 <b>{report_data['topic']} 新闻简报</b>\n\n"
-    for i, item in enumerate(report_data['items']):
-        output += f"{i+1}. <a href=\"{item['link']}\">{html.escape(item['title'])}</a>\n   💡 <code>{html.escape(str(item['analysis']))}</code>\n\n"
-    return output
+    return format_news_group(get_news_data(query, count=count))
+
+def fetch_news_batch_tool(queries: list, count: int = 5, hours: int = 24) -> str:
+    """每组就绪后立即作为进度通知推给客户端，最终结果为按关键词分组的全部内容。"""
+    def on_group(index, total, group):
+        report_progress(index + 1, total, format_news_group(group))
+
+    return "\n".join(format_news_group(group) for group in get_news_batch(queries, count=count, hours=hours, on_group=on_group))
+
+def search_news_tool(query: str, hours: int = 24, count: int = 10, topic: str = None) -> str:
+    """
+    先查本地全文索引 (daily_news 与新闻工具抓取并分析过的条目)，毫秒级返回；
+    时间窗口内没有命中时才联网搜索，结果写回索引。指定 topic 时只查本地。
+    """
+    items = news_index.lookup(query, hours=hours, topic=topic, limit=count)
+    source = "本地索引"
+    if not items and not topic:
+        items = get_news_data(query, count=count, hours=hours)['items']
+        source = "实时搜索"
+    if not items: return f"未找到关于 '{query}' 的新闻。"
+    section = digest.Section(query, items=items)
+    return digest.render_mcp(section, f"🔹 <b>{section.name} 新闻检索</b> ({source}, {len(items)} 条)", stamp=True)
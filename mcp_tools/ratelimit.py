@@ -0,0 +1,47 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶限流器。
+
+    Args:
+        rate: 每秒补充的令牌数 (例如 RPM / 60)
+        capacity: 桶容量，即允许的最大突发请求数
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = float(rate)
+        self.capacity = float(max(capacity, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1, timeout: float = None) -> bool:
+        """阻塞直到取得令牌；超时返回 False。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate if self.rate > 0 else 1.0
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def penalize(self, seconds: float):
+        """服务端返回 429 时，清空令牌并推迟后续请求。"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0) - seconds * self.rate
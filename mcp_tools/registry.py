@@ -0,0 +1,173 @@
+"""
+MCP 工具的延迟加载注册表。
+
+各工具包的 __init__ 只声明工具的签名与文档 (轻量的占位函数)，实现所在的模块
+(往往依赖 akshare / yfinance / pandas 等重型库) 在第一次调用时才导入。
+MCP Server 启动时只需要签名来生成工具描述，因此启动时间与内存不再受重型依赖影响。
+
+- MCP_EAGER_TOOLS=1   启动时立即导入全部实现 (旧行为)
+- MCP_TOOL_WARMUP=1   启动后在后台线程预热导入，首次调用不必等待
+
+注册给 MCP Server 的工具都是异步函数：
+- 实现本身是 async 函数时直接 await，取消会一直传到底层 I/O。
+- 阻塞实现 (yfinance / akshare / smtplib ...) 放到有界线程池 TOOL_EXECUTOR 中运行，
+  不占用事件循环；客户端取消或超时后，实现可通过 check_cancelled() 在阶段之间提前退出。
+- 每个工具有独立的并发上限 (limit) 与超时 (timeout)。
+- 实现可通过 report_progress() 把阶段进度 / 部分结果作为 MCP 进度通知先行推给客户端
+  (可在线程池中调用；不在 MCP 请求中时忽略)。
+"""
+import asyncio
+import contextvars
+import functools
+import importlib
+import inspect
+import os
+import threading
+import weakref
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+EAGER_TOOLS = os.getenv("MCP_EAGER_TOOLS", "0") == "1"
+TOOL_WARMUP = os.getenv("MCP_TOOL_WARMUP", "0") == "1"
+TOOL_WORKERS = int(os.getenv("MCP_TOOL_WORKERS", 32))
+
+TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+_TOOLS = []
+_lock = threading.Lock()
+# 事件循环 -> {工具名: asyncio.Semaphore}
+_limits = weakref.WeakKeyDictionary()
+_cancel_event = contextvars.ContextVar("tool_cancel_event", default=None)
+_progress = contextvars.ContextVar("tool_progress", default=None)
+
+
+def cancelled() -> bool:
+    """当前 (线程池中的) 工具调用是否已被客户端取消或超时。"""
+    event = _cancel_event.get()
+    return event is not None and event.is_set()
+
+
+def check_cancelled():
+    """在阻塞实现的阶段之间调用：调用已取消时抛出 CancelledError。"""
+    if cancelled():
+        raise CancelledError()
+
+
+def report_progress(progress: float, total: float = None, message: str = None):
+    """向客户端发送进度通知，message 可携带已完成部分的结果。"""
+    reporter = _progress.get()
+    if reporter is not None:
+        reporter(progress, total, message)
+
+
+async def _send_progress(ctx, progress, total, message):
+    try:
+        await ctx.report_progress(progress, total, message)
+    except Exception as e:
+        print(f"Progress notification failed: {e}")
+
+
+def _progress_reporter():
+    """当前 FastMCP 请求的进度回调 (线程安全)；不在请求上下文中时返回 None。"""
+    try:
+        from fastmcp.server.dependencies import get_context
+        ctx = get_context()
+    except (ImportError, RuntimeError):
+        return None
+    loop = asyncio.get_running_loop()
+
+    def report(progress, total, message):
+        loop.call_soon_threadsafe(lambda: loop.create_task(_send_progress(ctx, progress, total, message)))
+    return report
+
+
+def _semaphore(name: str, limit: int) -> asyncio.Semaphore:
+    limits = _limits.setdefault(asyncio.get_running_loop(), {})
+    if name not in limits:
+        limits[name] = asyncio.Semaphore(limit)
+    return limits[name]
+
+
+async def _run_blocking(fn, *args, **kwargs):
+    event = threading.Event()
+    context = contextvars.copy_context()
+    context.run(_cancel_event.set, event)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(TOOL_EXECUTOR, functools.partial(context.run, fn, *args, **kwargs))
+    except BaseException:
+        event.set()
+        raise
+
+
+def lazy_tool(module: str, name: str = None, limit: int = 8, timeout: float = None):
+    """
+    把占位函数声明为延迟加载的异步工具。
+
+    占位函数只提供签名与文档 (函数体不会执行)；调用时导入 module 并转发给其中
+    同名 (或 name 指定) 的函数。
+
+    Args:
+        module: 实现所在模块
+        name: 实现函数名，默认与占位函数同名
+        limit: 该工具的最大并发调用数
+        timeout: 单次调用超时 (秒)，超时抛出 TimeoutError
+
+    Example:
+        @lazy_tool("mcp_tools.news.tools", limit=4, timeout=300)
+        def fetch_news_tool(query: str, count: int = 5) -> str:
+            \"\"\"...\"\"\"
+    """
+    def decorator(stub):
+        target_name = name or stub.__name__
+        resolved = []
+
+        def resolve():
+            if not resolved:
+                with _lock:
+                    if not resolved:
+                        impl = getattr(importlib.import_module(module), target_name)
+                        if inspect.signature(impl) != inspect.signature(stub):
+                            print(f"Warning: signature of {module}.{target_name} differs from its lazy declaration")
+                        resolved.append(impl)
+            return resolved[0]
+
+        async def invoke(args, kwargs):
+            impl = resolved[0] if resolved else await _run_blocking(resolve)
+            if inspect.iscoroutinefunction(impl):
+                return await impl(*args, **kwargs)
+            return await _run_blocking(impl, *args, **kwargs)
+
+        @functools.wraps(stub)
+        async def wrapper(*args, **kwargs):
+            async with _semaphore(stub.__name__, limit):
+                token = _progress.set(_progress_reporter())
+                try:
+                    return await asyncio.wait_for(invoke(args, kwargs), timeout)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"{stub.__name__} timed out after {timeout}s") from None
+                finally:
+                    _progress.reset(token)
+
+        wrapper.lazy_module = module
+        wrapper.resolve = resolve
+        wrapper.is_loaded = lambda: bool(resolved)
+        _TOOLS.append(wrapper)
+        return wrapper
+
+    return decorator
+
+
+def load_all(tools: list = None):
+    """导入全部 (或指定) 延迟工具的实现模块。"""
+    for tool in tools if tools is not None else list(_TOOLS):
+        try:
+            tool.resolve()
+        except Exception as e:
+            print(f"Error loading tool {tool.__name__} from {tool.lazy_module}: {e}")
+
+
+def warmup(tools: list = None) -> threading.Thread:
+    """在后台守护线程中预热导入，立即返回该线程。"""
+    thread = threading.Thread(target=load_all, args=(tools,), name="tool-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,15 @@
+import os
+
+from mcp_tools.registry import lazy_tool
+
+# MCP_SCHEDULER=1 时 mcp_server 在同一进程内启动常驻调度器 (见 mcp_tools/scheduler/service.py)
+SCHEDULER_ENABLED = os.getenv("MCP_SCHEDULER", "0") == "1"
+
+@lazy_tool("mcp_tools.scheduler.service", limit=4, timeout=30)
+def scheduler_status_tool() -> str:
+    """
+    查看常驻调度器中 tasks.json 各定时任务的状态：计划、下次运行时间、是否正在运行、
+    最近一次耗时与错误、运行 / 失败 / 因重叠跳过的次数，以及耗时 p50 / p95。
+    """
+
+MCP_TOOLS = [scheduler_status_tool]
@@ -0,0 +1,419 @@
+"""
+常驻定时任务调度器。
+
+读取 tasks.json，在同一进程内按 cron 表达式运行任务：pandas / akshare / yfinance 只导入一次，
+HTTP / SMTP 连接池与各类缓存在两次运行之间保持温热，高频任务 (例如每小时的行情快照) 只付出任务本身的开销。
+
+tasks.json 中每个任务：
+- id / description / schedule (5 段 cron，本地时间) / status (只调度 "active")
+- target: 进程内调用的函数，"tasks/news/daily_news.py:main" (相对项目根目录的脚本)
+  或 "mcp_tools.news.tools:fetch_cn_market_depth" (模块)；
+  没有 target 时回退为按 command 启动子进程 (仍由调度器负责定时与防重叠)
+- jitter: (可选) 在计划时间之后随机延后的最大秒数，默认 SCHEDULER_JITTER
+
+上一次运行尚未结束时跳过本次 (防重叠) 并计数。tasks.json 修改后自动重新加载。
+各任务的下次运行时间、最近耗时 (p50 / p95)、失败次数与最近错误可通过 status() 或
+scheduler_status_tool 查看，每次运行结束后也写入 ~/.cache/ai_apps/scheduler/status.json。
+
+- 独立运行: python -m mcp_tools.scheduler.service
+- 与 MCP Server 同进程运行: MCP_SCHEDULER=1 python mcp_server.py
+"""
+import contextvars
+import importlib
+import importlib.util
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from mcp_tools.storage import cache_dir
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+SCHEDULER_TASKS = os.getenv("SCHEDULER_TASKS", os.path.join(ROOT, "tasks.json"))
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", 4))
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", 0))
+# 主循环最长休眠时间 (秒)，也是检查 tasks.json 是否修改的间隔
+SCHEDULER_POLL = float(os.getenv("SCHEDULER_POLL", 30))
+
+# --- Cron ---
+
+class CronSchedule:
+    """5 段 cron 表达式 (分 时 日 月 周)，支持 * , - / ；周日为 0 或 7。日与周同时限定时满足其一即可。"""
+
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expr: str):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError(f"Invalid cron expression: {expr}")
+        self.expr = expr
+        minutes, hours, days, months, weekdays = (self._parse(p, lo, hi) for p, (lo, hi) in zip(parts, self.FIELDS))
+        self.minutes = sorted(minutes)
+        self.hours = sorted(hours)
+        self.days = days
+        self.months = months
+        self.weekdays = {0 if d == 7 else d for d in weekdays}
+        self._either_day = parts[2] != "*" and parts[4] != "*"
+
+    @staticmethod
+    def _parse(field: str, lo: int, hi: int) -> set:
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step = part.split("/", 1)
+                step = int(step)
+            if part == "*":
+                start, end = lo, hi
+            elif "-" in part:
+                start, end = (int(v) for v in part.split("-", 1))
+            else:
+                start = int(part)
+                end = hi if step > 1 else start
+            if step < 1 or start < lo or end > hi or start > end:
+                raise ValueError(f"Invalid cron field: {field}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        weekday = (moment.weekday() + 1) % 7  # cron: 0 = 周日
+        if self._either_day:
+            return moment.day in self.days or weekday in self.weekdays
+        return moment.day in self.days and weekday in self.weekdays
+
+    def next_after(self, moment: datetime) -> datetime:
+        """moment 之后 (不含) 的第一个匹配时间。"""
+        t = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(366 * 5):
+            if t.month in self.months and self._day_matches(t):
+                for hour in self.hours:
+                    if hour < t.hour:
+                        continue
+                    for minute in self.minutes:
+                        if hour == t.hour and minute < t.minute:
+                            continue
+                        return t.replace(hour=hour, minute=minute)
+            t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+        raise ValueError(f"Cron expression never matches: {self.expr}")
+
+# --- Jobs ---
+
+_targets = {}
+_targets_lock = threading.Lock()
+
+
+def load_target(target: str):
+    """解析 "path/to/script.py:func" 或 "package.module:func"，模块只加载一次。"""
+    location, _, func = target.partition(":")
+    if not func:
+        raise ValueError(f"Invalid target (expected module:function): {target}")
+    with _targets_lock:
+        module = _targets.get(location)
+        if module is None:
+            if location.endswith(".py"):
+                path = location if os.path.isabs(location) else os.path.join(ROOT, location)
+                name = os.path.splitext(os.path.basename(path))[0]
+                # 脚本按自身目录导入同级模块 (例如 daily_news 的 run_state)
+                if os.path.dirname(path) not in sys.path:
+                    sys.path.insert(0, os.path.dirname(path))
+                module = sys.modules.get(name)
+                if module is None or os.path.abspath(getattr(module, "__file__", "")) != os.path.abspath(path):
+                    spec = importlib.util.spec_from_file_location(name, path)
+                    module = importlib.util.module_from_spec(spec)
+                    sys.modules[name] = module
+                    spec.loader.exec_module(module)
+            else:
+                module = importlib.import_module(location)
+            _targets[location] = module
+    return getattr(module, func)
+
+
+class Job:
+    def __init__(self, spec: dict):
+        self.configure(spec)
+        self.next_run = None
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_start = None
+        self.last_duration = None
+        self.last_error = None
+        self.durations = deque(maxlen=50)
+
+    def configure(self, spec: dict):
+        """(重新) 读取配置，运行统计保留。"""
+        schedule = CronSchedule(spec["schedule"])
+        if not spec.get("target") and not spec.get("command"):
+            raise ValueError(f"Task {spec['id']} has neither target nor command")
+        self.spec = spec
+        self.id = spec["id"]
+        self.description = spec.get("description", "")
+        self.schedule = schedule
+        self.target = spec.get("target")
+        self.command = spec.get("command")
+        self.jitter = float(spec.get("jitter", SCHEDULER_JITTER))
+        self.active = spec.get("status", "active") == "active"
+
+    def plan(self, now: datetime):
+        self.next_run = self.schedule.next_after(now) + timedelta(seconds=random.uniform(0, self.jitter))
+
+    def execute(self):
+        if self.target:
+            load_target(self.target)()
+            return
+        # 子进程输出跟随任务的 stdout (在 MCP Server 内为 stderr)
+        try:
+            stdout = (_job_stdout.get() or sys.stdout).fileno()
+        except (AttributeError, ValueError, OSError):
+            stdout = None
+        result = subprocess.run(shlex.split(self.command), cwd=ROOT, stdout=stdout)
+        if result.returncode != 0:
+            raise RuntimeError(f"exit code {result.returncode}")
+
+    def snapshot(self) -> dict:
+        samples = sorted(self.durations)
+
+        def pick(q):
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))], 2) if samples else None
+
+        return {
+            "description": self.description,
+            "schedule": self.schedule.expr,
+            "mode": "in-process" if self.target else "subprocess",
+            "active": self.active,
+            "running": self.running,
+            "next_run": self.next_run.isoformat(timespec="seconds") if self.next_run and self.active else None,
+            "last_start": datetime.fromtimestamp(self.last_start).isoformat(timespec="seconds") if self.last_start else None,
+            "last_duration": round(self.last_duration, 2) if self.last_duration is not None else None,
+            "last_error": self.last_error,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped_overlap": self.skipped,
+            "p50": pick(0.5),
+            "p95": pick(0.95),
+        }
+
+# --- Scheduler ---
+
+_job_stdout = contextvars.ContextVar("scheduler_job_stdout", default=None)
+_stdout_lock = threading.Lock()
+
+
+class _JobStdout:
+    """
+    MCP Server 的 stdio 传输占用 stdout：安装后，同进程运行的任务 (及其经 tracing.submit 派生的线程)
+    print 写入 stderr，其余线程 (例如并发的工具调用) 仍写入原来的 stdout。
+    """
+
+    def __init__(self, stdout):
+        self._stdout = stdout
+
+    def _target(self):
+        return _job_stdout.get() or self._stdout
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+
+def _install_job_stdout():
+    with _stdout_lock:
+        if not isinstance(sys.stdout, _JobStdout):
+            sys.stdout = _JobStdout(sys.stdout)
+
+
+class Scheduler:
+    def __init__(self, path: str = SCHEDULER_TASKS, workers: int = SCHEDULER_WORKERS, quiet_stdout: bool = False):
+        self.path = path
+        self.quiet_stdout = quiet_stdout
+        self.jobs = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._thread = None
+
+    def load(self):
+        """tasks.json 修改后重新加载；配置未变的任务保留运行统计。"""
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._mtime:
+                return
+            with open(self.path, encoding="utf-8") as f:
+                specs = json.load(f)
+        except (OSError, ValueError) as e:
+            self._log(f"Scheduler: cannot load {self.path}: {e}")
+            return
+        now = datetime.now()
+        jobs = {}
+        for spec in specs:
+            try:
+                job = self.jobs.get(spec.get("id"))
+                if job is None:
+                    job = Job(spec)
+                    job.plan(now)
+                elif job.spec != spec:
+                    job.configure(spec)
+                    job.plan(now)
+                jobs[job.id] = job
+            except (KeyError, ValueError) as e:
+                self._log(f"Scheduler: skipping invalid task {spec.get('id')}: {e}")
+        with self._lock:
+            self.jobs = jobs
+        self._mtime = mtime
+        self._log(f"Scheduler: loaded {sum(j.active for j in jobs.values())} active task(s) from {self.path}")
+
+    def _log(self, message: str):
+        print(message, file=sys.stderr if self.quiet_stdout else sys.stdout)
+
+    def start(self) -> threading.Thread:
+        if self.quiet_stdout:
+            _install_job_stdout()
+        self.load()
+        self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, wait: bool = True):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=wait)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.load()
+            now = datetime.now()
+            with self._lock:
+                jobs = [job for job in self.jobs.values() if job.active]
+            for job in jobs:
+                if job.next_run is not None and job.next_run <= now:
+                    self._launch(job, now)
+            wait = SCHEDULER_POLL
+            upcoming = [job.next_run for job in jobs if job.next_run is not None]
+            if upcoming:
+                wait = min(wait, (min(upcoming) - datetime.now()).total_seconds())
+            self._stop.wait(max(0.1, wait))
+
+    def _launch(self, job: Job, now: datetime):
+        job.plan(now)
+        with self._lock:
+            if job.running:
+                job.skipped += 1
+                self._log(f"Scheduler: {job.id} is still running, skipping this run")
+                return
+            job.running = True
+        self._executor.submit(self._run, job)
+
+    def _run(self, job: Job):
+        job.last_start = time.time()
+        start = time.perf_counter()
+        self._log(f"Scheduler: running {job.id}")
+        token = _job_stdout.set(sys.stderr if self.quiet_stdout else None)
+        try:
+            job.execute()
+            job.last_error = None
+        except BaseException as e:
+            # 脚本中的 sys.exit(0) 视为正常结束
+            if isinstance(e, SystemExit) and not e.code:
+                job.last_error = None
+            else:
+                job.failures += 1
+                job.last_error = f"{type(e).__name__}: {e}"
+                self._log(f"Scheduler: {job.id} failed: {job.last_error}")
+        finally:
+            _job_stdout.reset(token)
+            job.last_duration = time.perf_counter() - start
+            job.durations.append(job.last_duration)
+            job.runs += 1
+            with self._lock:
+                job.running = False
+            self._log(f"Scheduler: {job.id} finished in {job.last_duration:.1f}s")
+            self.write_status()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {job_id: job.snapshot() for job_id, job in self.jobs.items()}
+
+    def write_status(self):
+        path = cache_dir("scheduler") / "status.json"
+        try:
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"updated": datetime.now().isoformat(timespec="seconds"), "pid": os.getpid(),
+                           "jobs": self.status()}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, path)
+        except OSError as e:
+            self._log(f"Scheduler: cannot write status: {e}")
+
+
+_scheduler = None
+
+
+def start(quiet_stdout: bool = False) -> Scheduler:
+    """启动进程内共享的调度器 (重复调用返回同一个)。"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler(quiet_stdout=quiet_stdout)
+        _scheduler.start()
+    return _scheduler
+
+
+def get_status() -> dict:
+    """本进程运行调度器时返回实时状态，否则读取独立调度器进程写入的 status.json。"""
+    if _scheduler is not None:
+        return {"updated": datetime.now().isoformat(timespec="seconds"), "pid": os.getpid(), "jobs": _scheduler.status()}
+    try:
+        with open(cache_dir("scheduler") / "status.json", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# --- MCP Tool ---
+
+def scheduler_status_tool() -> str:
+    status = get_status()
+    if not status.get("jobs"):
+        return "调度器未运行 (或尚无任务运行记录)。"
+
+    def show(value, unit=""):
+        return "-" if value is None else f"{value}{unit}"
+
+    lines = [f"调度器状态 (pid {status.get('pid')}, 更新于 {status.get('updated')}):"]
+    for job_id, job in status["jobs"].items():
+        state = "运行中" if job["running"] else ("已停用" if not job["active"] else "等待")
+        lines.append(f"- {job_id} [{state}] {job['schedule']} ({job['mode']})")
+        lines.append(f"  下次运行: {show(job['next_run'])}  最近开始: {show(job['last_start'])}  "
+                     f"最近耗时: {show(job['last_duration'], 's')}")
+        lines.append(f"  运行 {job['runs']} 次  失败 {job['failures']} 次  跳过 (重叠) {job['skipped_overlap']} 次  "
+                     f"p50 {show(job['p50'], 's')}  p95 {show(job['p95'], 's')}")
+        if job["last_error"]:
+            lines.append(f"  最近错误: {job['last_error']}")
+    return "\n".join(lines)
+
+
+def main():
+    scheduler = start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("Scheduler: stopping...")
+        scheduler.stop(wait=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+import os
+from pathlib import Path
+
+
+def cache_dir(name: str) -> Path:
+    """
+    返回本地缓存子目录 (不存在则创建)。根目录可通过环境变量 MCP_CACHE_DIR 配置，
+    默认 ~/.cache/ai_apps。
+    """
+    root = Path(os.getenv("MCP_CACHE_DIR") or Path.home() / ".cache" / "ai_apps")
+    path = root / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
@@ -1,4 +1,8 @@
-from .tools import send_telegram_tool
+from mcp_tools.registry import lazy_tool
+
+@lazy_tool("mcp_tools.telegram.tools", name="asend_telegram_tool", limit=16, timeout=120)
+def send_telegram_tool(message: str) -> str:
+    ...
 
 # 可以在这里定义该模块希望暴露给 MCP Server 的所有工具
 MCP_TOOLS = [send_telegram_tool]
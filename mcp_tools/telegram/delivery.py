@@ -0,0 +1,273 @@
+"""
+Telegram 投递队列。
+
+- split_message / pack_blocks：按 Telegram 4096 字符 (UTF-16 计数) 与 MAX_MESSAGE_BYTES 字节 (UTF-8，含标签)
+  两个上限切分消息，只在标签之外断开，断点处自动闭合并在下一条重新打开标签。
+- 每个 chat 一个单线程队列，保证同一 chat 内消息顺序；多个 chat 并发投递。
+- 发送节奏由每 chat 与全局令牌桶控制，遇到 429 按 retry_after 退避，不再固定 sleep。
+  Telegram 的限制：同一 chat 约 1 条/秒，群组 / 频道 (chat_id 以 "-" 开头) 每分钟 20 条，
+  整个 bot 约 30 条/秒。私聊允许 CHAT_BURST 条的短突发 (Telegram 能容忍)，之后按限速均匀排开；
+  群组不突发，避免触发 429。
+"""
+import html
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mcp_tools import tracing, transport
+from mcp_tools.ratelimit import TokenBucket
+
+TG_API_BASE = os.getenv("TG_API_BASE", "https://api.telegram.org")
+MAX_MESSAGE_CHARS = 4096
+# 单条消息的字节上限 (UTF-8，含 HTML 标签)，限制标签 / 长链接较多时的请求体大小
+MAX_MESSAGE_BYTES = int(os.getenv("TG_MAX_MESSAGE_BYTES", 16384))
+# 每 chat 的速率 (条/秒) 与私聊突发条数，限制说明见模块文档
+CHAT_RATE = float(os.getenv("TG_CHAT_RATE", 1))
+GROUP_RATE = float(os.getenv("TG_GROUP_RATE", 20 / 60))
+CHAT_BURST = int(os.getenv("TG_CHAT_BURST", 2))
+GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", 30))
+MAX_RETRIES = int(os.getenv("TG_MAX_RETRIES", 5))
+
+_TOKEN = re.compile(r'<[^<>]+>|[^<]+|<')
+_TAG_NAME = re.compile(r'</?([a-zA-Z0-9]+)')
+_BREAK = re.compile(r'[^\n]*\n+|[^\n]+')
+_WORD = re.compile(r'\S*\s+|\S+')
+_ENTITY_TAIL = re.compile(r'&[#\w]{0,10}$')
+_ANY_TAG = re.compile(r'<[^>]+>')
+
+# --- Splitting ---
+
+def utf16_len(text: str) -> int:
+    """Telegram 按 UTF-16 码元计数，emoji 等非 BMP 字符占 2。"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _measure(max_chars: int, max_bytes: int):
+    """
+    消息长度的度量：UTF-16 码元数与按 max_chars / max_bytes 折算后的 UTF-8 字节数取较大者，
+    两个上限因此合并为一个 max_chars 预算 (各片段度量之和不小于拼接后的度量，按和装箱不会超限)。
+    """
+    if not max_bytes:
+        return utf16_len
+    weight = max_chars / max_bytes
+    return lambda text: max(utf16_len(text), len(text.encode("utf-8")) * weight)
+
+
+def _hard_split(text: str, limit: int, measure=utf16_len) -> list:
+    """
+    无法在空白处断开时按字符切分，避免切断 &amp; 之类的实体。
+    每个字符的度量至少为 1，断点只在前 limit 个字符内二分查找，总耗时 O(n log limit)。
+    """
+    pieces = []
+    limit = int(limit)
+    while len(text) > limit or measure(text) > limit:
+        lo, hi = 1, min(len(text), limit)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if measure(text[:mid]) <= limit:
+                lo = mid
+            else:
+                hi = mid - 1
+        cut = lo
+        tail = _ENTITY_TAIL.search(text[:cut])
+        if tail and tail.start() > 0 and ';' in text[tail.start():tail.start() + 12]:
+            cut = tail.start()
+        pieces.append(text[:cut])
+        text = text[cut:]
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def _text_pieces(text: str, limit: int, measure=utf16_len) -> list:
+    """按换行 -> 空白 -> 字符的优先级把文本拆成不超过 limit 的片段。"""
+    pieces = []
+    for line in _BREAK.findall(text):
+        if measure(line) <= limit:
+            pieces.append(line)
+            continue
+        for word in _WORD.findall(line):
+            pieces.extend([word] if measure(word) <= limit else _hard_split(word, limit, measure))
+    return pieces
+
+
+def split_message(text: str, max_chars: int = MAX_MESSAGE_CHARS, max_bytes: int = MAX_MESSAGE_BYTES) -> list:
+    """
+    把已清洗 (白名单 + 已配平) 的 HTML 切分为若干条不超过 max_chars 字符 / max_bytes 字节的消息。
+    每条消息内标签独立配平。
+    """
+    measure = _measure(max_chars, max_bytes)
+    if measure(text) <= max_chars:
+        return [text] if text.strip() else []
+
+    chunks = []
+    current, size = [], 0
+    stack = []  # [(标签名, 开标签)]
+
+    def closing() -> str:
+        return "".join(f"</{name}>" for name, _ in reversed(stack))
+
+    def flush():
+        nonlocal current, size
+        body = "".join(current) + closing()
+        if _ANY_TAG.sub('', body).strip():
+            chunks.append(body.strip())
+        current = [tag for _, tag in stack]
+        size = sum(measure(tag) for tag in current)
+
+    for token in _TOKEN.findall(text):
+        if token.startswith('<') and token.endswith('>') and len(token) > 1:
+            name_match = _TAG_NAME.match(token)
+            name = name_match.group(1).lower() if name_match else ""
+            is_closing = token.startswith('</')
+            extra = measure(token) + (0 if is_closing else measure(f"</{name}>"))
+            if size + extra + measure(closing()) > max_chars and not is_closing:
+                flush()
+            current.append(token)
+            size += measure(token)
+            if is_closing:
+                if stack and stack[-1][0] == name:
+                    stack.pop()
+            else:
+                stack.append((name, token))
+            continue
+
+        reserve = measure(closing())
+        # 单个片段必须能放进"重新打开标签 + 片段 + 闭合标签"的空消息
+        room = max(16, max_chars - reserve - sum(measure(tag) for _, tag in stack))
+        for piece in _text_pieces(token, room, measure):
+            piece_len = measure(piece)
+            if size + piece_len + reserve > max_chars:
+                flush()
+            current.append(piece)
+            size += piece_len
+    flush()
+    return chunks
+
+
+def pack_blocks(header: str, blocks: list, max_chars: int = MAX_MESSAGE_CHARS, max_bytes: int = MAX_MESSAGE_BYTES) -> list:
+    """
+    把若干独立的 HTML 块 (例如一条新闻) 装箱为尽量少的消息，每条以 header 开头。
+    单个块超长时退化为 split_message。
+    """
+    measure = _measure(max_chars, max_bytes)
+    messages = []
+    header_size = measure(header)
+    current, size = [header], header_size  # 当前消息的片段与长度 (增量累加，不重复计算)
+    for block in blocks:
+        block_size = measure(block)
+        if size + block_size <= max_chars:
+            current.append(block)
+            size += block_size
+            continue
+        if len(current) > 1:
+            messages.append("".join(current))
+        current, size = [header, block], header_size + block_size
+        if size > max_chars:
+            messages.extend(split_message("".join(current), max_chars, max_bytes))
+            current, size = [header], header_size
+    if len(current) > 1 or not messages:
+        messages.append("".join(current))
+    return messages
+
+# --- Delivery ---
+
+class TelegramDelivery:
+    """
+    每个 chat 一个单线程执行器 (保证顺序)，不同 chat 并发投递。
+    """
+
+    def __init__(self, token: str, chat_rate: float = CHAT_RATE, chat_burst: int = CHAT_BURST, global_rate: float = GLOBAL_RATE,
+                 group_rate: float = GROUP_RATE):
+        self.url = f"{TG_API_BASE}/bot{token}/sendMessage"
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.global_limiter = TokenBucket(rate=global_rate, capacity=global_rate)
+        self._chats = {}
+        self._lock = threading.Lock()
+
+    def _chat(self, chat_id: str):
+        with self._lock:
+            if chat_id not in self._chats:
+                group = chat_id.startswith("-")
+                self._chats[chat_id] = (
+                    ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"tg-{chat_id}"),
+                    TokenBucket(rate=self.group_rate if group else self.chat_rate, capacity=1 if group else self.chat_burst),
+                )
+            return self._chats[chat_id]
+
+    def _post(self, chat_id: str, limiter: TokenBucket, payload: dict):
+        response = None
+        for _ in range(MAX_RETRIES + 1):
+            limiter.acquire()
+            self.global_limiter.acquire()
+            response = transport.post(self.url, json=payload, timeout=15)
+            if response.status_code != 429:
+                return response
+            try:
+                retry_after = float(response.json().get("parameters", {}).get("retry_after", 1))
+            except ValueError:
+                retry_after = float(response.headers.get("Retry-After", 1))
+            print(f"Telegram rate limited for chat {chat_id}, retry after {retry_after:.0f}s")
+            tracing.current_span().add("rate_limited")
+            limiter.penalize(retry_after)
+        return response
+
+    def _send_chunks(self, chat_id: str, chunks: list) -> bool:
+        with tracing.span("telegram.send", chat=chat_id, chunks=len(chunks), chars=sum(len(c) for c in chunks)) as span:
+            ok = self._send_each(chat_id, chunks)
+            span.set(ok=ok)
+            return ok
+
+    def _send_each(self, chat_id: str, chunks: list) -> bool:
+        _, limiter = self._chat(chat_id)
+        ok = True
+        for chunk in chunks:
+            payload = {"chat_id": chat_id, "text": chunk, "parse_mode": "HTML", "disable_web_page_preview": True}
+            try:
+                response = self._post(chat_id, limiter, payload)
+                if response.status_code == 200:
+                    continue
+                # 只把失败的这一段作为纯文本重发（保底）
+                print(f"Telegram HTML Send Failed, retrying as plain text: {response.text}")
+                tracing.current_span().add("plain_text_fallback")
+                payload["text"] = html.unescape(_ANY_TAG.sub('', chunk))
+                del payload["parse_mode"]
+                response = self._post(chat_id, limiter, payload)
+                ok = ok and response.status_code == 200
+            except Exception as e:
+                print(f"Telegram Error: {e}")
+                tracing.record_error(e)
+                ok = False
+        return ok
+
+    def submit(self, chat_ids: list, chunks: list) -> list:
+        """把消息放入各 chat 的队列，立即返回 Future 列表 (结果为 bool)。"""
+        return [tracing.submit(self._chat(chat_id)[0], self._send_chunks, chat_id, chunks) for chat_id in chat_ids]
+
+    def flush(self):
+        """等待所有已排队的消息发送完毕。"""
+        with self._lock:
+            executors = [executor for executor, _ in self._chats.values()]
+        for executor in executors:
+            executor.submit(lambda: None).result()
+
+
+_deliveries = {}
+_deliveries_lock = threading.Lock()
+
+
+def get_delivery(token: str) -> TelegramDelivery:
+    with _deliveries_lock:
+        if token not in _deliveries:
+            _deliveries[token] = TelegramDelivery(token)
+        return _deliveries[token]
+
+
+def parse_chat_ids(chat_id) -> list:
+    """CHAT_ID 支持逗号分隔的多个 chat。"""
+    if isinstance(chat_id, (list, tuple)):
+        return [str(c) for c in chat_id]
+    return [c.strip() for c in str(chat_id).split(",") if c.strip()]
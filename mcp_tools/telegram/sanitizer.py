@@ -0,0 +1,158 @@
+"""
+Telegram HTML 清洗 v4.0 (单遍扫描)。
+
+一次 re.sub 扫描所有标签：块标签改写、白名单过滤、标签配平同时完成，整体为线性时间。
+每种标签字符串的处理结果会被缓存，重复出现的 <p>、<b> 等只解析一次。
+
+输出与 v3.0 多遍正则实现逐字节一致。v3.0 的多遍替换在"标签内部又出现 <" 的畸形输入上
+存在依赖替换顺序的行为，这类输入 (极少见) 仍交给 _clean_multipass 处理以保持一致。
+"""
+import html
+import re
+
+SUPPORTED_TAGS = frozenset(['b', 'strong', 'i', 'em', 'code', 's', 'strike', 'del', 'u', 'pre', 'a'])
+
+_DOCUMENT_BODY = re.compile(r'<body[^>]*>(.*?)</body>', re.IGNORECASE | re.DOTALL)
+_TAG = re.compile(r'<[^<>]+>')
+_NESTED = re.compile(r'<[^>]*<')
+_BLANK_LINES = re.compile(r'\n\s*\n')
+_TAG_NAME = re.compile(r'</?([a-zA-Z0-9]+)')
+_HREF = re.compile(r'href=["\']([^"\']+)["\']', re.IGNORECASE)
+
+# 块标签改写规则，顺序与 v3.0 的替换顺序一致
+_BLOCK_RULES = [
+    (re.compile(r'<(h1|h2|h3|h4|h5|h6)[^>]*>', re.IGNORECASE), '<b>'),
+    (re.compile(r'</(h1|h2|h3|h4|h5|h6)>', re.IGNORECASE), '</b>\n'),
+    (re.compile(r'<(p|div)[^>]*>', re.IGNORECASE), ''),
+    (re.compile(r'</(p|div)>', re.IGNORECASE), '\n'),
+    (re.compile(r'<br\s*/?>', re.IGNORECASE), '\n'),
+    (re.compile(r'<hr\s*/?>', re.IGNORECASE), '\n---\n'),
+    (re.compile(r'<li[^>]*>', re.IGNORECASE), '• '),
+    (re.compile(r'</li>', re.IGNORECASE), '\n'),
+]
+
+_TEXT, _OPEN, _CLOSE = 0, 1, 2
+
+
+def _filter_tag(full_tag: str) -> str:
+    """白名单过滤单个标签，返回规范化后的标签或空串。"""
+    tag_name_match = _TAG_NAME.match(full_tag)
+    if not tag_name_match: return ""
+    tag_name = tag_name_match.group(1).lower()
+    if tag_name not in SUPPORTED_TAGS: return ""
+
+    if full_tag.startswith('</'):
+        return f"</{tag_name}>"
+    if tag_name == 'a':
+        href_match = _HREF.search(full_tag)
+        if href_match: return f'<a href="{html.escape(href_match.group(1))}">'
+        return ""
+    return f"<{tag_name}>"
+
+
+def _tag_actions(token: str) -> tuple:
+    """
+    把一个标签翻译成动作序列：(_TEXT, 文本) / (_OPEN, 标签名, 标签) / (_CLOSE, 标签名)。
+    """
+    for pattern, replacement in _BLOCK_RULES:
+        if pattern.fullmatch(token):
+            if replacement == '<b>':
+                return ((_OPEN, 'b', '<b>'),)
+            if replacement == '</b>\n':
+                return ((_CLOSE, 'b'), (_TEXT, '\n'))
+            return ((_TEXT, replacement),) if replacement else ()
+    tag = _filter_tag(token)
+    if not tag:
+        return ()
+    name = _TAG_NAME.match(tag).group(1)
+    if tag.startswith('</'):
+        return ((_CLOSE, name),)
+    return ((_OPEN, name, tag),)
+
+
+_ACTIONS_CACHE = {}
+_ACTIONS_CACHE_MAX = 4096
+
+
+def _clean_body(text: str) -> str:
+    stack = []
+    push, pop = stack.append, stack.pop
+    cache = _ACTIONS_CACHE
+    if len(cache) > _ACTIONS_CACHE_MAX:
+        cache.clear()
+
+    def apply(action) -> str:
+        kind = action[0]
+        if kind == _TEXT:
+            return action[1]
+        if kind == _OPEN:
+            push(action[1])
+            return action[2]
+        if stack and stack[-1] == action[1]:
+            pop()
+            return "</" + action[1] + ">"
+        # 忽略不匹配的闭合标签
+        return ""
+
+    def replace(match) -> str:
+        token = match.group()
+        actions = cache.get(token)
+        if actions is None:
+            actions = cache[token] = _tag_actions(token)
+        if len(actions) == 1:
+            return apply(actions[0])
+        return "".join(apply(action) for action in actions)
+
+    # 标签之间的文本由 re.sub 在 C 层直接拷贝，Python 只处理标签本身
+    final_text = _TAG.sub(replace, text)
+    return final_text + "".join("</" + name + ">" for name in reversed(stack))
+
+
+def _clean_multipass(text: str) -> str:
+    """v3.0 多遍实现，只用于标签内嵌套 '<' 的畸形输入。"""
+    for pattern, replacement in _BLOCK_RULES:
+        text = pattern.sub(replacement, text)
+    text = re.sub(r'</?[^>]+>', lambda m: _filter_tag(m.group(0)), text)
+
+    tags_stack = []
+    out = []
+    last_pos = 0
+    for match in re.finditer(r'(</?([a-z]+)[^>]*>)', text, re.IGNORECASE):
+        out.append(text[last_pos:match.start()])
+        tag_str = match.group(1)
+        tag_name = match.group(2).lower()
+        if not tag_str.startswith('</'):
+            tags_stack.append(tag_name)
+            out.append(tag_str)
+        elif tags_stack and tags_stack[-1] == tag_name:
+            tags_stack.pop()
+            out.append(tag_str)
+        last_pos = match.end()
+    out.append(text[last_pos:])
+    while tags_stack:
+        out.append(f"</{tags_stack.pop()}>")
+    return ''.join(out)
+
+
+def clean_html_for_telegram(text: str) -> str:
+    """
+    更严格的 Telegram HTML 清洗。
+    - 检测并剥离完整的 HTML 文档结构。
+    - 严格白名单过滤。
+    - 确保标签正确闭合。
+    """
+    if not text:
+        return ""
+
+    # 0. 文档模式检测与剥离
+    lowered = text.lower()
+    if "<!doctype" in lowered or "<html" in lowered:
+        body_match = _DOCUMENT_BODY.search(text)
+        if body_match:
+            text = body_match.group(1) # 只保留 body 内容
+        else:
+            return html.escape(text[:500]) # 如果没有 body，说明结构混乱，直接转义
+
+    # 1. 单遍改写 + 过滤 + 配平
+    final_text = _clean_multipass(text) if _NESTED.search(text) else _clean_body(text)
+    return _BLANK_LINES.sub('\n\n', final_text).strip()
@@ -1,136 +1,70 @@
 import os
-import requests
-import time
-import re
-import html
+import asyncio
 from dotenv import load_dotenv
+from mcp_tools import tracing
+from mcp_tools.telegram.delivery import get_delivery, parse_chat_ids, split_message
+from mcp_tools.telegram.sanitizer import clean_html_for_telegram
 
 load_dotenv()
 
 # --- Core Logic (For Scripts) ---
 
-def clean_html_for_telegram(text: str) -> str:
+def queue_telegram_message(text: str, token: str = None, chat_id: str = None, trusted: bool = False) -> list:
     """
-    更严格的 Telegram HTML 清洗 v3.0。
-    - 检测并剥离完整的 HTML 文档结构。
-    - 严格白名单过滤。
-    - 确保标签正确闭合。
+    清洗、切分消息并放入各 chat 的发送队列，立即返回 Future 列表 (结果为 bool)。
+    chat_id / CHAT_ID 可用逗号分隔多个 chat，各 chat 并发投递、chat 内保持顺序。
+    trusted=True 表示消息由程序渲染 (见 mcp_tools.news.digest)，已是合法的 Telegram HTML，跳过清洗只做切分。
+    配置缺失时返回 None。
     """
-    if not text:
-        return ""
-    
-    # 0. 文档模式检测与剥离
-    if "<!doctype" in text.lower() or "<html" in text.lower():
-        body_match = re.search(r'<body[^>]*>(.*?)</body>', text, re.IGNORECASE | re.DOTALL)
-        if body_match:
-            text = body_match.group(1) # 只保留 body 内容
-        else:
-            return html.escape(text[:500]) # 如果没有 body，说明结构混乱，直接转义
-
-    # 1. 预处理：将常见块标签转为换行或加粗
-    text = re.sub(r'<(h1|h2|h3|h4|h5|h6)[^>]*>', '<b>', text, flags=re.IGNORECASE)
-    text = re.sub(r'</(h1|h2|h3|h4|h5|h6)>', '</b>\n', text, flags=re.IGNORECASE)
-    text = re.sub(r'<(p|div)[^>]*>', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'</(p|div)>', '\n', text, flags=re.IGNORECASE)
-    text = re.sub(r'<br\s*/?>', '\n', text, flags=re.IGNORECASE)
-    text = re.sub(r'<hr\s*/?>', '\n---\n', text, flags=re.IGNORECASE)
-    text = re.sub(r'<li[^>]*>', '• ', text, flags=re.IGNORECASE)
-    text = re.sub(r'</li>', '\n', text, flags=re.IGNORECASE)
-    
-    # 2. 白名单过滤 & 重构
-    supported_tags = ['b', 'strong', 'i', 'em', 'code', 's', 'strike', 'del', 'u', 'pre', 'a']
+    token = token or os.getenv("TG_TOKEN")
+    chat_id = chat_id or os.getenv("CHAT_ID")
     
-    def process_tags(match):
-        full_tag = match.group(0)
-        is_closing = full_tag.startswith('</')
-        tag_name_match = re.match(r'</?([a-zA-Z0-9]+)', full_tag)
-        
-        if not tag_name_match: return ""
-        tag_name = tag_name_match.group(1).lower()
-        if tag_name not in supported_tags: return ""
-            
-        if is_closing:
-            return f"</{tag_name}>"
-        else:
-            if tag_name == 'a':
-                href_match = re.search(r'href=["\']([^"\']+)["\']', full_tag, re.I)
-                if href_match: return f'<a href="{html.escape(href_match.group(1))}">'
-                return ""
-            return f"<{tag_name}>"
+    if not token or not chat_id:
+        print("Error: TG_TOKEN or CHAT_ID not found.")
+        return None
 
-    text = re.sub(r'</?[^>]+>', process_tags, text)
-    
-    # 3. 标签自动闭合检查
-    tags_stack = []
-    final_text = ""
-    last_pos = 0
-    # 正则需要匹配 <tag>, </tag>, <a href="...">
-    tag_pattern = re.compile(r'(</?([a-z]+)[^>]*>)', re.IGNORECASE)
-    
-    for match in tag_pattern.finditer(text):
-        final_text += text[last_pos:match.start()]
-        tag_str = match.group(1)
-        tag_name = match.group(2).lower()
-        is_closing = tag_str.startswith('</')
-        
-        if not is_closing:
-            tags_stack.append(tag_name)
-            final_text += tag_str
-        else:
-            if tags_stack and tags_stack[-1] == tag_name:
-                tags_stack.pop()
-                final_text += tag_str
-            else:
-                # 忽略不匹配的闭合标签
-                pass
-                
-        last_pos = match.end()
-        
-    final_text += text[last_pos:]
-    while tags_stack:
-        final_text += f"</{tags_stack.pop()}>"
+    with tracing.span("telegram.sanitize", chars=len(text or ""), trusted=trusted) as span:
+        chunks = split_message((text or "").strip() if trusted else clean_html_for_telegram(text))
+        span.set(chunks=len(chunks), out_chars=sum(len(c) for c in chunks))
+    if not chunks:
+        return []
+    return get_delivery(token).submit(parse_chat_ids(chat_id), chunks)
 
-    final_text = re.sub(r'\n\s*\n', '\n\n', final_text)
-    return final_text.strip()
+def flush_telegram(token: str = None):
+    """等待已排队的消息全部发送完毕。"""
+    token = token or os.getenv("TG_TOKEN")
+    if token:
+        get_delivery(token).flush()
 
 def send_telegram_core(text: str, token: str = None, chat_id: str = None) -> bool:
     """
-    发送消息的核心逻辑。
+    发送消息的核心逻辑 (阻塞直到发送完成)。超过 4096 字符的消息会自动切分。
     """
-    token = token or os.getenv("TG_TOKEN")
-    chat_id = chat_id or os.getenv("CHAT_ID")
-    
-    if not token or not chat_id:
-        print("Error: TG_TOKEN or CHAT_ID not found.")
+    futures = queue_telegram_message(text, token=token, chat_id=chat_id)
+    if futures is None:
         return False
+    return all(f.result() for f in futures)
 
-    cleaned_text = clean_html_for_telegram(text)
-
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    payload = {
-        "chat_id": chat_id,
-        "text": cleaned_text,
-        "parse_mode": "HTML",
-        "disable_web_page_preview": True
-    }
-    
-    try:
-        response = requests.post(url, json=payload, timeout=15)
-        if response.status_code == 200:
-            return True
-        else:
-            # 如果还是失败，尝试作为纯文本发送（保底）
-            print(f"Telegram HTML Send Failed, retrying as plain text: {response.text}")
-            payload["text"] = re.sub(r'<[^>]+>', '', cleaned_text) # 粗暴去标签
-            del payload["parse_mode"]
-            response = requests.post(url, json=payload, timeout=15)
-            return response.status_code == 200
-    except Exception as e:
-        print(f"Telegram Error: {e}")
+async def asend_telegram_core(text: str, token: str = None, chat_id: str = None) -> bool:
+    """
+    send_telegram_core 的异步版本：等待发送队列而不占用线程。
+    取消时尚未开始发送的消息会从队列中撤回。
+    """
+    futures = queue_telegram_message(text, token=token, chat_id=chat_id)
+    if futures is None:
         return False
-    finally:
-        time.sleep(1)
+    try:
+        results = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+    except asyncio.CancelledError:
+        for f in futures:
+            f.cancel()
+        raise
+    return all(results)
 
 def send_telegram_tool(message: str) -> str:
     success = send_telegram_core(message)
-    return "消息已成功发送到 Telegram。" if success else "发送失败。"
\ No newline at end of file
+    return "消息已成功发送到 Telegram。" if success else "发送失败。"
+
+async def asend_telegram_tool(message: str) -> str:
+    success = await asend_telegram_core(message)
+    return "消息已成功发送到 Telegram。" if success else "发送失败。"
@@ -0,0 +1,290 @@
+"""
+轻量级链路追踪 (各阶段耗时剖面)。
+
+- span(name, **attrs)：记录起止时间、线程、父 span 与属性 (字节数、条目数、缓存命中、回退层级等)。
+  异常照常抛出，同时记录在 span 上；被捕获的异常可用 record_error() 记到当前 span。
+- 只有在 trace() 激活时才记录 (daily_news 每次运行开启一次)；未激活时 span 几乎零开销，
+  常驻的 MCP 服务不会累积数据。
+- contextvars 不会自动跨线程传播，线程池任务需通过 submit() / wrap() 提交才能挂到当前 span 下。
+- Trace.to_dict() 输出 JSON 剖面，summary() 输出关键路径与各阶段耗时汇总；
+  安装 opentelemetry 时 export_otel() 把 span 补发到全局 TracerProvider (导出器由 OTel SDK 配置)。
+"""
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # opentelemetry 为可选依赖
+    otel_trace = None
+
+TRACE_OTEL = os.getenv("TRACE_OTEL", "0") != "0"
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+_current_span = contextvars.ContextVar("span", default=None)
+_ids = itertools.count(1)
+
+
+class Span:
+    __slots__ = ("id", "parent", "name", "thread", "start", "end", "attrs", "error")
+
+    def __init__(self, name: str, parent, attrs: dict):
+        self.id = next(_ids)
+        self.parent = parent
+        self.name = name
+        self.thread = threading.current_thread().name
+        self.start = time.perf_counter()
+        self.end = None
+        self.attrs = attrs
+        self.error = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def add(self, key: str, n: int = 1):
+        """累加计数属性 (例如重试次数、缓存命中数)。"""
+        self.attrs[key] = self.attrs.get(key, 0) + n
+        return self
+
+
+class _NullSpan:
+    """未激活追踪时使用的空 span。"""
+
+    duration = 0.0
+
+    def set(self, **attrs):
+        return self
+
+    def add(self, key: str, n: int = 1):
+        return self
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.root = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def record(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def _closed(self) -> list:
+        with self._lock:
+            return [s for s in self.spans if s.end is not None]
+
+    # --- Export ---
+
+    def to_dict(self) -> dict:
+        spans = sorted(self._closed(), key=lambda s: s.start)
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration": round(self.root.duration, 4) if self.root else None,
+            "spans": [
+                {
+                    "id": s.id,
+                    "parent": s.parent,
+                    "name": s.name,
+                    "thread": s.thread,
+                    "start": round(s.start - self.origin, 4),
+                    "duration": round(s.duration, 4),
+                    "attrs": s.attrs,
+                    **({"error": s.error} if s.error else {}),
+                }
+                for s in spans
+            ],
+            "stages": self.stages(),
+        }
+
+    def write(self, path):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=1, default=str)
+        os.replace(tmp, path)
+
+    # --- Analysis ---
+
+    def stages(self) -> dict:
+        """按 span 名称汇总：次数、总耗时、p50 / p95 / 最大耗时、错误数与数值属性之和。"""
+        groups = {}
+        for s in self._closed():
+            groups.setdefault(s.name, []).append(s)
+        result = {}
+        for name, spans in groups.items():
+            durations = sorted(s.duration for s in spans)
+
+            def pick(q):
+                return round(durations[min(len(durations) - 1, int(q * len(durations)))], 4)
+
+            totals = {}
+            for s in spans:
+                for key, value in s.attrs.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        totals[key] = totals.get(key, 0) + value
+            result[name] = {
+                "count": len(spans),
+                "total": round(sum(durations), 4),
+                "p50": pick(0.5),
+                "p95": pick(0.95),
+                "max": round(durations[-1], 4),
+                "errors": sum(1 for s in spans if s.error),
+                **({"sums": totals} if totals else {}),
+            }
+        return result
+
+    def critical_path(self) -> list:
+        """
+        关键路径：从根 span 开始，每层取最后结束的子 span，再往前取在它开始之前结束的兄弟 span，
+        依次展开。返回 [(深度, span), ...]。
+        """
+        children = {}
+        for s in self._closed():
+            children.setdefault(s.parent, []).append(s)
+        path = []
+
+        def walk(span, depth):
+            path.append((depth, span))
+            cursor = span.end
+            chain = []
+            for child in sorted(children.get(span.id, []), key=lambda s: s.end, reverse=True):
+                if child.end <= cursor:
+                    chain.append(child)
+                    cursor = child.start
+            for child in reversed(chain):
+                walk(child, depth + 1)
+
+        if self.root is not None and self.root.end is not None:
+            walk(self.root, 0)
+        return path
+
+    def summary(self, top: int = 12) -> str:
+        lines = [f"Critical path ({self.root.duration:.2f}s total):" if self.root else "Critical path:"]
+        for depth, s in self.critical_path():
+            attrs = " ".join(f"{k}={v}" for k, v in s.attrs.items() if not isinstance(v, (dict, list)))
+            flag = f" ERROR {s.error}" if s.error else ""
+            lines.append(f"  {'  ' * depth}{s.name:<{max(1, 28 - 2 * depth)}} "
+                         f"+{s.start - self.origin:7.2f}s {s.duration:7.2f}s  {attrs}{flag}")
+        lines.append(f"Stages by total time (top {top}):")
+        stages = sorted(self.stages().items(), key=lambda kv: kv[1]["total"], reverse=True)
+        for name, stat in stages[:top]:
+            lines.append(f"  {name:<24} x{stat['count']:<5} total {stat['total']:8.2f}s  "
+                         f"p50 {stat['p50']:6.2f}s  p95 {stat['p95']:6.2f}s  errors {stat['errors']}")
+        return "\n".join(lines)
+
+# --- Recording ---
+
+@contextmanager
+def trace(name: str, **attrs):
+    """开启一次追踪，根 span 名称为 name。"""
+    current = Trace(name)
+    token = _current_trace.set(current)
+    try:
+        with span(name, **attrs) as root:
+            current.root = root
+            yield current
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    current = _current_trace.get()
+    if current is None:
+        yield NULL_SPAN
+        return
+    parent = _current_span.get()
+    s = Span(name, parent.id if parent else None, attrs)
+    current.record(s)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        s.end = time.perf_counter()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # 未读完的生成器在其他上下文中被回收
+            pass
+
+
+def traced(name: str, **attrs):
+    """装饰器：整个函数调用记录为一个 span。"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, **attrs):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span():
+    s = _current_span.get()
+    return s if s is not None and _current_trace.get() is not None else NULL_SPAN
+
+
+def record_error(error: BaseException):
+    """记录已被捕获 (不再抛出) 的异常。"""
+    s = current_span()
+    if s is not NULL_SPAN:
+        s.error = f"{type(error).__name__}: {error}"
+
+# --- Thread Propagation ---
+
+def submit(pool, fn, *args, **kwargs):
+    """pool.submit，任务在提交时的上下文中运行 (继承当前 trace 与父 span)。"""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def wrap(fn):
+    """返回在当前上下文中运行的 fn (用于 pool.map 等)，每次调用使用独立的上下文副本。"""
+    context = contextvars.copy_context()
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return wrapper
+
+# --- OpenTelemetry ---
+
+def export_otel(current: Trace) -> bool:
+    """把已完成的 span 补发到 OpenTelemetry (保留原始时间戳与父子关系)。未安装时返回 False。"""
+    if otel_trace is None:
+        return False
+    tracer = otel_trace.get_tracer("ai_apps")
+
+    def to_ns(t):
+        return int((current.started_at + (t - current.origin)) * 1e9)
+
+    exported = {}
+    for s in sorted(current._closed(), key=lambda s: s.start):
+        parent = exported.get(s.parent)
+        context = otel_trace.set_span_in_context(parent) if parent is not None else None
+        attributes = {k: v for k, v in s.attrs.items() if isinstance(v, (str, bool, int, float))}
+        otel_span = tracer.start_span(s.name, context=context, start_time=to_ns(s.start), attributes=attributes)
+        if s.error:
+            otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, s.error))
+        exported[s.id] = otel_span
+    for s in current._closed():
+        exported[s.id].end(end_time=to_ns(s.end))
+    return True
@@ -0,0 +1,146 @@
+"""
+共享 HTTP 传输层。
+
+news / telegram 等工具的所有出站请求都经过这里：
+- 同步接口基于进程内唯一的 requests.Session，keep-alive 复用连接池。
+- 异步接口优先使用 httpx.AsyncClient (安装 h2 时启用 HTTP/2)，否则退化为线程池中的同步调用。
+- 按 host 限制并发，避免单个上游被突发请求打满。
+"""
+import asyncio
+import importlib.util
+import os
+import threading
+import weakref
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from mcp_tools import tracing
+
+try:
+    import httpx
+except ImportError:  # httpx 为可选依赖
+    httpx = None
+
+PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", 6))
+POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", 16))
+HTTP2_ENABLED = httpx is not None and importlib.util.find_spec("h2") is not None
+USER_AGENT = os.getenv("HTTP_USER_AGENT", "Mozilla/5.0 (compatible; ai_apps/1.0)")
+
+_session = None
+_session_lock = threading.Lock()
+_host_limits = {}
+_async_state = weakref.WeakKeyDictionary()
+
+# --- Sync Face ---
+
+def get_session() -> requests.Session:
+    """返回共享的 Session（首次调用时创建）。"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # pool_block：连接池满时等待空闲连接，而不是新建连接、用完即丢
+                adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=PER_HOST_LIMIT, pool_block=True)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["User-Agent"] = USER_AGENT
+                _session = session
+    return _session
+
+def _host_limit(url: str) -> threading.BoundedSemaphore:
+    host = urlsplit(url).netloc
+    with _session_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+        return _host_limits[host]
+
+def _release_on_close(response: requests.Response, limit: threading.BoundedSemaphore):
+    """流式响应在 close() 时才归还 host 并发名额 (响应体此时才读完或被放弃)；没有关闭的响应被回收时兜底归还。"""
+    release = weakref.finalize(response, limit.release)
+    close = response.close
+
+    def closing():
+        try:
+            close()
+        finally:
+            release()
+    response.close = closing
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    通过共享连接池发送请求；同一 host 的并发数不超过 PER_HOST_LIMIT。
+    stream=True 时名额一直占用到响应关闭 (response.close() 或 with response)，调用方必须关闭响应。
+    """
+    kwargs.setdefault("timeout", 30)
+    with tracing.span("http", method=method, host=urlsplit(url).netloc) as span:
+        limit = _host_limit(url)
+        limit.acquire()
+        try:
+            response = get_session().request(method, url, **kwargs)
+        except BaseException:
+            limit.release()
+            raise
+        if kwargs.get("stream"):
+            _release_on_close(response, limit)
+        else:
+            limit.release()
+        # 流式响应只能从响应头得知大小 (分块传输时未知)
+        size = response.headers.get("Content-Length") if kwargs.get("stream") else len(response.content)
+        span.set(status=response.status_code, bytes=int(size or 0))
+        return response
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+def close():
+    """关闭共享 Session，释放所有空闲连接。"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+# --- Async Face ---
+
+def _loop_state():
+    loop = asyncio.get_running_loop()
+    state = _async_state.get(loop)
+    if state is None:
+        client = None
+        if httpx is not None:
+            limits = httpx.Limits(max_connections=POOL_HOSTS * PER_HOST_LIMIT, max_keepalive_connections=POOL_HOSTS * PER_HOST_LIMIT)
+            client = httpx.AsyncClient(http2=HTTP2_ENABLED, limits=limits, headers={"User-Agent": USER_AGENT}, follow_redirects=True)
+        state = {"client": client, "limits": {}}
+        _async_state[loop] = state
+    return state
+
+async def arequest(method: str, url: str, **kwargs):
+    """
+    异步请求。返回对象与 requests.Response 一样提供 status_code / headers / content / text / json()。
+    """
+    kwargs.setdefault("timeout", 30)
+    state = _loop_state()
+    host = urlsplit(url).netloc
+    limit = state["limits"].setdefault(host, asyncio.Semaphore(PER_HOST_LIMIT))
+    async with limit:
+        if state["client"] is not None:
+            return await state["client"].request(method, url, **kwargs)
+        return await asyncio.to_thread(get_session().request, method, url, **kwargs)
+
+async def aget(url: str, **kwargs):
+    return await arequest("GET", url, **kwargs)
+
+async def apost(url: str, **kwargs):
+    return await arequest("POST", url, **kwargs)
+
+async def aclose():
+    """关闭当前事件循环上的异步客户端。"""
+    state = _async_state.pop(asyncio.get_running_loop(), None)
+    if state and state["client"] is not None:
+        await state["client"].aclose()
@@ -1,114 +1,296 @@
 import sys
 import os
 import datetime
+import math
+import threading
 import time
-import html
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Add project root to path so we can import mcp_tools
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
-from mcp_tools.telegram.tools import send_telegram_core as send_telegram_message
+from mcp_tools.telegram.tools import queue_telegram_message as send_telegram_message, flush_telegram
 from mcp_tools.news.tools import (
-    get_news_data as get_news_report, 
-    fetch_rss_news, 
+    fetch_google_news, 
     fetch_us_market_depth, 
     fetch_cn_market_depth, 
     fetch_china_policy,
     analyze_stock_market_multi,
-    analyze_news_with_ai
+    get_hedge_stats
 )
+from mcp_tools.news.analysis import analyze_batch
+from mcp_tools.news import dedup, digest, news_index
 from mcp_tools.email.tools import send_email_core
+from mcp_tools import tracing
+from mcp_tools.storage import cache_dir
+from run_state import RunState
+import feed_catalog
 
 # Load environment variables
 load_dotenv()
 
-def main():
-    # 混合配置表 v5.0 (24h 智能过滤版)
-    topics_config = {
-        "AI Focus": {"type": "rss", "url": "https://www.technologyreview.com/topic/artificial-intelligence/feed/"},
-        "Tech Giants": {"type": "rss", "url": "https://techcrunch.com/feed/"},
-        "OS Tech": {"type": "rss", "url": "https://www.phoronix.com/rss.php"},
-        "Domestic OS": {"type": "rss", "url": "https://www.ithome.com/rss/"},
-        "Market Analysis": {"type": "market_depth"},
-        "China Policy": {"type": "china_policy"},
-        "Embedded Linux": {"type": "search", "query": "Embedded Linux Development"}
-    }
-    
+# 主题与来源见 feeds.json (或 DIGEST_FEEDS 指定的目录文件)
+TOPICS_CONFIG = feed_catalog.load_catalog()
+
+# 并发度：所有主题同时抓取；新闻条目跨主题合并为少量批量分析请求，Gemini 调用由令牌桶统一限流
+DIGEST_WORKERS = int(os.getenv("DIGEST_WORKERS", 8))
+# 跨主题 / 跨运行去重 (同一事件换了来源或链接也只推送一次)
+NEWS_DEDUP = os.getenv("NEWS_DEDUP", "1") != "0"
+# 增量模式：只处理上次成功推送之后的新条目，崩溃后可续跑 (状态见 run_state.py)
+DIGEST_INCREMENTAL = os.getenv("DIGEST_INCREMENTAL", "1") != "0"
+# 增量窗口在检查点之前额外回看的小时数 (应对 feed 延迟收录)
+DIGEST_OVERLAP_HOURS = int(os.getenv("DIGEST_OVERLAP_HOURS", 2))
+# 每次运行的耗时剖面 (JSON) 输出目录，默认 ~/.cache/ai_apps/profiles
+DIGEST_PROFILE_DIR = os.getenv("DIGEST_PROFILE_DIR")
+# 只保留最近 N 份剖面 (0 = 不清理)
+DIGEST_PROFILE_KEEP = int(os.getenv("DIGEST_PROFILE_KEEP", 30))
+
+def topic_hours(state, display_name, window: int = 24) -> int:
+    """抓取窗口：增量模式下为距上次检查点的小时数 (加重叠)，最长 window 小时 (主题各来源的最大回看窗口)。"""
+    checkpoint = state.checkpoint(display_name) if state else None
+    if checkpoint is None:
+        return window
+    return max(1, min(window, math.ceil((time.time() - checkpoint) / 3600) + DIGEST_OVERLAP_HOURS))
+
+def mark_when_sent(state, run_id, display_name, futures, items, checkpoint):
+    """
+    主题的全部 Telegram 消息发送成功后立即记录进度 (而不是等整次运行结束)，
+    进程中途崩溃时已推送的主题不会在续跑时重复推送。
+    同时把这些条目记入跨运行去重历史：发送失败的条目不记录，下次运行仍会推送。
+    futures 为 None 表示未配置 Telegram，视为已推送；state 为 None (非增量模式) 时只记录去重历史。
+    """
+    def delivered():
+        if state:
+            state.mark_sent(run_id, display_name, items, checkpoint=checkpoint)
+        if NEWS_DEDUP:
+            dedup.STORY_INDEX.remember(items)
+
+    futures = list(futures or [])
+    if not futures:
+        delivered()
+        return
+    pending = [len(futures)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            pending[0] -= 1
+            if pending[0]:
+                return
+        if all(not f.cancelled() and f.exception() is None and f.result() for f in futures):
+            delivered()
+
+    for f in futures:
+        f.add_done_callback(done)
+
+def fetch_topic(display_name, config, hours: int = 24, on_section=None):
+    """
+    抓取单个主题，返回 (类型, 结果)。各主题之间互不依赖，可并发执行。
+    行情主题直接生成研报 (on_section 非空时流式生成、逐段回调)；新闻主题只返回原始条目，统一交给批量分析。
+    """
+    with tracing.span("topic.fetch", topic=display_name, type=config['type'], hours=hours) as span:
+        kind, result = _fetch_topic(config, hours, on_section)
+        span.set(items=len(result) if kind == "items" else 1)
+        return kind, result
+
+def _fetch_topic(config, hours, on_section):
+    # --- Type 1: Market Depth ---
+    if config['type'] == "market_depth":
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            us_future = tracing.submit(pool, fetch_us_market_depth)
+            cn_future = tracing.submit(pool, fetch_cn_market_depth)
+            us_data, cn_data = us_future.result(), cn_future.result()
+        return "market_depth", analyze_stock_market_multi(us_data, cn_data, on_section=on_section)
+
+    # --- Type 2: China Policy (Multi-Source + Time Filter) ---
+    if config['type'] == "china_policy":
+        return "items", fetch_china_policy(hours=hours)
+
+    # --- Type 3: RSS News (Multi-Source + Time Filter) ---
+    if config['type'] == "rss":
+        return "items", feed_catalog.fetch_sources(config, hours=hours)
+
+    # --- Type 4: Search (Time Filter) ---
+    if config['type'] == "search":
+        return "items", fetch_google_news(config['query'], count=10, hours=hours)
+
+    return "items", []
+
+def reload_topics() -> dict:
+    """每次运行重新读取目录 (常驻调度器中修改 feeds.json 无需重启)；读取失败时沿用上一次的目录。"""
+    global TOPICS_CONFIG
+    try:
+        TOPICS_CONFIG = feed_catalog.load_catalog()
+    except (OSError, ValueError) as e:
+        print(f"Feed catalog reload failed, keeping the previous one: {e}")
+    return TOPICS_CONFIG
+
+def main(topics_config: dict = None, workers: int = None, state: RunState = None):
+    """运行一次日报，并输出本次运行的耗时剖面 (JSON) 与关键路径摘要。"""
+    topics_config = topics_config or reload_topics()
+    workers = workers or DIGEST_WORKERS
+    # 自己创建的状态在运行结束后关闭 (常驻调度器中每次运行都会调用 main)
+    owned = state is None and DIGEST_INCREMENTAL
+    if owned:
+        state = RunState()
+
+    try:
+        with tracing.trace("digest", topics=len(topics_config), workers=workers) as run_trace:
+            run_digest(topics_config, workers, state)
+    finally:
+        if owned:
+            state.close()
+    write_profile(run_trace)
+    return run_trace
+
+def write_profile(run_trace):
+    directory = DIGEST_PROFILE_DIR or cache_dir("profiles")
+    path = os.path.join(directory, f"digest-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    try:
+        run_trace.write(path)
+        print(f"Run profile written to {path}")
+        prune_profiles(directory)
+    except OSError as e:
+        print(f"Error writing run profile: {e}")
+    print(run_trace.summary())
+    if tracing.TRACE_OTEL and not tracing.export_otel(run_trace):
+        print("TRACE_OTEL is set but opentelemetry is not installed.")
+
+def prune_profiles(directory, keep: int = None):
+    """删除最旧的剖面，只保留最近 keep 份 (文件名带时间戳，按名称排序即按时间排序)。"""
+    keep = DIGEST_PROFILE_KEEP if keep is None else keep
+    if keep <= 0:
+        return
+    profiles = sorted(name for name in os.listdir(directory) if name.startswith("digest-") and name.endswith(".json"))
+    for name in profiles[:-keep]:
+        os.remove(os.path.join(directory, name))
+
+def run_digest(topics_config: dict, workers: int, state: RunState = None):
+    run_started = time.time()
     current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+
+    # 0. 续跑上次未完成的运行：已完成的主题直接复用
+    run_id, resumed = state.begin() if state else (None, {})
+    if resumed:
+        print(f"Resuming run {run_id}: {len(resumed)} topics restored, {sum(t['sent'] for t in resumed.values())} already sent")
     
-    # 1. Send Telegram Header
-    send_telegram_message(f"📅 <b>Daily Global News (24h Smart Window)</b>\n<i>{current_time}</i>")
-    
-    full_email_html = f"<h1>📅 Daily Global News (24h Smart Window)</h1><p><i>{current_time}</i></p><hr>"
-    
-    for display_name, config in topics_config.items():
-        print(f"Processing {display_name}...")
-        
-        items = []
-        category_html = f"<h2>🔹 {display_name}</h2>"
-        
-        # --- Type 1: Market Depth ---
-        if config['type'] == "market_depth":
-            us_data = fetch_us_market_depth()
-            cn_data = fetch_cn_market_depth()
-            report_html = analyze_stock_market_multi(us_data, cn_data)
-            send_telegram_message(f"📊 <b>全球市场深度复盘与展望</b>\n\n{report_html}")
-            full_email_html += f"<h2>📊 全球市场深度复盘与展望</h2>{report_html}<hr>"
-            continue
-
-        # --- Type 2: China Policy (Multi-Source + 24h Filter) ---
-        elif config['type'] == "china_policy":
-            raw_items = fetch_china_policy(hours=24)
-            if raw_items:
-                analyses = analyze_news_with_ai(raw_items, display_name)
-                for i, item in enumerate(raw_items):
-                    item['analysis'] = analyses[i] if i < len(analyses) else "暂无分析"
-                items = raw_items
-
-        # --- Type 3: RSS News (24h Filter) ---
-        elif config['type'] == "rss":
-            raw_items = fetch_rss_news(config['url'], hours=24)
-            if raw_items:
-                analyses = analyze_news_with_ai(raw_items, display_name)
-                for i, item in enumerate(raw_items):
-                    item['analysis'] = analyses[i] if i < len(analyses) else "暂无分析"
-                items = raw_items
-            
-        # --- Type 4: Search (24h Filter) ---
-        elif config['type'] == "search":
-            report_data = get_news_report(config['query'], display_name, count=10, hours=24)
-            items = report_data['items']
-
-        # --- Output Formatting ---
-        if items:
-            for idx, item in enumerate(items):
-                title = html.escape(item['title'])
-                link = item['link']
-                analysis = html.escape(str(item['analysis']))
-                category_html += f"<p><b>{idx+1}. <a href=\"{link}\">{title}</a></b><br>"
-                category_html += f"💡 <span style='background-color: #f0f0f0; padding: 2px;'>{analysis}</span></p>"
-
-            chunk_size = 5
-            for j in range(0, len(items), chunk_size):
-                chunk_items = items[j:j+chunk_size]
-                tg_msg = f"🔹 <b>{display_name}</b>\n"
-                for i, item in enumerate(chunk_items):
-                    tg_msg += f"{j+i+1}. <a href=\"{item['link']}\">{html.escape(item['title'])}</a>\n"
-                    tg_msg += f"   💡 <code>{html.escape(str(item['analysis']))}</code>\n\n"
-                send_telegram_message(tg_msg)
-        else:
-            send_telegram_message(f"🔹 <b>{display_name}</b>\n- No updates in the last 24h.\n")
-            category_html += "<p>- No updates in the last 24h.</p>"
-        
-        full_email_html += category_html + "<hr>"
-        # 增加延迟以尊重 API 速率限制，减少“暂无分析”的概率
-        print("Waiting for 60 seconds before next topic...")
-        time.sleep(60)
+    # 1. Send Telegram Header (文档只构建一次，邮件 / Telegram 由 digest 渲染器分别输出)
+    document = digest.Digest("Daily Global News (24h Smart Window)", current_time)
+    if not any(t['sent'] for t in resumed.values()):
+        send_telegram_message(digest.telegram_header(document), trusted=True)
+
+    # 2. 所有主题同时开始抓取 (行情研报在后台继续生成，每写完一段立即推送到 Telegram)
+    streamed = {}
+
+    def section_sender(display_name):
+        sends = streamed.setdefault(display_name, [])
+
+        def on_section(section):
+            sends.append(send_telegram_message(digest.telegram_report(section, heading=not sends)))
+        return on_section
+
+    results = {name: (topic['kind'], topic['payload']) for name, topic in resumed.items() if name in topics_config}
+    fresh = []
+    pool = ThreadPoolExecutor(max_workers=workers)
+    # 中途失败时也要等待已排队的发送完成：发送成功回调里写入的检查点才会落盘，续跑不会重复推送
+    try:
+        with tracing.span("digest.fetch") as span:
+            futures = {
+                name: tracing.submit(
+                    pool, fetch_topic, name, config, topic_hours(state, name, feed_catalog.topic_window(config)),
+                    section_sender(name) if config['type'] == "market_depth" else None,
+                )
+                for name, config in topics_config.items() if name not in resumed
+            }
+            for display_name, config in topics_config.items():
+                if config['type'] == "market_depth" or display_name in results:
+                    continue
+                try:
+                    kind, items = futures[display_name].result()
+                except Exception as e:
+                    print(f"Error fetching {display_name}: {e}")
+                    kind, items = "items", []
+                # 重叠窗口内已推送过的条目不再分析和推送
+                results[display_name] = (kind, state.undelivered(items) if state else items)
+                fresh.append(display_name)
+            span.set(topics=len(fresh), items=sum(len(results[name][1]) for name in fresh))
+
+        # 3. 去重：同一事件只保留按主题顺序第一次出现的条目，之前几天已推送过的不再重复
+        if NEWS_DEDUP and fresh:
+            with tracing.span("digest.dedup") as span:
+                all_items = [item for name in fresh for item in results[name][1]]
+                keep = {id(item) for item in dedup.STORY_INDEX.filter(all_items, history=True)}
+                for name in fresh:
+                    results[name] = ("items", [item for item in results[name][1] if id(item) in keep])
+                span.set(items=len(all_items), kept=len(keep))
+            print(f"Dedup: {len(all_items)} -> {len(keep)} items")
+
+        # 4. 所有新闻主题合并为少量批量分析请求 (续跑恢复的条目已带分析结果)
+        groups = {name: results[name][1] for name in fresh if results[name][1]}
+        for name, analyses in analyze_batch(groups).items():
+            for item, analysis in zip(groups[name], analyses):
+                item['analysis'] = analysis
+            news_index.record(name, groups[name])
+        if state:
+            for name in fresh:
+                state.save_topic(run_id, name, *results[name])
+
+        # 5. 按主题顺序输出
+        with tracing.span("digest.output"):
+            for display_name in topics_config:
+                print(f"Processing {display_name}...")
+                if display_name not in results:
+                    try:
+                        with tracing.span("topic.wait", topic=display_name):
+                            results[display_name] = futures[display_name].result()
+                    except Exception as e:
+                        print(f"Error processing {display_name}: {e}")
+                        results[display_name] = ("market_depth", "AI 深度分析生成失败。")
+                    if state:
+                        state.save_topic(run_id, display_name, *results[display_name])
+                kind, result = results[display_name]
+                already_sent = display_name in resumed and resumed[display_name]['sent']
+
+                if kind == "market_depth":
+                    if not already_sent:
+                        if streamed.get(display_name):
+                            sent = [f for sends in streamed[display_name] for f in sends or []]
+                        else:
+                            # 研报为模型生成的 HTML，发送前仍需清洗
+                            sent = send_telegram_message(digest.telegram_report(result))
+                        if state:
+                            mark_when_sent(state, run_id, display_name, sent, [], run_started)
+                    document.add_report(display_name, result)
+                    continue
+
+                items = result
+                # 增量模式下没有新条目的主题不再推送 "No updates"，直接推进检查点
+                note = "No new updates since the last digest." if state else "No updates in the last 24h."
+                section = document.add_items(display_name, items, note=note)
+                if items or not state:
+                    if not already_sent:
+                        # 按 Telegram 长度上限装箱，而不是固定每 5 条一段
+                        sent = []
+                        for tg_msg in digest.telegram_messages(section):
+                            sent.extend(send_telegram_message(tg_msg, trusted=True) or [])
+                        mark_when_sent(state, run_id, display_name, sent, items, run_started)
+                else:
+                    mark_when_sent(state, run_id, display_name, [], [], run_started)
+    finally:
+        pool.shutdown()
+        with tracing.span("telegram.flush"):
+            flush_telegram()
+
+    print(f"CN market tier stats: {get_hedge_stats()}")
         
-    # 4. Send Email Report
+    # 6. Send Email Report
     print("Sending email report...")
-    send_email_core(f"Daily News Digest - {current_time}", full_email_html, is_html=True)
+    full_email_html = digest.render_email(document)
+    with tracing.span("email.send", bytes=len(full_email_html)) as span:
+        span.set(ok=bool(send_email_core(f"Daily News Digest - {current_time}", full_email_html, is_html=True)))
+    if state:
+        state.finish(run_id)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,98 @@
+"""
+日报的 feed 目录 (JSON / YAML)。
+
+目录文件 (默认 tasks/news/feeds.json，可用 DIGEST_FEEDS 指定) 按输出顺序列出主题：
+- rss 主题由多个来源组成，每个来源可单独设置：
+  priority (越大越靠前，去重时保留高优先级来源的条目)、refresh (最短刷新间隔，秒)、
+  window (最长回看小时数) 与 max_count (该来源最多取几条)；未设置的字段取 defaults。
+  主题的 max_count 为合并后的条目上限。
+- market_depth / china_policy / search 主题的格式与原先的 TOPICS_CONFIG 相同。
+  旧格式 {"type": "rss", "url": ...} 仍然有效，视为只有一个来源。
+
+同一次运行的所有来源共用 FETCH_POOL 并发下载 (解析可交给进程池，见 feed_cache)，
+结果按主题合并：优先级高的来源在前，同一优先级按发布时间倒序，再去重、截断。
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import yaml
+except ImportError:  # PyYAML 为可选依赖，只有 .yaml / .yml 目录需要
+    yaml = None
+
+from mcp_tools import tracing
+from mcp_tools.news.tools import deduplicate_items, fetch_rss_news
+
+DIGEST_FEEDS = os.getenv("DIGEST_FEEDS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "feeds.json"))
+# 所有主题的来源共用的下载线程数
+FEED_FETCH_WORKERS = int(os.getenv("FEED_FETCH_WORKERS", 16))
+
+DEFAULTS = {"priority": 0, "refresh": None, "window": 24, "max_count": 15}
+TOPIC_TYPES = ("rss", "search", "market_depth", "china_policy")
+
+FETCH_POOL = ThreadPoolExecutor(max_workers=FEED_FETCH_WORKERS, thread_name_prefix="feed")
+
+
+def load_catalog(path: str = DIGEST_FEEDS) -> dict:
+    """读取目录文件，返回按文件顺序排列的 {主题名: 配置}，来源字段已补全默认值。格式错误时抛出 ValueError。"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ValueError(f"{path}: PyYAML is not installed, use a JSON catalog")
+            catalog = yaml.safe_load(f)
+        else:
+            catalog = json.load(f)
+    if not isinstance(catalog, dict) or not isinstance(catalog.get("topics"), dict):
+        raise ValueError(f"{path}: expected an object with a 'topics' mapping")
+    defaults = {**DEFAULTS, **catalog.get("defaults", {})}
+    return {name: normalize_topic(name, config, defaults) for name, config in catalog["topics"].items()}
+
+
+def normalize_topic(name: str, config: dict, defaults: dict = None) -> dict:
+    defaults = defaults or DEFAULTS
+    if config.get("type") not in TOPIC_TYPES:
+        raise ValueError(f"Topic {name}: unknown type {config.get('type')!r}")
+    if config["type"] == "search" and not config.get("query"):
+        raise ValueError(f"Topic {name}: search topics need a 'query'")
+    if config["type"] != "rss":
+        return dict(config)
+    sources = config.get("sources") or ([{"url": config["url"]}] if config.get("url") else [])
+    if not sources or not all(s.get("url") for s in sources):
+        raise ValueError(f"Topic {name}: rss topics need 'sources' with a 'url' each")
+    return {
+        **config,
+        "max_count": config.get("max_count", defaults["max_count"]),
+        "sources": [{**defaults, **source} for source in sources],
+    }
+
+
+def topic_window(config: dict) -> int:
+    """主题的最长回看小时数 (各来源 window 的最大值)，非 rss 主题为 24。"""
+    if config["type"] != "rss":
+        return 24
+    return max(source["window"] for source in normalize_topic("", config)["sources"])
+
+
+def fetch_sources(config: dict, hours: int = 24) -> list:
+    """
+    并发抓取 rss 主题的全部来源并合并。
+
+    Args:
+        config: rss 主题配置 (目录格式或旧的单 url 格式)
+        hours: 本次运行的抓取窗口，各来源再以自己的 window 为上限
+    """
+    config = normalize_topic("", config)
+    sources = sorted(config["sources"], key=lambda s: -s["priority"])
+    futures = [
+        tracing.submit(FETCH_POOL, fetch_rss_news, source["url"], hours=min(hours, source["window"]),
+                       max_count=source["max_count"], refresh=source["refresh"])
+        for source in sources
+    ]
+    if len(sources) == 1:
+        return futures[0].result()[:config["max_count"]]
+    tagged = []
+    for source, future in zip(sources, futures):
+        tagged.extend((source["priority"], item) for item in future.result())
+    tagged.sort(key=lambda pair: (-pair[0], -(pair[1].get("published") or 0)))
+    return deduplicate_items([item for _, item in tagged])[:config["max_count"]]
@@ -0,0 +1,140 @@
+"""
+日报的持久化运行状态 (SQLite)。
+
+- sources:   每个主题上次成功推送的检查点时间，下一次运行只抓取检查点之后 (加少量重叠) 的窗口。
+- delivered: 已推送条目的 ID (规范化 URL 的哈希)，重叠窗口内的条目不会再次分析和推送。
+- runs / run_topics: 每次运行逐主题保存抓取结果、分析结果与推送进度。
+  进程中途崩溃后，下一次运行会接着未完成的那次继续：已抓取的主题不再抓取，已推送的主题不再推送，
+  邮件仍包含全部主题。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from mcp_tools.news.dedup import canonical_url
+from mcp_tools.storage import cache_dir
+
+# 未完成的运行在多长时间内可以被续跑 (秒)
+RESUME_WINDOW = int(os.getenv("DIGEST_RESUME_WINDOW", 6 * 3600))
+# 已推送 ID 的保留时间 (秒)，需大于最大抓取窗口 (72h 回退)
+DELIVERED_TTL = int(os.getenv("DIGEST_DELIVERED_TTL", 7 * 24 * 3600))
+
+
+def item_id(item: dict) -> str:
+    key = canonical_url(item.get("link", "")) or "title:" + item.get("title", "")
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+class RunState:
+    def __init__(self, path=None):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            path = self.path or cache_dir("digest") / "state.db"
+            self._conn = sqlite3.connect(str(path), check_same_thread=False)
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS sources (name TEXT PRIMARY KEY, checkpoint REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS delivered (id TEXT PRIMARY KEY, source TEXT, delivered REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY AUTOINCREMENT, started REAL NOT NULL, finished REAL);"
+                "CREATE TABLE IF NOT EXISTS run_topics ("
+                "run_id INTEGER NOT NULL, topic TEXT NOT NULL, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+                "sent INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (run_id, topic));"
+            )
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # --- Runs ---
+
+    def begin(self) -> tuple:
+        """
+        开始一次运行。存在 RESUME_WINDOW 内未完成的运行时续跑它。
+
+        Returns:
+            (run_id, {主题: {"kind", "payload", "sent"}})，新运行的第二项为空字典。
+        """
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT id FROM runs WHERE finished IS NULL AND started >= ? ORDER BY id DESC LIMIT 1",
+                (now - RESUME_WINDOW,),
+            ).fetchone()
+            if row:
+                run_id = row[0]
+                topics = {
+                    topic: {"kind": kind, "payload": json.loads(payload), "sent": bool(sent)}
+                    for topic, kind, payload, sent in db.execute(
+                        "SELECT topic, kind, payload, sent FROM run_topics WHERE run_id = ?", (run_id,)
+                    )
+                }
+                return run_id, topics
+            # 放弃过期的未完成运行
+            db.execute("UPDATE runs SET finished = -1 WHERE finished IS NULL")
+            run_id = db.execute("INSERT INTO runs (started) VALUES (?)", (now,)).lastrowid
+            db.commit()
+            return run_id, {}
+
+    def save_topic(self, run_id: int, topic: str, kind: str, payload):
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT INTO run_topics (run_id, topic, kind, payload) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(run_id, topic) DO UPDATE SET kind = excluded.kind, payload = excluded.payload",
+                (run_id, topic, kind, json.dumps(payload, ensure_ascii=False)),
+            )
+            db.commit()
+
+    def mark_sent(self, run_id: int, topic: str, items: list = (), checkpoint: float = None):
+        """主题已推送：记录已推送条目并推进该主题的检查点。"""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("UPDATE run_topics SET sent = 1 WHERE run_id = ? AND topic = ?", (run_id, topic))
+            db.executemany(
+                "INSERT OR REPLACE INTO delivered (id, source, delivered) VALUES (?, ?, ?)",
+                [(item_id(item), topic, now) for item in items],
+            )
+            if checkpoint is not None:
+                db.execute("INSERT OR REPLACE INTO sources (name, checkpoint) VALUES (?, ?)", (topic, checkpoint))
+            db.commit()
+
+    def finish(self, run_id: int):
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("UPDATE runs SET finished = ? WHERE id = ?", (now, run_id))
+            db.execute("DELETE FROM run_topics WHERE run_id IN (SELECT id FROM runs WHERE finished IS NOT NULL)")
+            db.execute("DELETE FROM delivered WHERE delivered < ?", (now - DELIVERED_TTL,))
+            db.commit()
+
+    # --- Delta ---
+
+    def checkpoint(self, source: str):
+        with self._lock:
+            row = self._db().execute("SELECT checkpoint FROM sources WHERE name = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def undelivered(self, items: list) -> list:
+        """去掉已经推送过的条目。"""
+        ids = [item_id(item) for item in items]
+        if not ids:
+            return []
+        seen = set()
+        with self._lock:
+            db = self._db()
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                seen.update(row[0] for row in db.execute(f"SELECT id FROM delivered WHERE id IN ({marks})", chunk))
+        return [item for item, i in zip(items, ids) if i not in seen]